@@ -0,0 +1,181 @@
+#!/usr/bin/env python
+"""
+Command Line Packer
+
+Reads item dimensions as JSONL or CSV from a file or stdin and writes
+one JSONL placement per item to stdout.
+
+    {"item": 0, "bin": 0, "x": 0, "y": 0, "width": 40, "height": 20,
+     "rotated": false}
+    {"item": 7, "bin": null}                       no bin accepts it
+
+Items are numbered in input order. By default items are packed as a
+stream with a lookahead window (see streaming.StreamPacker) and the
+placements of a bin are written, and flushed, as soon as it closes,
+so only the window and the open bins are held in memory. --sort and
+--workers read the whole input first and pack it offline, sorted or
+in parallel shards, and write every bin at the end.
+
+Usage:
+    python -m binpack --width 100 --height 50 < items.jsonl
+    python -m binpack items.csv --pack-algo shelf --sort
+"""
+import argparse
+import json
+import os
+import sys
+from typing import IO, Iterable, List, Optional
+from . import binmanager
+from . import heuristics
+from . import item
+from . import streaming
+from . import workload
+
+
+def _write(output: IO, records: Iterable[dict]) -> None:
+    for record in records:
+        output.write(json.dumps(record, separators=(',', ':')) + '\n')
+    output.flush()
+
+
+def _placements(binn: binmanager.Algorithm, number: int,
+                index_of: dict, dims: dict) -> List[dict]:
+    records = []
+    for i in binn.items:
+        index = index_of.pop(id(i))
+        records.append({'item': index, 'bin': number,
+                        'x': i.CornerPoint[0], 'y': i.CornerPoint[1],
+                        'width': i.x, 'height': i.y,
+                        'rotated': i.x != dims.pop(index)[0]})
+    return records
+
+
+def _unplaced(failed: List[item.Item], index_of: dict,
+              pending: dict) -> List[dict]:
+    records = []
+    for i in failed:
+        index = index_of.pop(id(i))
+        del pending[index]
+        records.append({'item': index, 'bin': None})
+    return records
+
+
+def pack_stream(dims: Iterable[workload.Dimensions], output: IO,
+                lookahead: int = 16,
+                open_bins: Optional[int] = 4, **config) -> dict:
+    """
+    Packs dims as they are read, writing each bin as it closes
+    """
+    packer = streaming.StreamPacker(lookahead=lookahead,
+                                    open_bins=open_bins, **config)
+    index_of = {}
+    pending = {}
+    bins = reported = 0
+    for index, (width, height) in enumerate(dims):
+        new_item = item.Item(width, height, rotation=False)
+        index_of[id(new_item)] = index
+        pending[index] = (width, height)
+        closed = packer.push(new_item)
+        failed = _unplaced(packer.failed[reported:], index_of, pending)
+        reported = len(packer.failed)
+        for binn in closed:
+            _write(output, _placements(binn, bins, index_of, pending))
+            bins += 1
+        _write(output, failed)
+    closed = packer.flush()
+    failed = _unplaced(packer.failed[reported:], index_of, pending)
+    for binn in closed:
+        _write(output, _placements(binn, bins, index_of, pending))
+        bins += 1
+    _write(output, failed)
+    return packer.stats()
+
+
+def pack_offline(dims: List[workload.Dimensions], output: IO,
+                 workers: int = 1, **config) -> dict:
+    """
+    Packs all of dims at once, in parallel when workers > 1
+    """
+    manager = binmanager.BinManager(**config)
+    items = [item.Item(width, height, rotation=False) for width, height in dims]
+    index_of = {id(i): index for index, i in enumerate(items)}
+    pending = dict(enumerate(dims))
+    manager.add_items(*items)
+    if workers > 1:
+        manager.execute_parallel(workers)
+    else:
+        manager.execute()
+    bins = [binn for binn in manager.bins if binn.items]
+    for number, binn in enumerate(bins):
+        _write(output, _placements(binn, number, index_of, pending))
+    _write(output, ({'item': index, 'bin': None} for index in sorted(pending)))
+    stats = manager.stats()
+    return {'placed': stats['items_placed'],
+            'failed': stats['items_failed'],
+            'closed': len(bins)}
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m binpack')
+    parser.add_argument('input', nargs='?', default='-',
+                        help='JSONL or CSV items, - for stdin')
+    parser.add_argument('--format', choices=('jsonl', 'csv'),
+                        help='input format, by default from the extension')
+    parser.add_argument('--width', type=int, default=100)
+    parser.add_argument('--height', type=int, default=50)
+    parser.add_argument('--pack-algo', default='guillotine',
+                        choices=sorted(heuristics.STRATEGIES))
+    parser.add_argument('--heuristic', default='best_area_fit',
+                        choices=sorted(set(name for strategies
+                                           in heuristics.STRATEGIES.values()
+                                           for name in strategies)),
+                        help='one that --pack-algo supports')
+    parser.add_argument('--bin-algo', default='bin_best_fit',
+                        choices=('bin_best_fit', 'bin_first_fit',
+                                 'bin_next_fit'))
+    parser.add_argument('--no-rotation', dest='rotation',
+                        action='store_false')
+    parser.add_argument('--sort', action='store_true',
+                        help='read all items and pack them sorted by size')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='pack offline in this many processes')
+    parser.add_argument('--lookahead', type=int, default=16)
+    parser.add_argument('--open-bins', type=int, default=4)
+    parser.add_argument('--quiet', action='store_true',
+                        help='no summary on stderr')
+    args = parser.parse_args(argv)
+
+    fmt = args.format or ('csv' if args.input.endswith('.csv') else 'jsonl')
+    handle = (sys.stdin if args.input == '-'
+              else open(args.input, newline=''))
+    config = {'bin_width': args.width, 'bin_height': args.height,
+              'pack_algo': args.pack_algo, 'heuristic': args.heuristic,
+              'bin_algo': args.bin_algo, 'rotation': args.rotation}
+    try:
+        dims = workload.parse(handle, fmt)
+        if args.sort or args.workers > 1:
+            stats = pack_offline(list(dims), sys.stdout,
+                                 workers=args.workers, sorting=args.sort,
+                                 **config)
+        else:
+            stats = pack_stream(dims, sys.stdout, lookahead=args.lookahead,
+                                open_bins=args.open_bins, **config)
+    except (ValueError, KeyError, IndexError) as error:
+        print('binpack: %s' % error, file=sys.stderr)
+        return 1
+    except BrokenPipeError:
+        # The reader went away, as head does; stay quiet like other filters
+        sys.stdout = open(os.devnull, 'w')
+        return 0
+    finally:
+        if handle is not sys.stdin:
+            handle.close()
+    if not args.quiet:
+        print('%d items placed in %d bins, %d unplaced'
+              % (stats['placed'], stats['closed'], stats['failed']),
+              file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
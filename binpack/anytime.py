@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+"""
+Anytime Improvement
+
+Iterated greedy search over item order for an already executed
+BinManager. Each iteration ruins the least filled bin along with a
+few random others, re-packs their items in a perturbed area order
+into fresh bins and keeps every other bin untouched. Candidates that
+use no more bins replace the current layout; ties are broken in
+favour of uneven fill, which drains the emptiest bins over time.
+The search runs until the time limit, an iteration cap or a target
+bin count (by default the lower bound) is reached, so the best layout
+so far is always in place.
+"""
+import random
+import time
+from typing import Optional
+
+
+def _fill(bins) -> int:
+    return sum(binn.used_area ** 2 for binn in bins)
+
+
+def improve(manager: 'BinManager',
+            time_limit: float = 1.0,
+            ruin: int = 3,
+            noise: float = 0.3,
+            target: Optional[int] = None,
+            max_iterations: Optional[int] = None,
+            seed: Optional[int] = None) -> dict:
+    """
+    Improves the layout of an executed manager in place and returns
+    a summary of the search. The target bin count defaults to the
+    manager's lower bound, at which point the layout is optimal.
+    """
+    rng = random.Random(seed)
+    deadline = time.monotonic() + time_limit
+    config = manager.config()
+    config['sorting'] = False
+    if target is None:
+        target = max(1, manager.lower_bound())
+
+    bins = [binn for binn in manager.bins if binn.items]
+    bins_before = len(bins)
+    fill = _fill(bins)
+    iterations = accepted = 0
+    while (len(bins) > target and time.monotonic() < deadline and
+           (max_iterations is None or iterations < max_iterations)):
+        iterations += 1
+
+        # Ruin the emptiest bin and some random partners
+        worst = min(range(len(bins)), key=lambda i: bins[i].used_area)
+        others = [i for i in range(len(bins)) if i != worst]
+        ruined = set([worst] + rng.sample(others, min(ruin - 1, len(others))))
+        items = [i for index in ruined for i in bins[index].items]
+        saved = [(i, i.x, i.y, i.CornerPoint) for i in items]
+
+        # Recreate them in a perturbed largest-area-first order
+        items.sort(key=lambda i: i.x * i.y * rng.uniform(1 - noise, 1 + noise),
+                   reverse=True)
+        repack = manager.__class__(instrument=manager.instrument, **config)
+        repack.add_items(*items)
+        repack.execute()
+        new_bins = [binn for binn in repack.bins if binn.items]
+
+        kept = [binn for index, binn in enumerate(bins) if index not in ruined]
+        new_fill = (fill - _fill(bins[index] for index in ruined) +
+                    _fill(new_bins))
+        if (not repack.items_failed and
+                (len(kept) + len(new_bins), -new_fill) <= (len(bins), -fill)):
+            bins = kept + new_bins
+            fill = new_fill
+            accepted += 1
+        else:
+            for i, x, y, corner in saved:
+                i.x, i.y, i.CornerPoint = x, y, corner
+
+    if bins:
+        manager.bins = bins
+    manager.bin_area = sum(binn.x * binn.y for binn in bins)
+    return {'iterations': iterations,
+            'accepted': accepted,
+            'bins_before': bins_before,
+            'bins_after': len(bins),
+            'target': target}
@@ -0,0 +1,309 @@
+#!/usr/bin/env python
+"""
+Beam Search
+
+Bounded beam search over placements. Instead of committing to the
+single best placement per item, the best beam_width partial layouts
+are kept and each is extended with its top placement candidates.
+
+Branches never copy bin objects. A layout is a tuple of immutable bin
+states plus a linked list of placements, so extending a layout builds
+one new state for the bin that changed and shares every other bin and
+the whole placement history with its parent:
+
+    guillotine bin  (freerects, used_area, key)
+    shelf bin       (available_height, shelves, used_area, key)
+    shelf           (available_width, height, vertical_offset)
+    placements      (parent placements, (item index, bin, x, y, w, h))
+
+Layouts whose bins hold the same free space (which is what placing
+identical items in swapped positions produces) are pruned as
+duplicates. A layout is identified by the sum of the hashes of its
+bins' keys, which is independent of bin order and is updated with the
+one bin that changed, so no child rebuilds a key over every bin.
+
+Most bins of sibling layouts are the very same state objects, so the
+top candidates of each bin state are computed once per item and
+shared by every layout holding it, and a child's bins tuple is only
+built once it has made it into the beam. The winning layout is
+materialised into regular Sheet or Guillotine bins through the
+manager's bin factory.
+"""
+import heapq
+from typing import List, Optional, Tuple
+from . import guillotine
+from . import shelf
+
+FreeRectangle = guillotine.FreeRectangle
+
+# Layout keys are sums of bin key hashes modulo 2**64
+_KEY_MASK = (1 << 64) - 1
+
+
+def _rect_score(heuristic: str, index: int, rect: FreeRectangle):
+    if heuristic == 'first_fit':
+        return index
+    if heuristic.endswith('width_fit'):
+        value = rect.width
+    elif heuristic.endswith('height_fit'):
+        value = rect.height
+    else:
+        value = rect.width * rect.height
+    return -value if heuristic.startswith('worst') else value
+
+
+def _shelf_score(heuristic: str, index: int, available: int, height: int):
+    if heuristic == 'first_fit':
+        return index
+    if heuristic == 'next_fit':
+        return -index
+    if heuristic.endswith('width_fit'):
+        value = available
+    elif heuristic.endswith('height_fit'):
+        value = height
+    else:
+        value = available * height
+    return -value if heuristic.startswith('worst') else value
+
+
+def _guillotine_state(freerects: tuple, used_area: int) -> tuple:
+    return (freerects, used_area, frozenset(freerects))
+
+
+def _shelf_state(available_height: int, shelves: tuple, used_area: int) -> tuple:
+    return (available_height, shelves, used_area,
+            (available_height, frozenset(shelves)))
+
+
+class BeamSearch:
+    """
+    Beam search over the placements of a fixed item sequence
+    """
+    def __init__(self, bin_width: int, bin_height: int,
+                 pack_algo: str = 'guillotine',
+                 heuristic: str = 'best_area_fit',
+                 rotation: bool = True,
+                 beam_width: int = 8) -> None:
+        if pack_algo == 'shelf':
+            # Sheets keep their longer side horizontal
+            bin_width, bin_height = (max(bin_width, bin_height),
+                                     min(bin_width, bin_height))
+        self.bin_width = bin_width
+        self.bin_height = bin_height
+        self.pack_algo = pack_algo
+        self.heuristic = heuristic
+        self.rotation = rotation
+        self.beam_width = beam_width
+        # Candidate lists computed by the last search, one per bin
+        # state and item however many layouts share the state
+        self.evaluations = 0
+        if pack_algo == 'guillotine':
+            self.empty = _guillotine_state(
+                (FreeRectangle(bin_width, bin_height, 0, 0),), 0)
+            self._candidates = self._guillotine_candidates
+            self._place = self._guillotine_place
+        else:
+            self.empty = _shelf_state(bin_height, (), 0)
+            self._candidates = self._shelf_candidates
+            self._place = self._shelf_place
+
+
+    def _orientations(self, width: int, height: int) -> List[Tuple[int, int]]:
+        if self.rotation and width != height:
+            return [(width, height), (height, width)]
+        return [(width, height)]
+
+
+    def _guillotine_candidates(self, state: tuple, width: int, height: int):
+        """
+        Returns the best beam_width (score, slot, w, h) placements of
+        a width by height item in one bin
+        """
+        heuristic = self.heuristic
+        orientations = self._orientations(width, height)
+        return heapq.nsmallest(self.beam_width, [
+            (_rect_score(heuristic, r, rect), r, w, h)
+            for r, rect in enumerate(state[0])
+            for w, h in orientations
+            if rect.width >= w and rect.height >= h])
+
+
+    def _guillotine_place(self, state: tuple, slot: int, w: int, h: int):
+        freerects = state[0]
+        rect = freerects[slot]
+        splits = []
+        if w < rect.width:
+            splits.append(FreeRectangle(rect.width - w, h, rect.x + w, rect.y))
+        if h < rect.height:
+            splits.append(FreeRectangle(rect.width, rect.height - h,
+                                        rect.x, rect.y + h))
+        new_rects = freerects[:slot] + freerects[slot + 1:] + tuple(splits)
+        return (_guillotine_state(new_rects, state[1] + w * h),
+                (rect.x, rect.y))
+
+
+    def _shelf_candidates(self, state: tuple, width: int, height: int):
+        heuristic = self.heuristic
+        available_height, shelves = state[0], state[1]
+        orientations = self._orientations(width, height)
+        found = [(_shelf_score(heuristic, s, available, shelf_height), s, w, h)
+                 for w, h in orientations
+                 for s, (available, shelf_height, offset) in enumerate(shelves)
+                 if available >= w and shelf_height >= h]
+        # Slot len(shelves) opens a new shelf. Like Sheet it is opened
+        # as low as the item allows, never taller by rotating it.
+        fitting = [(h, w) for w, h in orientations
+                   if h <= available_height and w <= self.bin_width]
+        if fitting:
+            h, w = min(fitting)
+            found.append((_shelf_score(heuristic, len(shelves),
+                                       self.bin_width, h),
+                          len(shelves), w, h))
+        return heapq.nsmallest(self.beam_width, found)
+
+
+    def _shelf_place(self, state: tuple, slot: int, w: int, h: int):
+        available_height, shelves, used_area = state[0], state[1], state[2]
+        if slot == len(shelves):
+            offset = self.bin_height - available_height
+            available_height -= h
+            shelves = shelves + ((self.bin_width - w, h, offset),)
+            corner = (0, offset)
+        else:
+            available, shelf_height, offset = shelves[slot]
+            corner = (self.bin_width - available, offset)
+            shelves = (shelves[:slot] +
+                       ((available - w, shelf_height, offset),) +
+                       shelves[slot + 1:])
+        return (_shelf_state(available_height, shelves, used_area + w * h),
+                corner)
+
+
+    def _fits_empty(self, width: int, height: int) -> bool:
+        return any(w <= self.bin_width and h <= self.bin_height
+                   for w, h in self._orientations(width, height))
+
+
+    def search(self, dims: List[Tuple[int, int]]) -> Optional[tuple]:
+        """
+        Returns the best layout found as (bins, placements, failed)
+        where failed lists the indices of items that fit no bin
+        """
+        # node: (rank, bins, placements, key); rank orders nodes by
+        # bins used, then by most concentrated fill, then by heuristic
+        # score, and key identifies the free space of the layout
+        beam = [((0, 0, 0), (), None, 0)]
+        empty_hash = hash(self.empty[-1])
+        failed = []
+        self.evaluations = 0
+        for index, (width, height) in enumerate(dims):
+            if not self._fits_empty(width, height):
+                failed.append(index)
+                continue
+            # id(bin state) -> its candidates for this item
+            cache = {}
+            children = {}
+            for rank, bins, placements, key in beam:
+                candidates = []
+                for b, state in enumerate(bins):
+                    found = cache.get(id(state))
+                    if found is None:
+                        self.evaluations += 1
+                        found = cache[id(state)] = self._candidates(
+                            state, width, height)
+                    candidates.extend((score, b, slot, w, h)
+                                      for score, slot, w, h in found)
+                if not candidates:
+                    bins = bins + (self.empty,)
+                    key = (key + empty_hash) & _KEY_MASK
+                    b = len(bins) - 1
+                    self.evaluations += 1
+                    candidates = [(score, b, slot, w, h) for score, slot, w, h
+                                  in self._candidates(self.empty, width, height)]
+                for score, b, slot, w, h in heapq.nsmallest(self.beam_width,
+                                                            candidates):
+                    old = bins[b]
+                    state, corner = self._place(old, slot, w, h)
+                    child_key = (key - hash(old[-1]) + hash(state[-1])) & _KEY_MASK
+                    fill = rank[1] + old[-2] ** 2 - state[-2] ** 2
+                    child_rank = (len(bins), fill, rank[2] + score)
+                    if (child_key not in children or
+                            child_rank < children[child_key][0]):
+                        children[child_key] = (child_rank, bins, b, state,
+                                               (placements, (index, b) + corner + (w, h)),
+                                               child_key)
+            beam = [(child_rank, bins[:b] + (state,) + bins[b + 1:],
+                     placements, child_key)
+                    for child_rank, bins, b, state, placements, child_key
+                    in heapq.nsmallest(self.beam_width, children.values(),
+                                       key=lambda node: node[0])]
+        rank, bins, placements, key = beam[0]
+        return bins, placements, failed
+
+
+def beam_pack(manager: 'BinManager', beam_width: int = 8) -> dict:
+    """
+    Packs the manager's items with a beam search and replaces the
+    manager's bins with the best layout found. The beam ranks placements
+    across all bins, which is not how the manager's bin_algo chooses a
+    bin, so the manager's own greedy layout is kept whenever the beam
+    needs more bins.
+    """
+    if manager.algorithm not in ('guillotine', 'shelf'):
+        raise ValueError("Beam search does not support pack_algo %r"
+                         % manager.algorithm)
+    search = BeamSearch(manager.bin_width, manager.bin_height,
+                        manager.algorithm, manager.heuristic,
+                        manager.rotation, beam_width)
+    items = manager.items
+    bins, placements, failed = search.search([(i.x, i.y) for i in items])
+    greedy = manager.execute()
+    if len(bins) > len(manager.bins):
+        return {'bins': len(manager.bins),
+                'placed': greedy['placed'],
+                'failed': list(manager.rejected)}
+
+    # Materialise the layout into regular bins
+    result = [manager._bin_factory(manager.bin_width, manager.bin_height,
+                                   manager.algorithm, manager.heuristic)
+              for _ in bins]
+    if manager.algorithm == 'guillotine':
+        for binn, state in zip(result, bins):
+            binn.freerects = list(state[0])
+    else:
+        for binn, state in zip(result, bins):
+            binn.available_height = state[0]
+            for available, height, offset in state[1]:
+                new_shelf = shelf.Shelf(search.bin_width, height, offset)
+                new_shelf.available_width = available
+                binn.shelves.append(new_shelf)
+
+    order = []
+    while placements is not None:
+        placements, placement = placements
+        order.append(placement)
+    manager.used_area = 0
+    for index, b, x, y, w, h in reversed(order):
+        placed = items[index]
+        placed.x, placed.y, placed.CornerPoint = w, h, (x, y)
+        binn = result[b]
+        binn.items.append(placed)
+        binn.used_area += w * h
+        binn.free_area -= w * h
+        manager.used_area += w * h
+        if manager.algorithm == 'shelf':
+            for target in binn.shelves:
+                if target.vertical_offset == y:
+                    target.items.append(placed)
+                    break
+
+    if result:
+        manager.bins = result
+    manager.bin_area = sum(binn.x * binn.y for binn in manager.bins)
+    manager.items_placed = len(order)
+    manager.items_failed = len(failed)
+    manager.cursor = len(items)
+    manager.rejected = [items[index] for index in failed]
+    return {'bins': len(result),
+            'placed': len(order),
+            'failed': [items[index] for index in failed]}
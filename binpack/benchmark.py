@@ -0,0 +1,464 @@
+#!/usr/bin/env python
+"""
+Benchmark
+
+Runs a workload through every pack_algo/heuristic combination and
+records throughput, peak memory, bin counts and the gap to the lower
+bound on bins. Each run is saved as a JSON document together with a
+machine fingerprint, the git revision and the configuration it was
+produced with, so that two runs can later be compared for
+regressions. The parallel command times execute_parallel against a
+serial execute for bin_algos of cheap and costly bin selection, and
+the checkpoint command compares checkpoints with pickles of the same
+manager.
+
+Usage:
+    python -m binpack.benchmark run -o before.json
+    python -m binpack.benchmark compare before.json after.json
+    python -m binpack.benchmark parallel -o parallel.json --items 20000
+    python -m binpack.benchmark checkpoint -o checkpoint.json
+"""
+import argparse
+import hashlib
+import json
+import math
+import os
+import pickle
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from collections import namedtuple
+from typing import List, Optional, Tuple
+from . import binmanager
+from . import bounds
+from . import checkpoint
+from . import parallel
+from . import workload
+
+FORMAT_VERSION = 1
+
+HEURISTICS = ['next_fit', 'first_fit',
+              'best_width_fit', 'best_height_fit', 'best_area_fit',
+              'worst_width_fit', 'worst_height_fit', 'worst_area_fit']
+
+# Guillotine bins have no notion of an open shelf, so next_fit is
+# only benchmarked for shelf bins. Grid bins always place bottom left
+# whatever the heuristic.
+CONFIGS = ([('shelf', heuristic) for heuristic in HEURISTICS] +
+           [('guillotine', heuristic) for heuristic in HEURISTICS
+            if heuristic != 'next_fit'] +
+           [('grid', 'first_fit')])
+
+# (pack_algo, heuristic, bin_algo) timed serially and in parallel
+PARALLEL_CONFIGS = [('shelf', 'best_width_fit', 'bin_next_fit'),
+                    ('shelf', 'best_width_fit', 'bin_best_fit'),
+                    ('guillotine', 'best_area_fit', 'bin_next_fit'),
+                    ('guillotine', 'best_area_fit', 'bin_best_fit')]
+
+# Two sided 95% critical values of Student's t distribution for
+# 1 to 30 degrees of freedom. Larger samples use the normal value.
+T_CRITICAL = [12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306,
+              2.262, 2.228, 2.201, 2.179, 2.160, 2.145, 2.131, 2.120,
+              2.110, 2.101, 2.093, 2.086, 2.080, 2.074, 2.069, 2.064,
+              2.060, 2.056, 2.052, 2.048, 2.045, 2.042]
+
+Regression = namedtuple('Regression', ['pack_algo', 'heuristic', 'bin_algo',
+                                       'metric', 'old', 'new', 'change',
+                                       'significant'])
+
+
+def machine_fingerprint() -> dict:
+    """
+    Returns a description of the machine running the benchmark
+    """
+    info = {
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'cpu_count': os.cpu_count(),
+        }
+    digest = hashlib.sha1(json.dumps(info, sort_keys=True).encode('utf-8'))
+    info['id'] = digest.hexdigest()[:12]
+    return info
+
+
+def git_revision() -> Optional[str]:
+    """
+    Returns the git revision of the package source, suffixed with
+    '-dirty' when there are uncommitted changes. Returns None
+    outside of a git checkout.
+    """
+    cwd = os.path.dirname(os.path.abspath(__file__))
+    try:
+        revision = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=cwd,
+                                  stdout=subprocess.PIPE,
+                                  stderr=subprocess.DEVNULL,
+                                  universal_newlines=True, check=True)
+        status = subprocess.run(['git', 'status', '--porcelain',
+                                 '--untracked-files=no'], cwd=cwd,
+                                stdout=subprocess.PIPE,
+                                stderr=subprocess.DEVNULL,
+                                universal_newlines=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    result = revision.stdout.strip()
+    if status.stdout.strip():
+        result += '-dirty'
+    return result
+
+
+def _pack(dims: List[workload.Dimensions], config: dict) -> binmanager.BinManager:
+    manager = binmanager.BinManager(**config)
+    manager.add_items(*workload.to_items(dims))
+    manager.execute()
+    return manager
+
+
+def run_config(dims: List[workload.Dimensions], config: dict,
+               repeats: int = 5, lower_bound: int = 0) -> dict:
+    """
+    Benchmarks a single BinManager configuration on a workload.
+    The gap is the number of bins used above lower_bound.
+    """
+    throughput = [] # type: List[float]
+    for _ in range(repeats):
+        start = time.perf_counter()
+        manager = _pack(dims, config)
+        elapsed = time.perf_counter() - start
+        throughput.append(len(dims) / elapsed if elapsed else float('inf'))
+
+    # Tracing slows execution down, so memory gets its own run
+    tracemalloc.start()
+    try:
+        _pack(dims, config)
+        peak_memory = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    bin_area = sum(binn.x * binn.y for binn in manager.bins)
+    used_area = sum(i.x * i.y for binn in manager.bins for i in binn.items)
+    return {
+        'pack_algo': config['pack_algo'],
+        'heuristic': config['heuristic'],
+        'bin_algo': config['bin_algo'],
+        'throughput': throughput,
+        'peak_memory': peak_memory,
+        'bins': len(manager.bins),
+        'gap': len(manager.bins) - lower_bound,
+        'efficiency': used_area / bin_area if bin_area else 0.0,
+        }
+
+
+def run(dims: List[workload.Dimensions],
+        bin_width: int = 100,
+        bin_height: int = 50,
+        bin_algo: str = 'bin_best_fit',
+        configs: List[Tuple[str, str]] = None,
+        repeats: int = 5) -> dict:
+    """
+    Benchmarks every (pack_algo, heuristic) pair in configs and
+    returns a JSON serialisable run document
+    """
+    if configs is None:
+        configs = CONFIGS
+    lower_bound = bounds.lower_bound([w for w, h in dims], [h for w, h in dims],
+                                     bin_width, bin_height)
+    results = []
+    for pack_algo, heuristic in configs:
+        config = {'bin_width': bin_width,
+                  'bin_height': bin_height,
+                  'bin_algo': bin_algo,
+                  'pack_algo': pack_algo,
+                  'heuristic': heuristic}
+        results.append(run_config(dims, config, repeats, lower_bound))
+    return {
+        'version': FORMAT_VERSION,
+        'timestamp': time.time(),
+        'machine': machine_fingerprint(),
+        'revision': git_revision(),
+        'config': {'bin_width': bin_width,
+                   'bin_height': bin_height,
+                   'bin_algo': bin_algo,
+                   'items': len(dims),
+                   'repeats': repeats,
+                   'lower_bound': lower_bound},
+        'results': results,
+        }
+
+
+def run_parallel(dims: List[workload.Dimensions],
+                 bin_width: int = 100,
+                 bin_height: int = 50,
+                 configs: List[Tuple[str, str, str]] = None,
+                 workers: Optional[int] = None,
+                 min_work: int = parallel.MIN_WORK) -> dict:
+    """
+    Times execute against execute_parallel for every (pack_algo,
+    heuristic, bin_algo) in configs and returns a run document with
+    the seconds and bins of both and whether the job was sharded
+    """
+    if configs is None:
+        configs = PARALLEL_CONFIGS
+    results = []
+    for pack_algo, heuristic, bin_algo in configs:
+        config = {'bin_width': bin_width,
+                  'bin_height': bin_height,
+                  'bin_algo': bin_algo,
+                  'pack_algo': pack_algo,
+                  'heuristic': heuristic}
+        start = time.perf_counter()
+        serial = _pack(dims, config)
+        serial_seconds = time.perf_counter() - start
+        manager = binmanager.BinManager(**config)
+        manager.add_items(*workload.to_items(dims))
+        start = time.perf_counter()
+        result = manager.execute_parallel(workers, min_work=min_work)
+        results.append({'pack_algo': pack_algo,
+                        'heuristic': heuristic,
+                        'bin_algo': bin_algo,
+                        'work': parallel.estimated_work(manager),
+                        'sharded': result['shards'] > 1,
+                        'serial_seconds': serial_seconds,
+                        'parallel_seconds': time.perf_counter() - start,
+                        'serial_bins': len(serial.bins),
+                        'parallel_bins': len(manager.bins)})
+    return {
+        'version': FORMAT_VERSION,
+        'timestamp': time.time(),
+        'machine': machine_fingerprint(),
+        'revision': git_revision(),
+        'config': {'bin_width': bin_width,
+                   'bin_height': bin_height,
+                   'items': len(dims),
+                   'workers': workers,
+                   'min_work': min_work},
+        'results': results,
+        }
+
+
+def _best_time(function, repeats: int) -> float:
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def run_checkpoint(dims: List[workload.Dimensions],
+                   bin_width: int = 100,
+                   bin_height: int = 50,
+                   configs: List[Tuple[str, str]] = None,
+                   repeats: int = 10) -> dict:
+    """
+    Packs the workload with every (pack_algo, heuristic) in configs
+    and returns a run document with the size and the best dump and
+    load seconds of a checkpoint and of a pickle of the manager
+    """
+    if configs is None:
+        configs = [('guillotine', 'best_area_fit'),
+                   ('shelf', 'best_width_fit'),
+                   ('grid', 'bottom_left')]
+    results = []
+    for pack_algo, heuristic in configs:
+        manager = _pack(dims, {'bin_width': bin_width,
+                               'bin_height': bin_height,
+                               'pack_algo': pack_algo,
+                               'heuristic': heuristic})
+        data = checkpoint.dumps(manager)
+        pickled = pickle.dumps(manager, pickle.HIGHEST_PROTOCOL)
+        results.append({
+            'pack_algo': pack_algo,
+            'heuristic': heuristic,
+            'checkpoint_bytes': len(data),
+            'pickle_bytes': len(pickled),
+            'checkpoint_dump': _best_time(lambda: checkpoint.dumps(manager),
+                                          repeats),
+            'pickle_dump': _best_time(
+                lambda: pickle.dumps(manager, pickle.HIGHEST_PROTOCOL),
+                repeats),
+            'checkpoint_load': _best_time(lambda: checkpoint.loads(data),
+                                          repeats),
+            'pickle_load': _best_time(lambda: pickle.loads(pickled), repeats),
+            })
+    return {
+        'version': FORMAT_VERSION,
+        'timestamp': time.time(),
+        'machine': machine_fingerprint(),
+        'revision': git_revision(),
+        'config': {'bin_width': bin_width,
+                   'bin_height': bin_height,
+                   'items': len(dims),
+                   'repeats': repeats},
+        'results': results,
+        }
+
+
+def save(document: dict, path: str) -> None:
+    with open(path, 'w') as handle:
+        json.dump(document, handle, indent=2, sort_keys=True)
+
+
+def load(path: str) -> dict:
+    with open(path) as handle:
+        document = json.load(handle)
+    if document.get('version') != FORMAT_VERSION:
+        raise ValueError("Unsupported benchmark format version: %r"
+                         % document.get('version'))
+    return document
+
+
+def _t_critical(df: float) -> float:
+    if df < 1:
+        return T_CRITICAL[0]
+    if df > len(T_CRITICAL):
+        return 1.96
+    return T_CRITICAL[int(df) - 1]
+
+
+def welch_significant(old: List[float], new: List[float]) -> bool:
+    """
+    Welch's two sided t-test at the 95% level. Samples with fewer
+    than two values cannot be tested and are reported as significant
+    so that the relative threshold alone decides.
+    """
+    if len(old) < 2 or len(new) < 2:
+        return True
+    var_old = statistics.variance(old) / len(old)
+    var_new = statistics.variance(new) / len(new)
+    if var_old + var_new == 0:
+        return statistics.mean(old) != statistics.mean(new)
+    t_value = ((statistics.mean(new) - statistics.mean(old)) /
+               math.sqrt(var_old + var_new))
+    df = ((var_old + var_new) ** 2 /
+          ((var_old ** 2) / (len(old) - 1) + (var_new ** 2) / (len(new) - 1)))
+    return abs(t_value) > _t_critical(df)
+
+
+def compare(old: dict, new: dict, threshold: float = 0.05) -> List[Regression]:
+    """
+    Compares two run documents and returns one Regression record per
+    configuration and metric that got worse by more than threshold.
+    Throughput changes are also required to pass a Welch t-test.
+    """
+    key = lambda r: (r['pack_algo'], r['heuristic'], r['bin_algo'])
+    old_results = {key(r): r for r in old['results']}
+    regressions = [] # type: List[Regression]
+    for result in new['results']:
+        previous = old_results.get(key(result))
+        if previous is None:
+            continue
+
+        old_mean = statistics.mean(previous['throughput'])
+        new_mean = statistics.mean(result['throughput'])
+        change = (new_mean - old_mean) / old_mean if old_mean else 0.0
+        if change < -threshold:
+            significant = welch_significant(previous['throughput'],
+                                            result['throughput'])
+            regressions.append(Regression(*key(result), 'throughput',
+                                          old_mean, new_mean, change,
+                                          significant))
+
+        old_memory = previous['peak_memory']
+        new_memory = result['peak_memory']
+        change = (new_memory - old_memory) / old_memory if old_memory else 0.0
+        if change > threshold:
+            regressions.append(Regression(*key(result), 'peak_memory',
+                                          old_memory, new_memory, change,
+                                          True))
+    return regressions
+
+
+def _report(old: dict, new: dict, regressions: List[Regression]) -> str:
+    lines = []
+    if old['machine'].get('id') != new['machine'].get('id'):
+        lines.append('warning: runs were recorded on different machines')
+    lines.append('%s -> %s' % (old.get('revision'), new.get('revision')))
+    for reg in regressions:
+        lines.append('%-10s %-16s %-14s %-11s %12.1f -> %12.1f (%+.1f%%)%s'
+                     % (reg.pack_algo, reg.heuristic, reg.bin_algo,
+                        reg.metric, reg.old, reg.new, reg.change * 100,
+                        '' if reg.significant else ' not significant'))
+    if not regressions:
+        lines.append('no regressions')
+    return '\n'.join(lines)
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m binpack.benchmark')
+    commands = parser.add_subparsers(dest='command')
+
+    run_parser = commands.add_parser('run', help='benchmark every configuration')
+    run_parser.add_argument('-o', '--output', required=True)
+    run_parser.add_argument('--items', type=int, default=1000)
+    run_parser.add_argument('--input', help='load the workload from a file')
+    run_parser.add_argument('--width', type=int, default=100)
+    run_parser.add_argument('--height', type=int, default=50)
+    run_parser.add_argument('--bin-algo', default='bin_best_fit')
+    run_parser.add_argument('--repeats', type=int, default=5)
+    run_parser.add_argument('--seed', type=int, default=0)
+
+    compare_parser = commands.add_parser('compare', help='diff two runs')
+    compare_parser.add_argument('old')
+    compare_parser.add_argument('new')
+    compare_parser.add_argument('--threshold', type=float, default=0.05)
+
+    parallel_parser = commands.add_parser(
+        'parallel', help='time execute_parallel against execute')
+    parallel_parser.add_argument('-o', '--output', required=True)
+    parallel_parser.add_argument('--items', type=int, default=20000)
+    parallel_parser.add_argument('--width', type=int, default=100)
+    parallel_parser.add_argument('--height', type=int, default=50)
+    parallel_parser.add_argument('--workers', type=int)
+    parallel_parser.add_argument('--min-work', type=int,
+                                 default=parallel.MIN_WORK)
+    parallel_parser.add_argument('--seed', type=int, default=0)
+
+    checkpoint_parser = commands.add_parser(
+        'checkpoint', help='compare checkpoints with pickles')
+    checkpoint_parser.add_argument('-o', '--output', required=True)
+    checkpoint_parser.add_argument('--items', type=int, default=5000)
+    checkpoint_parser.add_argument('--width', type=int, default=100)
+    checkpoint_parser.add_argument('--height', type=int, default=50)
+    checkpoint_parser.add_argument('--repeats', type=int, default=10)
+    checkpoint_parser.add_argument('--seed', type=int, default=0)
+
+    args = parser.parse_args(argv)
+    if args.command == 'run':
+        if args.input:
+            dims = workload.load(args.input)
+        else:
+            dims = workload.generate(args.items, args.width, args.height,
+                                     seed=args.seed)
+        save(run(dims, args.width, args.height, args.bin_algo,
+                 repeats=args.repeats), args.output)
+        return 0
+    if args.command == 'compare':
+        old, new = load(args.old), load(args.new)
+        regressions = compare(old, new, args.threshold)
+        print(_report(old, new, regressions))
+        return 1 if any(r.significant for r in regressions) else 0
+    if args.command == 'parallel':
+        dims = workload.generate(args.items, args.width, args.height,
+                                 seed=args.seed)
+        save(run_parallel(dims, args.width, args.height,
+                          workers=args.workers, min_work=args.min_work),
+             args.output)
+        return 0
+    if args.command == 'checkpoint':
+        dims = workload.generate(args.items, args.width, args.height,
+                                 seed=args.seed)
+        save(run_checkpoint(dims, args.width, args.height,
+                            repeats=args.repeats), args.output)
+        return 0
+    parser.print_help()
+    return 2
+
+
+if __name__ == '__main__':
+    sys.exit(main())
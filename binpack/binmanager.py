@@ -7,14 +7,31 @@ creation and ranking of bins and returns layout dictionaries
 for packed bins.
 
 """
-from functools import reduce
-from typing import List, Union, Callable
+import math
+import threading
+import time
+from operator import attrgetter
+from typing import Dict, List, Optional, Union, Callable
 from . import item
 from . import shelf
 from . import guillotine
+from . import heuristics
+from . import grid
+from . import anytime
+from . import beam
+from . import parallel
+from . import bounds
+from . import checkpoint
+from .catalog import BinCatalog
+from .instrument import Instrument
+from .remnants import Remnant, RemnantInventory
 
 # Type Aliases:
-Algorithm = Union[shelf.Sheet, guillotine.Guillotine]
+Algorithm = Union[shelf.Sheet, guillotine.Guillotine, grid.Grid]
+
+_area = attrgetter('area')
+_available_width = attrgetter('available_width')
+_free_area = attrgetter('free_area')
 
 
 class BinManager:
@@ -27,31 +44,88 @@ class BinManager:
                  pack_algo: str = 'guillotine',
                  heuristic: str ='best_width_fit',
                  sorting: bool = True,
-                 rotation: bool = True) -> None:
+                 rotation: bool = True,
+                 instrument: Optional[Instrument] = None,
+                 wastemap: bool = False,
+                 catalog: Optional[BinCatalog] = None,
+                 remnants: Optional[RemnantInventory] = None) -> None:
+        self.instrument = instrument
         self.bin_width = bin_width
         self.bin_height = bin_height
         self.items = [] # type: List[item.Item]
         self.bin_count = 0
+        # Running totals maintained as bins open and items are placed
+        self.bin_area = 0
+        self.used_area = 0
+        self.items_placed = 0
+        self.items_failed = 0
+        self.bin_algo = bin_algo
         if bin_algo == 'bin_best_fit':
             self.bin_sel_algo = self._bin_best_fit
         elif bin_algo == 'bin_first_fit':
             self.bin_sel_algo =  self._bin_first_fit
+        elif bin_algo == 'bin_next_fit':
+            self.bin_sel_algo = self._bin_next_fit
+        else:
+            raise ValueError("Unknown bin_algo %r" % bin_algo)
+        # Raises ValueError for unknown names before any bin exists
+        self.strategy = heuristics.resolve(pack_algo, heuristic)
         self.heuristic = heuristic
         self.algorithm = pack_algo
-        defaultBin = self._bin_factory(self.bin_width,
-                                           self.bin_height,
-                                           self.algorithm,
-                                           self.heuristic) # type: Algorithm
-        self.bins = [defaultBin] # type: List[Algorithm]
         self.sorting = sorting
         self.rotation = rotation
+        self.wastemap = wastemap
+        # Cell size of grid bins, see _scale_grids
+        self.grid_scale = 1
+        # Bin cap of the current execute run, see _new_bin
+        self.max_bins = None # type: Optional[int]
+        # Items before cursor have been attempted, rejected are those
+        # no bin accepted
+        self.cursor = 0
+        self.rejected = [] # type: List[item.Item]
+        # Sheet sizes to open bins from instead of bin_width by
+        # bin_height, see _new_bin. Bins are then only opened for an
+        # item, so the manager starts without any.
+        self.catalog = catalog
+        self.bin_cost = 0
+        self.item_area = 0
+        # Offcuts to cut before fresh sheets, and id(bin) -> the
+        # remnant each bin was opened on
+        self.remnants = remnants
+        self.remnant_of = {} # type: Dict[int, Remnant]
+        self.bins = [] # type: List[Algorithm]
+        if catalog is None and remnants is None:
+            defaultBin = self._bin_factory(self.bin_width,
+                                               self.bin_height,
+                                               self.algorithm,
+                                               self.heuristic) # type: Algorithm
+            self.bins.append(defaultBin)
+            self.bin_area += defaultBin.x * defaultBin.y
+
+
+    def config(self) -> dict:
+        """
+        Returns the constructor arguments of this manager
+        """
+        return {'bin_width': self.bin_width,
+                'bin_height': self.bin_height,
+                'bin_algo': self.bin_algo,
+                'pack_algo': self.algorithm,
+                'heuristic': self.heuristic,
+                'sorting': self.sorting,
+                'rotation': self.rotation,
+                'wastemap': self.wastemap}
 
 
     def add_items(self, *items: item.Item) -> bool:
         for item in items:
             self.items.append(item)
+            self.item_area += item.x * item.y
         if self.sorting:
-            self.items.sort(key=lambda el: el.x*el.y, reverse=True)
+            # Only items execute has not reached yet are reordered
+            self.items[self.cursor:] = sorted(self.items[self.cursor:],
+                                              key=lambda el: el.x*el.y,
+                                              reverse=True)
 
 
     def _bin_factory(self, width: int, height: int, algo: str, heuristic: str) -> Algorithm:
@@ -59,47 +133,155 @@ class BinManager:
         Returns a bin with the desired algorithm,
         heuristic, and dimensions
         """
+        if self.instrument is not None:
+            self.instrument.record('bins_opened', pack_algo=algo,
+                                   heuristic=heuristic)
         if algo == 'guillotine':
-            return guillotine.Guillotine(width, height)
+            return guillotine.Guillotine(width, height, self.rotation,
+                                         instrument=self.instrument,
+                                         heuristic=heuristic)
         elif algo == 'shelf':
-            return shelf.Sheet(width, height)
+            return shelf.Sheet(width, height, self.rotation,
+                               instrument=self.instrument,
+                               wastemap=self.wastemap,
+                               heuristic=heuristic)
+        elif algo == 'grid':
+            return grid.Grid(width, height, self.rotation,
+                             instrument=self.instrument,
+                             scale=self.grid_scale)
         return
 
 
-    def _bin_first_fit(self, item: item.Item) -> None:
+    def _new_bin(self, item: Optional[item.Item] = None) -> Optional[Algorithm]:
+        """
+        Opens a new empty bin, or returns None when max_bins are open.
+        A remnant that holds item is used first. With a catalog the
+        bin is the catalog's choice for item, and None is returned
+        when no size in stock holds it.
+        """
+        if self.max_bins is not None and len(self.bins) >= self.max_bins:
+            return None
+        remnant = (self.remnants.take(item.x, item.y, self.rotation)
+                   if self.remnants is not None and item is not None
+                   else None)
+        if remnant is not None:
+            width, height = remnant.width, remnant.height
+        elif self.catalog is None:
+            width, height = self.bin_width, self.bin_height
+        else:
+            # Item area not yet placed, unknown for items never added
+            demand = (self.item_area - self.used_area
+                      if self.item_area > self.used_area else None)
+            entry = (self.catalog.choose(item.x, item.y, self.rotation, demand)
+                     if item is not None else
+                     self.catalog.choose(0, 0, self.rotation, demand))
+            if entry is None:
+                return None
+            self.catalog.take(entry)
+            self.bin_cost += entry.cost
+            width, height = entry.width, entry.height
+        binn = self._bin_factory(width, height,
+                                 self.algorithm,
+                                 self.heuristic)
+        if remnant is not None:
+            self.remnant_of[id(binn)] = remnant
+        self.bins.append(binn)
+        self.bin_area += binn.x * binn.y
+        return binn
+
+
+    def _open_bin(self, item: item.Item) -> bool:
+        """
+        Opens a new bin and inserts the item into it. A bin that
+        rejects the item is dropped again, as an item an empty bin
+        rejects fits no bin. Catalog sheets are chosen to hold the item.
+        """
+        binn = self._new_bin(item)
+        if binn is None:
+            return False
+        if binn.insert(item):
+            return True
+        self.bins.pop()
+        self.bin_area -= binn.x * binn.y
+        remnant = self.remnant_of.pop(id(binn), None)
+        if remnant is not None:
+            self.remnants.restore(remnant)
+        return False
+
+
+    def _bin_next_fit(self, item: item.Item) -> bool:
+        """
+        Insert into the last bin, or a new one if it does not fit
+        """
+        if not self.bins:
+            return self._open_bin(item)
+        binn = self.bins[-1]
+        if binn.insert(item):
+            return True
+        # An item an empty bin rejects fits no bin
+        return bool(binn.items) and self._open_bin(item)
+
+
+    def _fill_bins(self) -> List[item.Item]:
+        """
+        Next fit over bins in batches: each bin is filled with one
+        insert_many call up to the first item it rejects, which then
+        opens the next bin. Returns the items left unplaced.
+        """
+        items = self.items
+        unplaced = [] # type: List[item.Item]
+        index = self.cursor
+        while index < len(items):
+            binn = self.bins[-1]
+            placed, end = binn.insert_many(items, start=index)
+            self.items_placed += placed
+            self.used_area += sum(i.x * i.y for i in items[index:end])
+            index = end
+            if index == len(items):
+                break
+            if not binn.items or self._new_bin() is None:
+                self.items_failed += 1
+                unplaced.append(items[index])
+                index += 1
+        self.cursor = len(items)
+        return unplaced
+
+
+    def _bin_first_fit(self, item: item.Item) -> bool:
         """
         Insert into the first bin that fits the item
         """
         for binn in self.bins:
-            result = binn.insert(item, self.heuristic)
-            if result:
-                break
-        if not result:
-            self.bins.append(self._bin_factory(self.bin_width,
-                                               self.bin_height,
-                                               self.algorithm,
-                                               self.heuristic))
-            self.bins[-1].insert(item, self.heuristic)
+            if self.instrument is not None:
+                self.instrument.record('bins_probed')
+            if binn.insert(item):
+                return True
+        return self._open_bin(item)
 
 
-    def _bin_best_fit(self, item: item.Item) -> None:
+    def _bin_best_fit(self, item: item.Item) -> bool:
         """
         Insert into the bin that best fits the item
         """
-        if item.x > self.bin_width or item.y > self.bin_height:
-            return "Error! item too big for bins"
+        if self.catalog is None and (item.x > self.bin_width or
+                                     item.y > self.bin_height):
+            return False
 
         best_rect = None # type: Union[guillotine.FreeRectangle, shelf.Shelf]
         best_bin_index = None # type: int
+        if self.instrument is not None:
+            self.instrument.record('bins_probed', len(self.bins))
         if self.algorithm == 'guillotine':
             for i, binn in enumerate(self.bins):
+                if self.instrument is not None:
+                    self.instrument.record('freerects_scanned',
+                                           len(binn.freerects))
                 fitted_rects = [rect for rect
                                 in binn.freerects
                                 if rect.width >= item.x
                                 and rect.height >= item.y]
                 if fitted_rects:
-                    compare = lambda a, b: a if a.area > b.area else b
-                    best_in_bin = reduce(compare, fitted_rects)
+                    best_in_bin = max(reversed(fitted_rects), key=_area)
                     if not best_rect:
                         best_rect = best_in_bin
                         best_bin_index = i
@@ -108,9 +290,15 @@ class BinManager:
                         best_bin_index = i
 
             if best_rect:
-                self.bins[i].insert(item, self.heuristic)
-                return
+                if self.bins[best_bin_index].insert(item):
+                    return True
+
 
+        if self.algorithm == 'grid':
+            # Fullest bins first keeps the emptier ones for large items
+            for binn in sorted(self.bins, key=_free_area):
+                if binn.insert(item):
+                    return True
 
         if self.algorithm == 'shelf':
             bin_scores = [] # type: List[tuple]
@@ -118,8 +306,11 @@ class BinManager:
                 if binn.shelves == []:
                     bin_scores.append((binn.x - item.x, i))
                 else:
+                    # Next fit only ever fills the open shelf
+                    shelves = (binn.shelves[-1:] if self.strategy.open_shelf
+                               else binn.shelves)
                     fitted_shelves = [shelf for shelf
-                                      in binn.shelves
+                                      in shelves
                                       if shelf.available_width >= item.x
                                       and shelf.y >= item.y]
                     # This checks rotation fits if no regular fits.
@@ -127,36 +318,307 @@ class BinManager:
                     # to find actual best fit
                     if not fitted_shelves and self.rotation:
                         fitted_shelves = [shelf for shelf
-                                          in binn.shelves
+                                          in shelves
                                           if shelf.available_width >= item.y
                                           and shelf.y >= item.x]
                         if fitted_shelves:
                             item.rotate()
                     if fitted_shelves:
-                        compare = lambda a, b: a if (a.available_width <
-                                                     b.available_width) else b
-                        best_shelf = reduce(compare, fitted_shelves)
+                        best_shelf = min(reversed(fitted_shelves),
+                                         key=_available_width)
                         bin_scores.append((best_shelf.available_width - item.x, i))
+                        continue
+                    gap = (binn.wastemap.find(item.x, item.y)
+                           if binn.wastemap is not None else None)
+                    if gap is not None:
+                        bin_scores.append((gap.width - item.x, i))
                     elif binn.available_height >= item.y:
                         bin_scores.append((binn.x - item.x, i))
             if bin_scores:
                 best_bin_index = min(bin_scores)[1]
-                self.bins[best_bin_index].insert(item, self.heuristic)
-                return
-        self.bins.append(self._bin_factory(self.bin_width,
-                                           self.bin_height,
-                                           self.algorithm,
-                                           self.heuristic))
-        self.bins[-1].insert(item, self.heuristic)
-        return
+                if self.bins[best_bin_index].insert(item):
+                    return True
+        return self._open_bin(item)
 
 
-    def execute(self) -> None:
+    def _scale_grids(self) -> None:
         """
-        Loop over all items and attempt insertion
+        Sets the grid cell size to the GCD of the bin and item
+        dimensions and rescales grid bins that are still empty
         """
+        scale = math.gcd(self.bin_width, self.bin_height)
+        if self.catalog is not None:
+            scale = 0
+            for entry in self.catalog.stock:
+                scale = math.gcd(scale, math.gcd(entry.width, entry.height))
         for item in self.items:
-            self.bin_sel_algo(item)
+            scale = math.gcd(scale, math.gcd(item.x, item.y))
+        self.grid_scale = max(1, scale)
+        for binn in self.bins:
+            if not binn.items:
+                binn.rescale(self.grid_scale)
+
+
+    def _progress(self, placed: int, elapsed: float) -> dict:
+        return {'placed': placed,
+                'bins': len(self.bins),
+                'elapsed': elapsed}
+
+
+    def execute(self, time_limit: Optional[float] = None,
+                max_bins: Optional[int] = None,
+                cancel: Optional[threading.Event] = None,
+                progress: Optional[Callable[[dict], None]] = None,
+                progress_interval: float = 0.5,
+                checkpoint_path: Optional[str] = None,
+                checkpoint_interval: float = 60.0) -> dict:
+        """
+        Loop over the items not yet attempted and attempt insertion.
+
+        The run stops before the next item once time_limit seconds
+        have passed or cancel (set from any thread) is set, and never
+        opens more than max_bins bins. progress receives the items
+        placed, bins open and seconds elapsed at most every
+        progress_interval seconds and once at the end. With a
+        checkpoint_path the state is saved there every
+        checkpoint_interval seconds and when the run ends, and a
+        manager restored with resume continues from the last save.
+        Managers that cannot be checkpointed raise ValueError before
+        any item is packed.
+
+        Returns whether the run completed, why it stopped early
+        ('time_limit' or 'cancelled'), the number of items placed and
+        the unplaced items: those rejected by every bin followed by
+        those never attempted.
+        """
+        if max_bins is not None and max_bins < 1:
+            raise ValueError("max_bins must be at least 1")
+        if checkpoint_path is not None:
+            self._single_size('checkpoint')
+        self.max_bins = max_bins
+        start = time.perf_counter()
+        if self.algorithm == 'grid':
+            self._scale_grids()
+        budgeted = (time_limit is not None or cancel is not None or
+                    progress is not None or checkpoint_path is not None)
+        placed_before = self.items_placed
+        stopped = None
+        if (self.bin_algo == 'bin_next_fit' and self.instrument is None
+                and self.catalog is None and self.remnants is None
+                and not budgeted):
+            self.rejected.extend(self._fill_bins())
+        else:
+            stopped = self._execute_items(start, time_limit, cancel,
+                                          progress, progress_interval,
+                                          checkpoint_path, checkpoint_interval)
+        unplaced = self.rejected + self.items[self.cursor:]
+        self.max_bins = None
+        if checkpoint_path is not None:
+            self.checkpoint(checkpoint_path)
+        placed = self.items_placed - placed_before
+        elapsed = time.perf_counter() - start
+        if progress is not None:
+            progress(self._progress(placed, elapsed))
+        return {'complete': stopped is None,
+                'stopped': stopped,
+                'placed': placed,
+                'unplaced': unplaced,
+                'bins': len(self.bins),
+                'elapsed': elapsed}
+
+
+    def _execute_items(self, start: float,
+                       time_limit: Optional[float],
+                       cancel: Optional[threading.Event],
+                       progress: Optional[Callable[[dict], None]],
+                       progress_interval: float,
+                       checkpoint_path: Optional[str] = None,
+                       checkpoint_interval: float = 60.0) -> Optional[str]:
+        """
+        Inserts items one at a time from the cursor on, checking the
+        budget before each. Returns why the run stopped, if early.
+        """
+        deadline = start + time_limit if time_limit is not None else None
+        budgeted = (deadline is not None or cancel is not None or
+                    progress is not None or checkpoint_path is not None)
+        next_report = start + progress_interval
+        next_checkpoint = start + checkpoint_interval
+        placed_before = self.items_placed
+        for index in range(self.cursor, len(self.items)):
+            item = self.items[index]
+            if budgeted:
+                now = time.perf_counter()
+                if deadline is not None and now >= deadline:
+                    self.cursor = index
+                    return 'time_limit'
+                if cancel is not None and cancel.is_set():
+                    self.cursor = index
+                    return 'cancelled'
+                if progress is not None and now >= next_report:
+                    progress(self._progress(self.items_placed - placed_before,
+                                            now - start))
+                    next_report = now + progress_interval
+                if checkpoint_path is not None and now >= next_checkpoint:
+                    self.cursor = index
+                    self.checkpoint(checkpoint_path)
+                    next_checkpoint = time.perf_counter() + checkpoint_interval
+            if self.instrument is not None:
+                item_start = time.perf_counter()
+                placed = self.bin_sel_algo(item)
+                self.instrument.record('items',
+                                       seconds=time.perf_counter() - item_start,
+                                       placed=placed,
+                                       pack_algo=self.algorithm,
+                                       heuristic=self.heuristic)
+            else:
+                placed = self.bin_sel_algo(item)
+            if placed:
+                self.items_placed += 1
+                self.used_area += item.x * item.y
+            else:
+                self.items_failed += 1
+                self.rejected.append(item)
+        self.cursor = len(self.items)
+        return None
+
+
+    def _single_size(self, method: str) -> None:
+        if self.catalog is not None or self.remnants is not None:
+            raise ValueError("%s needs bins of one size, without a "
+                             "catalog or remnants" % method)
+
+
+    def release_remnants(self) -> int:
+        """
+        Ends the job for the remnant inventory: the free rectangles of
+        every guillotine bin holding items become remnants, and the
+        remnants of bins left empty are put back whole and their bins
+        dropped. Returns the number of remnants added.
+        """
+        if self.remnants is None:
+            raise ValueError("The manager has no remnant inventory")
+        added = 0
+        kept = []
+        for binn in self.bins:
+            if not binn.items:
+                remnant = self.remnant_of.pop(id(binn), None)
+                if remnant is not None:
+                    self.remnants.restore(remnant)
+                    self.bin_area -= binn.x * binn.y
+                    continue
+            elif isinstance(binn, guillotine.Guillotine):
+                for rect in binn.freerects:
+                    if self.remnants.add(rect.width, rect.height) is not None:
+                        added += 1
+                # The space now belongs to the inventory
+                binn.freerects = []
+                binn.free_area = 0
+            kept.append(binn)
+        self.bins = kept
+        return added
+
+
+    def checkpoint(self, path: str) -> int:
+        """
+        Saves the state of this manager to path. Returns the size of
+        the checkpoint in bytes. See checkpoint.save.
+        """
+        self._single_size('checkpoint')
+        return checkpoint.save(self, path)
+
+
+    @classmethod
+    def resume(cls, path: str,
+               instrument: Optional[Instrument] = None) -> 'BinManager':
+        """
+        Restores a manager from the checkpoint at path; execute then
+        continues with the items the saved run had not reached
+        """
+        return checkpoint.load(path, instrument, cls)
+
+
+    def lower_bound(self) -> int:
+        """
+        Returns a lower bound on the number of bins needed for the
+        items added so far. See bounds.lower_bound.
+        """
+        if self.catalog is not None or self.remnants is not None:
+            # Mixed sizes: no fewer bins than the largest sheets need
+            if self.catalog is not None:
+                areas = [entry.area for entry in self.catalog.stock]
+            else:
+                areas = [self.bin_width * self.bin_height]
+                areas.extend(remnant.area for remnant in self.remnants)
+                areas.extend(remnant.area for remnant in self.remnant_of.values())
+            return bounds.l0([i.x for i in self.items],
+                             [i.y for i in self.items], max(areas), 1)
+        width, height = self.bin_width, self.bin_height
+        if self.algorithm == 'shelf':
+            # Sheets lie with their long side as the width
+            width, height = max(width, height), min(width, height)
+        return bounds.lower_bound([i.x for i in self.items],
+                                  [i.y for i in self.items],
+                                  width, height, self.rotation)
+
+
+    def improve(self, time_limit: float = 1.0, **options) -> dict:
+        """
+        Spends up to time_limit seconds re-packing the least filled
+        bins with perturbed item orders, keeping the best layout.
+        See anytime.improve for the options.
+        """
+        self._single_size('improve')
+        return anytime.improve(self, time_limit, **options)
+
+
+    def execute_beam(self, beam_width: int = 8) -> dict:
+        """
+        Packs all items with a beam search that keeps beam_width
+        partial layouts instead of committing greedily, and replaces
+        the bins with the best layout found. See beam.beam_pack.
+        """
+        self._single_size('execute_beam')
+        return beam.beam_pack(self, beam_width)
+
+
+    def execute_parallel(self, workers: Optional[int] = None,
+                         shards: Optional[int] = None,
+                         by: str = 'random', **options) -> dict:
+        """
+        Packs all items in shards ('random' or by 'size' class) across
+        worker processes, then re-packs the least filled bins of all
+        shards together. See parallel.parallel_pack.
+        """
+        self._single_size('execute_parallel')
+        return parallel.parallel_pack(self, workers, shards, by, **options)
+
+
+    def stats(self, per_bin: bool = False) -> dict:
+        """
+        Returns aggregate totals for all bins from running counters.
+        With per_bin the used and free area of every bin is included.
+        """
+        stats = {
+            'bins': len(self.bins),
+            'area': self.bin_area,
+            'used_area': self.used_area,
+            'waste': self.bin_area - self.used_area,
+            'efficiency': self.used_area/self.bin_area if self.bin_area else 0.0,
+            'items_placed': self.items_placed,
+            'items_failed': self.items_failed,
+            }
+        if self.catalog is not None:
+            stats['cost'] = self.bin_cost
+        if self.remnants is not None:
+            stats['remnants_used'] = len(self.remnant_of)
+        if per_bin:
+            stats['per_bin'] = [{'width': binn.x,
+                                 'height': binn.y,
+                                 'used_area': binn.used_area,
+                                 'free_area': binn.free_area,
+                                 'items': len(binn.items)}
+                                for binn in self.bins]
+        return stats
 
 
 if __name__ == '__main__':
@@ -0,0 +1,196 @@
+#!/usr/bin/env python
+"""
+Lower Bounds
+
+Lower bounds on the number of bins needed for a set of items, in the
+style of Martello and Vigo's L1/L2 bounds for two dimensional bin
+packing. Items are given as parallel width and height sequences
+(lists, array.array or any other indexable column) and every bound
+is computed from sorted copies of those columns with prefix sums and
+binary search instead of per item loops over candidate thresholds.
+
+    L0  continuous bound: total item area over bin area
+    L1  one dimensional bounds on the items that cannot be stacked
+    L2  large items plus the area of the items that cannot share
+        their bins, maximised over size thresholds p and q
+
+When rotation is allowed only orientation independent arguments are
+used, so the bounds stay valid for either orientation of every item.
+"""
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+from typing import List, Sequence, Tuple
+
+
+def _ceil_div(numerator, denominator) -> int:
+    return int(-(-numerator // denominator))
+
+
+def _fitting(widths: Sequence[int], heights: Sequence[int],
+             bin_width: int, bin_height: int,
+             rotation: bool) -> Tuple[List[int], List[int]]:
+    """
+    Drops items that do not fit an empty bin at all
+    """
+    fit_w, fit_h = [], []
+    for w, h in zip(widths, heights):
+        if ((w <= bin_width and h <= bin_height) or
+                (rotation and h <= bin_width and w <= bin_height)):
+            fit_w.append(w)
+            fit_h.append(h)
+    return fit_w, fit_h
+
+
+def l0(widths: Sequence[int], heights: Sequence[int],
+       bin_width: int, bin_height: int) -> int:
+    """
+    Continuous lower bound
+    """
+    area = sum(w * h for w, h in zip(widths, heights))
+    return _ceil_div(area, bin_width * bin_height)
+
+
+def _one_dimensional(sizes: List[int], capacity: int) -> int:
+    """
+    Martello and Toth's L2 bound for one dimensional bin packing
+    """
+    if not sizes:
+        return 0
+    sizes = sorted(sizes)
+    prefix = [0] + list(accumulate(sizes))
+    n = len(sizes)
+
+    half = capacity / 2
+    middle = bisect_right(sizes, half)
+    alphas = [0] + sorted(set(sizes[:middle]))
+    best = 0
+    for alpha in alphas:
+        # J1 > C - alpha >= J2 > C / 2 >= J3 >= alpha
+        top = bisect_right(sizes, capacity - alpha)
+        j1 = n - top
+        j2, j2_sum = top - middle, prefix[top] - prefix[middle]
+        j3_sum = prefix[middle] - prefix[bisect_left(sizes, alpha)]
+        spare = j2 * capacity - j2_sum
+        best = max(best, j1 + j2 + max(0, _ceil_div(j3_sum - spare, capacity)))
+    return best
+
+
+def _big(w: int, h: int, bin_width: int, bin_height: int,
+         rotation: bool) -> bool:
+    """
+    True when the item exceeds half the bin on both sides in every
+    orientation that fits, so no two such items can share a bin
+    """
+    orientations = [(w, h), (h, w)] if rotation else [(w, h)]
+    return all(a > bin_width / 2 and b > bin_height / 2
+               for a, b in orientations
+               if a <= bin_width and b <= bin_height)
+
+
+def l1(widths: Sequence[int], heights: Sequence[int],
+       bin_width: int, bin_height: int, rotation: bool = False) -> int:
+    """
+    Items taller than half the bin cannot be stacked, so their widths
+    form a one dimensional problem (and likewise for wide items).
+    With rotation only the count of large items is used.
+    """
+    if rotation:
+        return sum(1 for w, h in zip(widths, heights)
+                   if _big(w, h, bin_width, bin_height, True))
+    tall = [w for w, h in zip(widths, heights) if h > bin_height / 2]
+    wide = [h for w, h in zip(widths, heights) if w > bin_width / 2]
+    return max(_one_dimensional(tall, bin_width),
+               _one_dimensional(wide, bin_height))
+
+
+class _Fenwick:
+    def __init__(self, size: int) -> None:
+        self.tree = [0] * (size + 1)
+
+
+    def add(self, index: int, value) -> None:
+        index += 1
+        while index < len(self.tree):
+            self.tree[index] += value
+            index += index & -index
+
+
+    def prefix(self, index: int):
+        # sum of positions [0, index)
+        total = 0
+        while index > 0:
+            total += self.tree[index]
+            index -= index & -index
+        return total
+
+
+def l2(widths: Sequence[int], heights: Sequence[int],
+       bin_width: int, bin_height: int, rotation: bool = False) -> int:
+    """
+    Every large item needs its own bin. A large item wider than
+    W - p and taller than H - q leaves no room for items at least p
+    wide and q tall, so those items must go into the remaining space
+    of the other large items' bins or into new bins.
+    """
+    bin_area = bin_width * bin_height
+    big, small = [], []
+    for w, h in zip(widths, heights):
+        if _big(w, h, bin_width, bin_height, rotation):
+            big.append((w, h))
+        else:
+            small.append((w, h))
+    if rotation:
+        spare = len(big) * bin_area - sum(w * h for w, h in big)
+        small_area = sum(w * h for w, h in small)
+        return len(big) + max(0, _ceil_div(small_area - spare, bin_area))
+
+    ps = [0] + sorted(set(w for w, h in small if w <= bin_width / 2))
+    qs = [0] + sorted(set(h for w, h in small if h <= bin_height / 2))
+
+    # Small items enter the tree in order of decreasing width so that
+    # at threshold p it holds exactly the items at least p wide,
+    # indexed by how many q thresholds their height reaches.
+    small.sort(reverse=True)
+    tree = _Fenwick(len(qs))
+    big_area = sum(w * h for w, h in big)
+    best = 0
+    cursor = 0
+    for p in reversed(ps):
+        while cursor < len(small) and small[cursor][0] >= p:
+            w, h = small[cursor]
+            tree.add(bisect_right(qs, h) - 1, w * h)
+            cursor += 1
+        total = tree.prefix(len(qs))
+        # large items too wide to leave a p wide strip, by height
+        rows = sorted((h, w * h) for w, h in big if w > bin_width - p)
+        blocking = [h for h, area in rows]
+        blocking_area = [0] + list(accumulate(area for h, area in rows))
+        for k, q in enumerate(qs):
+            # I3: small items at least p wide and q tall
+            i3_area = total - tree.prefix(k)
+            # I1: large items that also leave no q tall strip
+            first = bisect_right(blocking, bin_height - q)
+            i1_area = blocking_area[-1] - blocking_area[first]
+            i1 = len(blocking) - first
+            i2 = len(big) - i1
+            spare = i2 * bin_area - (big_area - i1_area)
+            best = max(best, len(big) +
+                       max(0, _ceil_div(i3_area - spare, bin_area)))
+    return best
+
+
+def lower_bound(widths: Sequence[int], heights: Sequence[int],
+                bin_width: int, bin_height: int,
+                rotation: bool = True) -> int:
+    """
+    Returns the best of the L0, L1 and L2 bounds. Items that cannot
+    fit an empty bin are ignored.
+    """
+    widths, heights = _fitting(widths, heights, bin_width, bin_height,
+                               rotation)
+    if not widths:
+        return 0
+    return max(1,
+               l0(widths, heights, bin_width, bin_height),
+               l1(widths, heights, bin_width, bin_height, rotation),
+               l2(widths, heights, bin_width, bin_height, rotation))
@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+"""
+Bin Catalog
+
+The sheet sizes a BinManager may open, each with a cost and an
+optional number in stock. When an item needs a new bin the manager
+asks the catalog for the size to open.
+
+The choice minimises the cost per area the new bin is expected to
+use. While more item area remains to be packed than a sheet holds,
+that is its cost per area; a sheet larger than the remaining demand
+can only ever fill demand of it, so its cost is spread over the
+demand instead. Large cheap sheets win for the bulk of a job and
+small sheets for what is left at its end.
+
+Entries are indexed by their long side, so the entries an item fits
+are found by bisection and a scan of the short sides. The fitting
+entries of each item size are kept in cost per area and in cost
+order, so repeated sizes cost a lookup and the first entry in stock
+of each order, however long the catalog.
+"""
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class Stock:
+    """
+    One size of sheet in the catalog. count is the number in stock,
+    or None for an unlimited supply.
+    """
+    def __init__(self, width: int, height: int, cost: float,
+                 count: Optional[int] = None,
+                 name: Optional[str] = None) -> None:
+        if width < 1 or height < 1:
+            raise ValueError("Stock sizes must be positive")
+        if count is not None and count < 0:
+            raise ValueError("Stock count cannot be negative")
+        self.width = width
+        self.height = height
+        self.cost = cost
+        self.count = count
+        self.name = name
+        self.area = width * height
+        self.opened = 0
+
+
+    def __repr__(self) -> str:
+        return "Stock(%r, %r, cost=%r, count=%r)" % (self.width, self.height,
+                                                      self.cost, self.count)
+
+
+    def available(self) -> bool:
+        return self.count is None or self.opened < self.count
+
+
+class BinCatalog:
+    """
+    Sheet sizes to choose new bins from
+    """
+    def __init__(self, stock: Iterable[Stock] = ()) -> None:
+        self.stock = [] # type: List[Stock]
+        for entry in stock:
+            self.add(entry)
+
+
+    def __repr__(self) -> str:
+        return "BinCatalog(%r)" % self.stock
+
+
+    def add(self, entry: Stock) -> Stock:
+        self.stock.append(entry)
+        # (long side, short side, entry) in long side order
+        self.index = sorted(((max(s.width, s.height),
+                              min(s.width, s.height), s) for s in self.stock),
+                            key=lambda key: key[:2])
+        self.long_sides = [key[0] for key in self.index]
+        self.memo = {} # type: Dict[tuple, Tuple[List[Stock], List[Stock]]]
+        return entry
+
+
+    def _candidates(self, width: int, height: int,
+                    rotation: bool) -> Tuple[List[Stock], List[Stock]]:
+        """
+        Returns the entries a width by height item fits, in cost per
+        area order and in cost order, smaller entries first on ties
+        """
+        key = (width, height, rotation)
+        if key not in self.memo:
+            if rotation:
+                long_side, short_side = max(width, height), min(width, height)
+                fitting = [s for l, sh, s
+                           in self.index[bisect_left(self.long_sides, long_side):]
+                           if sh >= short_side]
+            else:
+                fitting = [s for s in self.stock
+                           if s.width >= width and s.height >= height]
+            self.memo[key] = (
+                sorted(fitting, key=lambda s: (s.cost / s.area, s.area)),
+                sorted(fitting, key=lambda s: (s.cost, s.area)))
+        return self.memo[key]
+
+
+    def fits(self, width: int, height: int, rotation: bool = True) -> bool:
+        """
+        True when some entry in stock holds a width by height item
+        """
+        return any(s.available() for s in
+                   self._candidates(width, height, rotation)[0])
+
+
+    def choose(self, width: int, height: int, rotation: bool = True,
+               demand: Optional[int] = None) -> Optional[Stock]:
+        """
+        Returns the entry in stock with the lowest cost per area used
+        that holds a width by height item, or None. demand is the item
+        area still to be packed, when known.
+        """
+        by_rate, by_cost = self._candidates(width, height, rotation)
+        best = None
+        for entry in by_rate:
+            if entry.available() and (demand is None or entry.area <= demand):
+                best = entry
+                break
+        if demand is not None:
+            for entry in by_cost:
+                if entry.available() and entry.area > demand:
+                    if best is None or entry.cost * best.area < best.cost * demand:
+                        best = entry
+                    break
+        return best
+
+
+    def take(self, entry: Stock) -> None:
+        """
+        Takes one sheet of entry out of stock
+        """
+        if not entry.available():
+            raise ValueError("%r is out of stock" % entry)
+        entry.opened += 1
+
+
+    def cost(self) -> float:
+        """
+        Returns the cost of every sheet taken so far
+        """
+        return sum(entry.cost * entry.opened for entry in self.stock)
@@ -0,0 +1,298 @@
+#!/usr/bin/env python
+"""
+Distributed Packing
+
+A coordinator hands out packing jobs, each a BinManager configuration
+and a list of item dimensions, to worker processes over TCP. Workers
+may run on any machine that can reach the coordinator; tests run them
+all on localhost.
+
+Messages are length prefixed frames: a 4 byte big endian length,
+then one byte of message kind and a compact JSON body.
+
+    READY   worker asks for a job
+    JOB     coordinator sends a job (or holds the reply until one
+            is available)
+    RESULT  worker returns the placements of a job
+    ERROR   worker could not pack a job
+    STOP    coordinator has no work left
+
+Jobs are assigned to per-worker queues, up to prefetch at a time.
+A worker whose queue and the shared backlog are both empty steals
+half of the longest queue of another worker, taking the jobs that
+worker would have reached last. When a worker's connection drops,
+its running job and its queue go back to the backlog; a job that
+fails more than retries times is given up and reported as failed.
+
+Usage:
+    python -m binpack.distributed worker HOST PORT
+"""
+import argparse
+import json
+import socket
+import struct
+import sys
+import threading
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+from . import binmanager
+from . import item
+
+READY, JOB, RESULT, ERROR, STOP = range(1, 6)
+
+_header = struct.Struct('!IB')
+
+
+def send_message(sock: socket.socket, kind: int, body: dict) -> None:
+    payload = json.dumps(body, separators=(',', ':')).encode('utf-8')
+    sock.sendall(_header.pack(len(payload) + 1, kind) + payload)
+
+
+def _recv_exact(sock: socket.socket, size: int) -> Optional[bytes]:
+    chunks = []
+    while size:
+        chunk = sock.recv(size)
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+def recv_message(sock: socket.socket) -> Optional[Tuple[int, dict]]:
+    """
+    Returns the next (kind, body) from sock, or None once the peer
+    has closed the connection
+    """
+    header = _recv_exact(sock, _header.size)
+    if header is None:
+        return None
+    length, kind = _header.unpack(header)
+    payload = _recv_exact(sock, length - 1)
+    if payload is None:
+        return None
+    return kind, json.loads(payload.decode('utf-8'))
+
+
+def pack_job(config: dict, dims: List[List[int]]) -> dict:
+    """
+    Packs one job. Placements are (item index, bin, x, y, width,
+    height) with the item index into dims.
+    """
+    manager = binmanager.BinManager(**config)
+    items = [item.Item(w, h, rotation=False) for w, h in dims]
+    index_of = {id(i): index for index, i in enumerate(items)}
+    manager.add_items(*items)
+    result = manager.execute()
+    bins = [binn for binn in manager.bins if binn.items]
+    placements = [(index_of[id(i)], b) + i.CornerPoint + (i.x, i.y)
+                  for b, binn in enumerate(bins) for i in binn.items]
+    stats = manager.stats()
+    return {'placements': placements,
+            'unplaced': [index_of[id(i)] for i in result['unplaced']],
+            'bins': len(bins),
+            'area': len(bins) * bins[0].x * bins[0].y if bins else 0,
+            'used_area': stats['used_area']}
+
+
+def work(host: str, port: int) -> int:
+    """
+    Runs a worker until the coordinator stops it or goes away.
+    Returns the number of jobs packed.
+    """
+    done = 0
+    with socket.create_connection((host, port)) as sock:
+        while True:
+            send_message(sock, READY, {})
+            message = recv_message(sock)
+            if message is None or message[0] == STOP:
+                return done
+            kind, job = message
+            try:
+                result = pack_job(job['config'], job['dims'])
+            except Exception as error:
+                send_message(sock, ERROR, {'job': job['job'],
+                                           'error': repr(error)})
+                continue
+            result['job'] = job['job']
+            send_message(sock, RESULT, result)
+            done += 1
+
+
+class Coordinator:
+    """
+    Serves jobs to workers and collects their results
+    """
+    def __init__(self, host: str = '127.0.0.1', port: int = 0,
+                 retries: int = 2, prefetch: int = 2) -> None:
+        self.retries = retries
+        self.prefetch = prefetch
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server.bind((host, port))
+        self.server.listen()
+        self.address = self.server.getsockname()
+        self.jobs = [] # type: List[dict]
+        self.attempts = [] # type: List[int]
+        self.backlog = deque() # type: Deque[int]
+        # worker -> queued job ids, and the job it is packing
+        self.queues = {} # type: Dict[int, Deque[int]]
+        self.running = {} # type: Dict[int, int]
+        self.results = {} # type: Dict[int, dict]
+        self.failed = {} # type: Dict[int, str]
+        self.steals = 0
+        self.requeued = 0
+        self.condition = threading.Condition()
+        self.closed = False
+        self.workers = 0
+
+
+    def submit(self, config: dict, dims: List[Tuple[int, int]]) -> int:
+        """
+        Adds a job and returns its id
+        """
+        with self.condition:
+            job = len(self.jobs)
+            self.jobs.append({'job': job, 'config': config,
+                              'dims': [list(d) for d in dims]})
+            self.attempts.append(0)
+            self.backlog.append(job)
+            self.condition.notify_all()
+        return job
+
+
+    def start(self) -> None:
+        """
+        Starts accepting workers in a background thread
+        """
+        threading.Thread(target=self._accept, daemon=True).start()
+
+
+    def _accept(self) -> None:
+        while not self.closed:
+            try:
+                conn, _ = self.server.accept()
+            except OSError:
+                return
+            with self.condition:
+                worker = self.workers
+                self.workers += 1
+                self.queues[worker] = deque()
+            threading.Thread(target=self._serve, args=(conn, worker),
+                             daemon=True).start()
+
+
+    def _finished(self) -> bool:
+        return len(self.results) + len(self.failed) == len(self.jobs)
+
+
+    def _next_job(self, worker: int) -> Optional[int]:
+        """
+        Returns the next job for worker, waiting while other workers
+        still hold unfinished jobs, or None when all jobs are done
+        """
+        with self.condition:
+            queue = self.queues[worker]
+            while True:
+                if not queue:
+                    while self.backlog and len(queue) < self.prefetch:
+                        queue.append(self.backlog.popleft())
+                if not queue:
+                    victim = max(self.queues.values(), key=len)
+                    for _ in range((len(victim) + 1) // 2):
+                        queue.appendleft(victim.pop())
+                        self.steals += 1
+                if queue:
+                    job = queue.popleft()
+                    self.running[worker] = job
+                    return job
+                if self._finished() or self.closed:
+                    return None
+                self.condition.wait()
+
+
+    def _retry(self, job: int, reason: str) -> None:
+        self.attempts[job] += 1
+        if self.attempts[job] > self.retries:
+            self.failed[job] = reason
+        else:
+            self.backlog.appendleft(job)
+            self.requeued += 1
+
+
+    def _serve(self, conn: socket.socket, worker: int) -> None:
+        try:
+            with conn:
+                while True:
+                    message = recv_message(conn)
+                    if message is None:
+                        return
+                    kind, body = message
+                    if kind == READY:
+                        job = self._next_job(worker)
+                        if job is None:
+                            send_message(conn, STOP, {})
+                            return
+                        send_message(conn, JOB, self.jobs[job])
+                    elif kind in (RESULT, ERROR):
+                        with self.condition:
+                            self.running.pop(worker, None)
+                            if kind == RESULT:
+                                self.results[body['job']] = body
+                            else:
+                                self._retry(body['job'], body['error'])
+                            self.condition.notify_all()
+        except OSError:
+            pass
+        finally:
+            with self.condition:
+                # Whatever the worker held goes back to the backlog
+                if worker in self.running:
+                    self._retry(self.running.pop(worker), 'worker lost')
+                self.backlog.extend(self.queues.pop(worker))
+                self.condition.notify_all()
+
+
+    def join(self, timeout: Optional[float] = None) -> dict:
+        """
+        Waits until every job has a result or has failed and returns
+        the results with totals over all jobs
+        """
+        with self.condition:
+            self.condition.wait_for(self._finished, timeout)
+            area = sum(r['area'] for r in self.results.values())
+            used_area = sum(r['used_area'] for r in self.results.values())
+            return {'complete': self._finished(),
+                    'results': dict(self.results),
+                    'failed': dict(self.failed),
+                    'bins': sum(r['bins'] for r in self.results.values()),
+                    'area': area,
+                    'used_area': used_area,
+                    'efficiency': used_area / area if area else 0.0,
+                    'steals': self.steals,
+                    'requeued': self.requeued}
+
+
+    def close(self) -> None:
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+        self.server.close()
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m binpack.distributed')
+    commands = parser.add_subparsers(dest='command')
+    worker_parser = commands.add_parser('worker', help='pack jobs from a coordinator')
+    worker_parser.add_argument('host')
+    worker_parser.add_argument('port', type=int)
+    args = parser.parse_args(argv)
+    if args.command == 'worker':
+        print('%d jobs packed' % work(args.host, args.port))
+        return 0
+    parser.print_help()
+    return 2
+
+
+if __name__ == '__main__':
+    sys.exit(main())
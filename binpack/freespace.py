@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+"""
+Free Space Index
+
+An index of free rectangles keyed by width. Rectangles of equal width
+share a bucket kept sorted by height, and a max segment tree over the
+width domain (0 up to the bin width) holds the tallest rectangle of
+every bucket. Finding the narrowest rectangle that fits an item, and
+within that width the shortest, costs O(log W) for the tree walk plus
+a bisect of one bucket, however many rectangles are stored. Finding
+the smallest one by area walks on to wider buckets only while they
+could still hold a smaller rectangle.
+"""
+from bisect import bisect_left, insort
+from typing import Dict, Iterator, List, Optional, Tuple
+from .guillotine import FreeRectangle
+
+
+class MaxTree:
+    """
+    Max segment tree over a fixed number of slots that finds the
+    first slot holding at least a given value in O(log n)
+    """
+    def __init__(self, values: List[int], capacity: int) -> None:
+        self.size = 1
+        while self.size < max(1, capacity):
+            self.size *= 2
+        self.tree = [-1] * (2 * self.size)
+        if not values:
+            return
+        for index, value in enumerate(values):
+            self.tree[self.size + index] = value
+        for index in range(self.size - 1, 0, -1):
+            self.tree[index] = max(self.tree[2 * index],
+                                   self.tree[2 * index + 1])
+
+
+    def update(self, index: int, value: int) -> None:
+        index += self.size
+        self.tree[index] = value
+        index //= 2
+        while index:
+            self.tree[index] = max(self.tree[2 * index],
+                                   self.tree[2 * index + 1])
+            index //= 2
+
+
+    def first_at_least(self, value: int, start: int = 0) -> int:
+        """
+        Returns the lowest index from start on holding at least value,
+        or -1
+        """
+        if start >= self.size:
+            return -1
+        index = start + self.size
+        if self.tree[index] < value:
+            # Climb to the next subtree to the right that has a match
+            while True:
+                while index & 1:
+                    index //= 2
+                if index == 0:
+                    return -1
+                index += 1
+                if self.tree[index] >= value:
+                    break
+        while index < self.size:
+            index *= 2
+            if self.tree[index] < value:
+                index += 1
+        return index - self.size
+
+
+class FreeSpaceIndex:
+    """
+    Free rectangles of a bin no wider than max_width
+    """
+    def __init__(self, max_width: int) -> None:
+        self.max_width = max_width
+        self.tree = MaxTree([], max_width + 1)
+        # width -> sorted (height, x, y) of the rectangles that wide
+        self.buckets = {} # type: Dict[int, List[Tuple[int, int, int]]]
+        self.count = 0
+
+
+    def __len__(self) -> int:
+        return self.count
+
+
+    def __iter__(self) -> Iterator[FreeRectangle]:
+        for width, bucket in sorted(self.buckets.items()):
+            for height, x, y in bucket:
+                yield FreeRectangle(width, height, x, y)
+
+
+    def add(self, rect: FreeRectangle) -> None:
+        """
+        Adds rect unless it is empty
+        """
+        if rect.width <= 0 or rect.height <= 0:
+            return
+        bucket = self.buckets.setdefault(rect.width, [])
+        insort(bucket, (rect.height, rect.x, rect.y))
+        self.tree.update(rect.width, bucket[-1][0])
+        self.count += 1
+
+
+    def remove(self, rect: FreeRectangle) -> None:
+        bucket = self.buckets[rect.width]
+        del bucket[bisect_left(bucket, (rect.height, rect.x, rect.y))]
+        if bucket:
+            self.tree.update(rect.width, bucket[-1][0])
+        else:
+            del self.buckets[rect.width]
+            self.tree.update(rect.width, -1)
+        self.count -= 1
+
+
+    def find(self, width: int, height: int) -> Optional[FreeRectangle]:
+        """
+        Returns the narrowest, then shortest, rectangle at least width
+        by height, or None
+        """
+        if width > self.max_width:
+            return None
+        found = self.tree.first_at_least(height, max(0, width))
+        if found < 0:
+            return None
+        bucket = self.buckets[found]
+        rect_height, x, y = bucket[bisect_left(bucket, (height,))]
+        return FreeRectangle(found, rect_height, x, y)
+
+
+    def find_smallest(self, width: int, height: int) -> Optional[FreeRectangle]:
+        """
+        Returns the rectangle of least area, then narrowest, that is
+        at least width by height, or None
+        """
+        if width > self.max_width:
+            return None
+        best = None
+        found = self.tree.first_at_least(height, max(0, width))
+        # Every rectangle found wider is at least found * height
+        while found >= 0 and (best is None or found * height < best.area):
+            bucket = self.buckets[found]
+            rect_height, x, y = bucket[bisect_left(bucket, (height,))]
+            if best is None or found * rect_height < best.area:
+                best = FreeRectangle(found, rect_height, x, y)
+            found = self.tree.first_at_least(height, found + 1)
+        return best
+
+
+    def take(self, width: int, height: int) -> Optional[FreeRectangle]:
+        """
+        Removes and returns the rectangle find would return
+        """
+        rect = self.find(width, height)
+        if rect is not None:
+            self.remove(rect)
+        return rect
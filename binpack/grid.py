@@ -0,0 +1,188 @@
+#!/usr/bin/env python
+"""
+Occupancy Grid 2D Bin Algorithm
+
+Bins are integer grids of cells. Every row of the grid is stored as an
+int bitmask of occupied cells, so finding all feasible positions for
+an item is a handful of whole-row bit operations rather than a walk
+over cells: shifting and ANDing the free mask of a row with itself
+(doubling the run length each step) marks every column where a run of
+w free cells starts, and ANDing those run masks over h consecutive
+rows (again by doubling) marks every position where a w by h block is
+free. Items are placed at the lowest, then leftmost, feasible position.
+
+A scale shrinks the grid: one cell covers scale by scale units. Bin
+sides are rounded down to whole cells and item sides are rounded up,
+so placements stay valid for any scale; when scale divides every
+dimension (as BinManager arranges by taking their GCD) nothing is lost.
+"""
+from typing import List, Optional, Sequence, Tuple
+from . import item
+from .instrument import Instrument
+
+
+def _doubling(length: int) -> List[int]:
+    """
+    Returns the shifts that turn a mask of free cells into a mask of
+    the starts of runs of length free cells when each is applied as
+    mask &= mask >> shift
+    """
+    steps = []
+    covered = 1
+    while covered < length:
+        step = min(covered, length - covered)
+        steps.append(step)
+        covered += step
+    return steps
+
+
+class Grid:
+    def __init__(self, x: int = 8, y: int = 4, rotation: bool = True,
+                 instrument: Optional[Instrument] = None,
+                 scale: int = 1) -> None:
+        self.x = x
+        self.y = y
+        self.items = [] # type: List[item.Item]
+        self.rotation = rotation
+        self.instrument = instrument
+        self.used_area = 0
+        self.free_area = self.x * self.y
+        self.rescale(scale)
+
+
+    def __repr__(self) -> str:
+        return "Grid(%r)" % (self.items)
+
+
+    def rescale(self, scale: int) -> None:
+        """
+        Changes the cell size of an empty grid
+        """
+        if self.items:
+            raise ValueError("Cannot rescale a grid holding items")
+        self.scale = scale
+        self.columns = self.x // scale
+        self.full = (1 << self.columns) - 1
+        self.rows = [0] * (self.y // scale) # type: List[int]
+        self.free_cells = self.columns * len(self.rows)
+        # Rows below floor are completely occupied
+        self.floor = 0
+        # limit[w] is the lowest height known not to fit at width w.
+        # Bins only fill up, so a block that did not fit never will,
+        # and neither will any block at least as large both ways.
+        self.limit = [len(self.rows) + 1] * (self.columns + 1) # type: List[int]
+
+
+    def _cells(self, length: int) -> int:
+        return -(-length // self.scale)
+
+
+    def _position(self, width: int, height: int) -> Optional[Tuple[int, int]]:
+        """
+        Returns the lowest, then leftmost, free (column, row) for a
+        block of width by height cells
+        """
+        if (width > self.columns or height >= self.limit[width] or
+                width * height > self.free_cells):
+            return None
+        full = self.full
+        floor = self.floor
+        free = [full & ~row for row in self.rows[floor:]]
+        for step in _doubling(width):
+            free = [mask & (mask >> step) for mask in free]
+        for step in _doubling(height):
+            free = [a & b for a, b in zip(free, free[step:])]
+        for row, mask in enumerate(free):
+            if mask:
+                return ((mask & -mask).bit_length() - 1, floor + row)
+        limit = self.limit
+        for w in range(width, len(limit)):
+            if limit[w] > height:
+                limit[w] = height
+        return None
+
+
+    def fits(self, item: item.Item) -> bool:
+        """
+        True when item fits a free block, without placing it
+        """
+        width, height = self._cells(item.x), self._cells(item.y)
+        if self._position(width, height) is not None:
+            return True
+        return (self.rotation and width != height and
+                self._position(height, width) is not None)
+
+
+    def insert(self, item: item.Item, heuristic: str = 'bottom_left') -> bool:
+        """
+        Places item at the lowest, then leftmost, position it fits.
+        Every heuristic name is accepted for interface compatibility
+        with the other bins and places bottom left.
+        """
+        if self.instrument is not None:
+            self.instrument.record('inserts')
+        width, height = self._cells(item.x), self._cells(item.y)
+        position = self._position(width, height)
+        rotated = False
+        if self.rotation and width != height:
+            if self.instrument is not None:
+                self.instrument.record('rotations_tried')
+            turned = self._position(height, width)
+            if turned is not None and (position is None or
+                                       turned[::-1] < position[::-1]):
+                position, rotated = turned, True
+        if position is None:
+            if self.instrument is not None:
+                self.instrument.record('rejected')
+            return False
+
+        if rotated:
+            item.rotate()
+            width, height = height, width
+        column, row = position
+        block = ((1 << width) - 1) << column
+        rows = self.rows
+        for r in range(row, row + height):
+            rows[r] |= block
+        self.free_cells -= width * height
+        while self.floor < len(rows) and rows[self.floor] == self.full:
+            self.floor += 1
+        item.CornerPoint = (column * self.scale, row * self.scale)
+        self.items.append(item)
+        area = item.x * item.y
+        self.used_area += area
+        self.free_area -= area
+        if self.instrument is not None:
+            self.instrument.record('placed')
+        return True
+
+
+    def insert_many(self, items: Sequence[item.Item],
+                    heuristic: str = 'bottom_left',
+                    start: int = 0) -> Tuple[int, int]:
+        """
+        Inserts items from index start on, in order, until one does
+        not fit. Returns the number placed and the index of the first
+        item left unplaced (len(items) when all were placed).
+        """
+        index = start
+        while index < len(items) and self.insert(items[index]):
+            index += 1
+        return index - start, index
+
+
+    def bin_stats(self) -> dict:
+        """
+        Returns a dictionary with compiled stats on the bin tree.
+        Efficiency is read from the running used_area counter.
+        """
+
+        stats = {
+            'width': self.x,
+            'height': self.y,
+            'area': self.x * self.y,
+            'efficiency': self.used_area/(self.x*self.y),
+            'items': self.items,
+            }
+
+        return stats
@@ -5,12 +5,13 @@ Guillotine Style 2D Bin Algorithm
 Solomon Bothwell
 ssbothwell@gmail.com
 """
-import operator
 import typing
-from typing import Optional, List, Callable
-from functools import reduce
+from typing import Optional, List, Callable, Sequence, Tuple
 from collections import namedtuple
+from . import heuristics
 from . import item
+from .heuristics import Strategy
+from .instrument import Instrument
 
 
 class FreeRectangle(typing.NamedTuple('FreeRectangle', [('width', int), ('height', int), ('x', int), ('y', int)])):
@@ -21,13 +22,19 @@ class FreeRectangle(typing.NamedTuple('FreeRectangle', [('width', int), ('height
 
 
 class Guillotine:
-    def __init__(self, x: int = 8, y: int = 4, rotation: bool = True) -> None:
+    def __init__(self, x: int = 8, y: int = 4, rotation: bool = True,
+                 instrument: Optional[Instrument] = None,
+                 heuristic: str = 'best_area_fit') -> None:
         self.x = x
         self.y = y
         self.rMerge = False
         self.freerects = [FreeRectangle(self.x, self.y, 0, 0)] # type: List[FreeRectangle]
         self.items = [] # type: List[item.Item]
         self.rotation = rotation
+        self.instrument = instrument
+        self.strategy = heuristics.resolve('guillotine', heuristic)
+        self.used_area = 0
+        self.free_area = self.x * self.y
 
 
     def __repr__(self) -> str:
@@ -39,6 +46,10 @@ class Guillotine:
         """
         Returns a list of FreeRectangles that the item fits
         """
+        if self.instrument is not None:
+            self.instrument.record('freerects_scanned', len(self.freerects))
+            if rotation:
+                self.instrument.record('rotations_tried')
         width = item.x if not rotation else item.y
         height = item.y if not rotation else item.x
         return [rect for rect
@@ -74,27 +85,11 @@ class Guillotine:
                                      top_x,
                                      top_y)
             result.append(top_rect)
+        if self.instrument is not None:
+            self.instrument.record('splits', len(result))
         return result
 
 
-    @staticmethod
-    def _rectangle_reduce(fitted_rects: List[FreeRectangle],
-                          op = operator.lt,
-                          field: str = 'width') -> FreeRectangle:
-        """
-        Reduces a list of FreeRectangles and returns the result
-        """
-        if fitted_rects:
-            if field == 'width':
-                compare = lambda a, b: a if op(a.width, b.width) else b
-            if field == 'height':
-                compare = lambda a, b: a if op(a.height, b.height) else b
-            if field == 'area':
-                compare = lambda a, b: a if op(a.area, b.area) else b
-            return reduce(compare, fitted_rects)
-        return None
-
-
     @staticmethod
     def _compare_two_freerects(A: FreeRectangle, B: FreeRectangle) -> FreeRectangle:
         """
@@ -110,51 +105,30 @@ class Guillotine:
             return B
 
 
-    def first_fit(self, item: item.Item) -> bool:
+    def _select(self, item: item.Item, strategy: Strategy) -> Optional[FreeRectangle]:
         """
-        Select first indexed FreeRectangle (that fits item)
+        Returns the FreeRectangle strategy selects for item, rotating
+        the item when the rotated fit is chosen
         """
         fitted_rects = self._fitted_rects(item)
-        if not fitted_rects and self.rotation:
-            fitted_rects = self._fitted_rects(item, rotation=True)
-            if fitted_rects:
-                item.rotate()
-        for freerect in fitted_rects:
-            item.CornerPoint = (freerect.x, freerect.y)
-            self.items.append(item)
-            self.freerects.remove(freerect)
-
-            splits = self._split_free_rect(item, freerect)
-            for rect in splits:
-                self.freerects.append(rect)
-            return True
-        return False
-
-
-    def _generic_algo(self, item, heuristic: str = 'width', op = operator.lt) -> bool:
-        """
-        Select FreeRectangle based on heuristic choices
-        """
-        fitted_rects = self._fitted_rects(item)
-        smallest_rect = self._rectangle_reduce(fitted_rects, op, heuristic)
-
+        if strategy.key is None:
+            # First fit only rotates when nothing fits upright
+            if not fitted_rects and self.rotation:
+                fitted_rects = self._fitted_rects(item, rotation=True)
+                if fitted_rects:
+                    item.rotate()
+            return fitted_rects[0] if fitted_rects else None
+
+        best = strategy.select(fitted_rects) if fitted_rects else None
         if self.rotation:
             fitted_rects_rot = self._fitted_rects(item, rotation=True)
-            smallest_rotated = self._rectangle_reduce(fitted_rects_rot, op, heuristic)
-            best = self._compare_two_freerects(smallest_rect, smallest_rotated)
-        else:
-            best = smallest_rect
-
-        if best:
-            item.CornerPoint = (best.x, best.y)
-            self.items.append(item)
-            self.freerects.remove(best)
-
-            splits = self._split_free_rect(item, best)
-            for rect in splits:
-                self.freerects.append(rect)
-            return True
-        return False
+            best_rotated = (strategy.select(fitted_rects_rot)
+                            if fitted_rects_rot else None)
+            chosen = self._compare_two_freerects(best, best_rotated)
+            if chosen is not best:
+                item.rotate()
+            best = chosen
+        return best
 
 
     def rectangle_merge(self) -> None:
@@ -181,6 +155,8 @@ class Guillotine:
                     self.freerects.remove(freerect)
                     self.freerects.remove(match_rect)
                     self.freerects.append(merged_rect)
+                    if self.instrument is not None:
+                        self.instrument.record('merges')
 
             if matching_heights:
                 heights_adjacent = list(filter(lambda r: r.x == freerect.x + freerect.width, self.freerects))
@@ -193,67 +169,100 @@ class Guillotine:
                     self.freerects.remove(freerect)
                     self.freerects.remove(match_rect)
                     self.freerects.append(merged_rect)
+                    if self.instrument is not None:
+                        self.instrument.record('merges')
 
 
-    def insert(self, item: item.Item, heuristic: str = 'best_area_fit') -> bool:
+    def fits(self, item: item.Item) -> bool:
         """
-        Public method for selecting heuristic and inserting item
+        True when item fits a free rectangle, without placing it
         """
-        if heuristic == 'first_fit':
-            res = self.first_fit(item)
-            if res:
-                if self.rMerge:
-                    self.rectangle_merge()
-                return True
-        elif heuristic == 'best_width_fit':
-            res = self._generic_algo(item, 'width', operator.lt)
-            if res:
-                if self.rMerge:
-                    self.rectangle_merge()
-                return True
-        elif heuristic == 'best_height_fit':
-            res = self._generic_algo(item, 'height', operator.lt)
-            if res:
-                if self.rMerge:
-                    self.rectangle_merge()
-                return True
-        elif heuristic == 'best_area_fit':
-            res = self._generic_algo(item, 'area', operator.lt)
-            if res:
-                if self.rMerge:
-                    self.rectangle_merge()
-                return True
-        elif heuristic == 'worst_width_fit':
-            res = self._generic_algo(item, 'width', operator.gt)
-            if res:
-                if self.rMerge:
-                    self.rectangle_merge()
-                return True
-        elif heuristic == 'worst_height_fit':
-            res = self._generic_algo(item, 'height', operator.gt)
-            if res:
-                if self.rMerge:
-                    self.rectangle_merge()
-                return True
-        elif heuristic == 'worst_area_fit':
-            res = self._generic_algo(item, 'area', operator.gt)
-            if res:
-                if self.rMerge:
-                    self.rectangle_merge()
-                return True
+        if self.rotation:
+            return any((rect.width >= item.x and rect.height >= item.y) or
+                       (rect.width >= item.y and rect.height >= item.x)
+                       for rect in self.freerects)
+        return any(rect.width >= item.x and rect.height >= item.y
+                   for rect in self.freerects)
+
+
+    def insert(self, item: item.Item, heuristic: Optional[str] = None) -> bool:
+        """
+        Inserts item with the bin's strategy, or with the named
+        heuristic when one is given
+        """
+        strategy = self.strategy
+        if heuristic is not None and heuristic != strategy.name:
+            strategy = heuristics.resolve('guillotine', heuristic)
+        if self.instrument is not None:
+            self.instrument.record('inserts')
+        if self._insert(item, strategy):
+            # Splits partition the chosen FreeRectangle minus the item
+            # and merges preserve area, so only the item area changes.
+            area = item.x * item.y
+            self.used_area += area
+            self.free_area -= area
+            if self.instrument is not None:
+                self.instrument.record('placed', freerects=len(self.freerects))
+            return True
+        if self.instrument is not None:
+            self.instrument.record('rejected')
         return False
 
 
+    def insert_many(self, items: Sequence[item.Item],
+                    heuristic: Optional[str] = None,
+                    start: int = 0) -> Tuple[int, int]:
+        """
+        Inserts items from index start on, in order, until one does
+        not fit. Returns the number placed and the index of the first
+        item left unplaced (len(items) when all were placed).
+        """
+        strategy = self.strategy
+        if heuristic is not None and heuristic != strategy.name:
+            strategy = heuristics.resolve('guillotine', heuristic)
+        instrument = self.instrument
+        index = start
+        while index < len(items):
+            current_item = items[index]
+            if instrument is not None:
+                instrument.record('inserts')
+            if not self._insert(current_item, strategy):
+                if instrument is not None:
+                    instrument.record('rejected')
+                break
+            area = current_item.x * current_item.y
+            self.used_area += area
+            self.free_area -= area
+            if instrument is not None:
+                instrument.record('placed', freerects=len(self.freerects))
+            index += 1
+        return index - start, index
+
+
+    def _insert(self, item: item.Item, strategy: Strategy) -> bool:
+        freerect = self._select(item, strategy)
+        if freerect is None:
+            return False
+        item.CornerPoint = (freerect.x, freerect.y)
+        self.items.append(item)
+        self.freerects.remove(freerect)
+        self.freerects.extend(self._split_free_rect(item, freerect))
+        if self.rMerge:
+            self.rectangle_merge()
+        return True
+
+
     def bin_stats(self) -> dict:
         """
-        Returns a dictionary with compiled stats on the bin tree
+        Returns a dictionary with compiled stats on the bin tree.
+        Efficiency is read from the running free_area counter.
         """
 
         stats = {
             'width': self.x,
             'height': self.y,
             'area': self.x * self.y,
-            'efficiency': 1-(sum([F.width*F.height for F in self.freerects])/(self.x*self.y)),
+            'efficiency': 1-(self.free_area/(self.x*self.y)),
             'items': self.items,
             }
 
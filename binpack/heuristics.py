@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+"""
+Heuristics
+
+Placement heuristics as strategy objects. A bin resolves its
+heuristic name to a Strategy once, when it is created, and every
+insert then picks among the fitting shelves or free rectangles with
+the strategy's precomputed key function and min or max. Inserting an
+item involves no name dispatch and allocates no comparison functions.
+
+Ties go to the last fitting candidate, as they did with the reduce
+based heuristics these replace.
+"""
+from operator import attrgetter
+from typing import Dict, List, Optional, Callable
+
+
+class Strategy:
+    """
+    Selects one shelf or free rectangle from those that fit an item.
+    Without a key the first candidate is taken. open_shelf strategies
+    only ever consider a sheet's open (last) shelf.
+    """
+    def __init__(self, name: str,
+                 key: Optional[Callable] = None,
+                 largest: bool = False,
+                 open_shelf: bool = False) -> None:
+        self.name = name
+        self.key = key
+        self.largest = largest
+        self.open_shelf = open_shelf
+        if key is None:
+            self.select = self._first
+        elif largest:
+            self.select = self._largest
+        else:
+            self.select = self._smallest
+
+
+    def __repr__(self) -> str:
+        return "Strategy(%r)" % self.name
+
+
+    @staticmethod
+    def _first(candidates: List):
+        return candidates[0]
+
+
+    def _smallest(self, candidates: List):
+        return min(reversed(candidates), key=self.key)
+
+
+    def _largest(self, candidates: List):
+        return max(reversed(candidates), key=self.key)
+
+
+def _shelf_area(shelf) -> int:
+    return shelf.y * shelf.available_width
+
+
+_shelf_width = attrgetter('available_width')
+_shelf_height = attrgetter('y')
+_rect_width = attrgetter('width')
+_rect_height = attrgetter('height')
+_rect_area = attrgetter('area')
+
+SHELF = {
+    'next_fit': Strategy('next_fit', open_shelf=True),
+    'first_fit': Strategy('first_fit'),
+    'best_width_fit': Strategy('best_width_fit', _shelf_width),
+    'best_height_fit': Strategy('best_height_fit', _shelf_height),
+    'best_area_fit': Strategy('best_area_fit', _shelf_area),
+    'worst_width_fit': Strategy('worst_width_fit', _shelf_width, True),
+    'worst_height_fit': Strategy('worst_height_fit', _shelf_height, True),
+    'worst_area_fit': Strategy('worst_area_fit', _shelf_area, True),
+    } # type: Dict[str, Strategy]
+
+GUILLOTINE = {
+    'first_fit': Strategy('first_fit'),
+    'best_width_fit': Strategy('best_width_fit', _rect_width),
+    'best_height_fit': Strategy('best_height_fit', _rect_height),
+    'best_area_fit': Strategy('best_area_fit', _rect_area),
+    'worst_width_fit': Strategy('worst_width_fit', _rect_width, True),
+    'worst_height_fit': Strategy('worst_height_fit', _rect_height, True),
+    'worst_area_fit': Strategy('worst_area_fit', _rect_area, True),
+    } # type: Dict[str, Strategy]
+
+# Grid bins always place bottom left and accept every heuristic name
+GRID = {name: Strategy(name)
+        for name in ['bottom_left'] + list(SHELF) + list(GUILLOTINE)
+        } # type: Dict[str, Strategy]
+
+STRATEGIES = {'shelf': SHELF,
+              'guillotine': GUILLOTINE,
+              'grid': GRID} # type: Dict[str, Dict[str, Strategy]]
+
+
+def resolve(pack_algo: str, heuristic: str) -> Strategy:
+    """
+    Returns the strategy named heuristic for pack_algo bins
+    """
+    if pack_algo not in STRATEGIES:
+        raise ValueError("Unknown pack_algo %r" % pack_algo)
+    if heuristic not in STRATEGIES[pack_algo]:
+        raise ValueError("Unknown heuristic %r for pack_algo %r"
+                         % (heuristic, pack_algo))
+    return STRATEGIES[pack_algo][heuristic]
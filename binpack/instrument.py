@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+"""
+Instrumentation
+
+Opt-in counters for the operations performed during a packing run.
+An Instrument is passed to a BinManager (which hands it on to every
+bin it creates) or directly to a Sheet or Guillotine. Bins created
+without one skip all recording behind a single `is not None` test.
+
+Events recorded (with the data passed to callbacks):
+    items              items handed to the BinManager
+                       (seconds, placed, pack_algo, heuristic)
+    bins_probed        bins examined while selecting a bin for an item
+    bins_opened        bins created by the BinManager (pack_algo, heuristic)
+    inserts            insert calls on a bin
+    placed             inserts that placed the item (freerects or shelves)
+    rejected           inserts that did not place the item
+    freerects_scanned  free rectangles examined by Guillotine bins
+    shelves_scanned    shelves examined by Sheet bins
+    shelves_opened     shelves created by Sheet bins
+    shelves_closed     shelves a Sheet passed to its sink
+    wastemap_hits      items a Sheet placed in a waste map gap
+    rotations_tried    fit searches with the item rotated
+    splits             free rectangles created by Guillotine splits
+    merges             free rectangle pairs merged by Guillotine bins
+"""
+from collections import Counter
+from typing import Callable, List
+
+# Type Aliases:
+Callback = Callable[[str, int, dict], None]
+
+
+class Instrument:
+    """
+    Aggregates event counters and forwards every event to the
+    registered callbacks as callback(event, count, data).
+    """
+    def __init__(self, *callbacks: Callback) -> None:
+        self.counters = Counter() # type: Counter
+        self.callbacks = list(callbacks) # type: List[Callback]
+
+
+    def __repr__(self) -> str:
+        return "Instrument(%r)" % dict(self.counters)
+
+
+    def subscribe(self, callback: Callback) -> None:
+        self.callbacks.append(callback)
+
+
+    def unsubscribe(self, callback: Callback) -> None:
+        self.callbacks.remove(callback)
+
+
+    def record(self, event: str, count: int = 1, **data) -> None:
+        """
+        Adds count to the event counter and notifies callbacks
+        """
+        self.counters[event] += count
+        for callback in self.callbacks:
+            callback(event, count, data)
+
+
+    def reset(self) -> None:
+        self.counters.clear()
+
+
+    def summary(self) -> dict:
+        """
+        Returns the counters along with per insert and per item averages
+        """
+        stats = dict(self.counters)
+        inserts = self.counters['inserts']
+        items = self.counters['items']
+        if inserts:
+            stats['freerects_per_insert'] = self.counters['freerects_scanned'] / inserts
+            stats['shelves_per_insert'] = self.counters['shelves_scanned'] / inserts
+        if items:
+            stats['bins_per_item'] = self.counters['bins_probed'] / items
+        return stats
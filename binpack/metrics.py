@@ -0,0 +1,179 @@
+#!/usr/bin/env python
+"""
+Metrics
+
+Counters and histograms for long running packing services. A
+PackingMetrics object owns an Instrument; pass that instrument to a
+BinManager and the metrics are updated from its events. Metrics are
+rendered in the Prometheus text exposition format or pushed to any
+sink callable as (name, labels, value) samples.
+
+    metrics = PackingMetrics()
+    manager = BinManager(..., instrument=metrics.instrument)
+    manager.execute()
+    print(metrics.render())
+"""
+from bisect import bisect_left
+from typing import Callable, Dict, Iterator, List, Sequence, Tuple
+from .instrument import Instrument
+
+# Type Aliases:
+Labels = Tuple[Tuple[str, str], ...]
+Sample = Tuple[str, Dict[str, str], float]
+Sink = Callable[[str, Dict[str, str], float], None]
+
+LATENCY_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+                   0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1)
+
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+
+def _labels(**labels) -> Labels:
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ''
+    return '{%s}' % ','.join('%s="%s"' % (key, str(value).replace('"', '\\"'))
+                             for key, value in labels)
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """
+    Monotonic counter with one value per label set
+    """
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.values = {} # type: Dict[Labels, float]
+
+
+    def inc(self, labels: Labels = (), amount: float = 1) -> None:
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+
+    def samples(self) -> Iterator[Tuple[str, Labels, float]]:
+        for labels, value in sorted(self.values.items()):
+            yield self.name, labels, value
+
+
+class Histogram:
+    """
+    Histogram with fixed bucket upper bounds. Observations only
+    increment a single bucket; cumulative counts are computed when
+    the histogram is read.
+    """
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str,
+                 buckets: Sequence[float] = LATENCY_BUCKETS) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(sorted(buckets))
+        self.counts = {} # type: Dict[Labels, List[int]]
+        self.sums = {} # type: Dict[Labels, float]
+
+
+    def observe(self, value: float, labels: Labels = ()) -> None:
+        counts = self.counts.get(labels)
+        if counts is None:
+            # One slot per bucket plus the +Inf overflow slot
+            counts = self.counts[labels] = [0] * (len(self.buckets) + 1)
+            self.sums[labels] = 0
+        counts[bisect_left(self.buckets, value)] += 1
+        self.sums[labels] += value
+
+
+    def samples(self) -> Iterator[Tuple[str, Labels, float]]:
+        for labels, counts in sorted(self.counts.items()):
+            total = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                total += count
+                yield (self.name + '_bucket',
+                       labels + (('le', _format_value(bound)),), total)
+            yield self.name + '_sum', labels, self.sums[labels]
+            yield self.name + '_count', labels, total
+
+
+class PackingMetrics:
+    """
+    Standard metrics for BinManager runs, fed by Instrument events
+    """
+    def __init__(self, latency_buckets: Sequence[float] = LATENCY_BUCKETS,
+                 size_buckets: Sequence[float] = SIZE_BUCKETS) -> None:
+        self.items_placed = Counter('binpack_items_placed_total',
+                                    'Items placed into bins.')
+        self.items_failed = Counter('binpack_items_failed_total',
+                                    'Items that could not be placed.')
+        self.bins_opened = Counter('binpack_bins_opened_total',
+                                   'Bins opened by the bin manager.')
+        self.insert_latency = Histogram('binpack_insert_latency_seconds',
+                                        'Time spent placing a single item.',
+                                        latency_buckets)
+        self.freerects = Histogram('binpack_freerects',
+                                   'Free rectangles in a guillotine bin '
+                                   'after each placement.',
+                                   size_buckets)
+        self.shelves = Histogram('binpack_shelves',
+                                 'Shelves in a sheet after each placement.',
+                                 size_buckets)
+        self.metrics = [self.items_placed, self.items_failed,
+                        self.bins_opened, self.insert_latency,
+                        self.freerects, self.shelves]
+        self.instrument = Instrument(self._on_event)
+
+
+    def _on_event(self, event: str, count: int, data: dict) -> None:
+        if event == 'items':
+            labels = _labels(pack_algo=data['pack_algo'],
+                             heuristic=data['heuristic'])
+            if data['placed']:
+                self.items_placed.inc(labels)
+            else:
+                self.items_failed.inc(labels)
+            self.insert_latency.observe(data['seconds'], labels)
+        elif event == 'placed':
+            if 'freerects' in data:
+                self.freerects.observe(data['freerects'])
+            elif 'shelves' in data:
+                self.shelves.observe(data['shelves'])
+        elif event == 'bins_opened':
+            self.bins_opened.inc(_labels(pack_algo=data['pack_algo'],
+                                         heuristic=data['heuristic']), count)
+
+
+    def samples(self) -> Iterator[Sample]:
+        for metric in self.metrics:
+            for name, labels, value in metric.samples():
+                yield name, dict(labels), value
+
+
+    def export(self, sink: Sink) -> None:
+        """
+        Pushes every current sample to sink(name, labels, value)
+        """
+        for name, labels, value in self.samples():
+            sink(name, labels, value)
+
+
+    def render(self) -> str:
+        """
+        Returns all metrics in the Prometheus text exposition format
+        """
+        lines = []
+        for metric in self.metrics:
+            lines.append('# HELP %s %s' % (metric.name, metric.documentation))
+            lines.append('# TYPE %s %s' % (metric.name, metric.kind))
+            for name, labels, value in metric.samples():
+                lines.append('%s%s %s' % (name, _format_labels(labels),
+                                          _format_value(value)))
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,329 @@
+#!/usr/bin/env python
+"""
+Parallel Packing
+
+Packs one large job across several processes. Items are split into
+shards, either by random partition or by size class (contiguous runs
+of the items sorted by area, so every shard holds items of similar
+size), and every shard is packed by its own BinManager in a worker
+process. Workers send back their bins; the parent rebinds the
+copies of the items in them to the original Item objects and joins
+the bins of all shards.
+
+Item dimensions and placements travel through a shared memory table
+(multiprocessing.shared_memory, Python 3.8+) of int64 columns. The
+parent writes the dimensions and the shard order once, each worker is
+told only its range of the order column, reads its items from the
+table and writes every placement back in place, and only the bins'
+own free space state is pickled. Without shared memory, items are
+pickled to the workers and back.
+
+Every shard ends with a few partially filled bins. A consolidation
+pass then re-packs the items of the least filled bins from all shards
+together and keeps the result when it needs fewer bins. The
+efficiency lost to sharding is reported as gap_ratio, the bins used
+over the lower bound for the whole job less one. Random shards keep the
+mix of sizes of the whole job and lose little; size classes cannot
+fill the gaps around large items with small ones and lose more.
+
+Sharding only pays off when packing costs more than starting workers
+and moving items. bin_best_fit and bin_first_fit probe every open bin
+for every item, so their work grows with items times bins and shards
+cut it by the number of shards, even on a single core: 20000 items
+take 3.6 s instead of 12.6 s for guillotine best_area_fit. bin_next_fit
+only ever probes the open bin, is linear, and sharding it is pure
+overhead (0.37 s instead of 0.07 s for 20000 shelf items) that also
+costs bins. Jobs whose estimated_work is below min_work are therefore
+packed serially. `python -m binpack.benchmark parallel` measures both.
+"""
+import os
+import random
+from array import array
+from itertools import accumulate
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import List, Optional, Tuple
+from . import item
+
+try:
+    from multiprocessing import shared_memory
+except ImportError: # Python < 3.8
+    shared_memory = None
+
+# (item index, width, height)
+Entry = Tuple[int, int, int]
+
+# Columns of the shared item table, in order
+WIDTH, HEIGHT, ORDER, BIN, SLOT, SHELF, X, Y, ROTATED = range(9)
+COLUMNS = 9
+
+# Bin probes below which a job is packed serially, see estimated_work.
+# Around a tenth of a second of packing, the cost of a worker pool.
+MIN_WORK = 100000
+
+
+def shard(dims: List[Tuple[int, int]], shards: int,
+          by: str = 'random', seed: int = 0) -> List[List[int]]:
+    """
+    Splits the indices of dims into shards. 'size' cuts the items,
+    sorted by area, into contiguous size classes of equal count;
+    'random' deals out a random permutation.
+    """
+    if by == 'size':
+        order = sorted(range(len(dims)),
+                       key=lambda i: dims[i][0] * dims[i][1], reverse=True)
+        return [order[s * len(order) // shards:(s + 1) * len(order) // shards]
+                for s in range(shards)]
+    if by == 'random':
+        order = list(range(len(dims)))
+        random.Random(seed).shuffle(order)
+        return [order[s::shards] for s in range(shards)]
+    raise ValueError("Unknown shard strategy %r" % by)
+
+
+def _pack_shard(config: dict, entries: List[Entry]) -> tuple:
+    """
+    Packs one shard in a worker. Returns the bins and, per bin, the
+    item indices of its items in order, and the indices of the items
+    no bin accepted.
+    """
+    from .binmanager import BinManager
+    manager = BinManager(**config)
+    items = [item.Item(w, h, rotation=False) for index, w, h in entries]
+    index_of = {id(i): index for i, (index, w, h) in zip(items, entries)}
+    manager.add_items(*items)
+    result = manager.execute()
+    bins = [binn for binn in manager.bins if binn.items]
+    return (bins,
+            [[index_of[id(i)] for i in binn.items] for binn in bins],
+            [index_of[id(i)] for i in result['unplaced']])
+
+
+def _rebind(binn, originals: List[item.Item], instrument) -> None:
+    """
+    Replaces the item copies in a worker's bin with the original items
+    """
+    copies = {}
+    for position, original in enumerate(originals):
+        copy = binn.items[position]
+        original.x, original.y = copy.x, copy.y
+        original.CornerPoint = copy.CornerPoint
+        copies[id(copy)] = original
+        binn.items[position] = original
+    for shelf in getattr(binn, 'shelves', ()):
+        shelf.items = [copies[id(i)] for i in shelf.items]
+    binn.instrument = instrument
+
+
+def _pack_range(config: dict, name: str, count: int,
+                start: int, end: int) -> list:
+    """
+    Packs the items at positions start to end of the order column of
+    the shared table in a worker and writes their placements back.
+    Returns the bins with their item lists emptied.
+    """
+    from .binmanager import BinManager
+    block = shared_memory.SharedMemory(name=name)
+    table = block.buf.cast('q')
+    try:
+        indices = table[ORDER * count + start:ORDER * count + end].tolist()
+        items = [item.Item(table[WIDTH * count + index],
+                           table[HEIGHT * count + index], rotation=False)
+                 for index in indices]
+        index_of = {id(i): index for i, index in zip(items, indices)}
+        manager = BinManager(**config)
+        manager.add_items(*items)
+        result = manager.execute()
+        for i in result['unplaced']:
+            table[BIN * count + index_of[id(i)]] = -1
+        bins = [binn for binn in manager.bins if binn.items]
+        for b, binn in enumerate(bins):
+            for slot, i in enumerate(binn.items):
+                index = index_of[id(i)]
+                table[BIN * count + index] = b
+                table[SLOT * count + index] = slot
+                table[SHELF * count + index] = -1
+                table[X * count + index] = i.CornerPoint[0]
+                table[Y * count + index] = i.CornerPoint[1]
+                table[ROTATED * count + index] = int(
+                    i.x != table[WIDTH * count + index])
+            binn.items = []
+            for s, shelf in enumerate(getattr(binn, 'shelves', ())):
+                for i in shelf.items:
+                    table[SHELF * count + index_of[id(i)]] = s
+                shelf.items = []
+        return bins
+    finally:
+        # Views must go before the block can be closed
+        table.release()
+        block.close()
+
+
+def _run_pickled(executor: Executor, config: dict,
+                 items: List[item.Item], parts: List[List[int]],
+                 instrument) -> tuple:
+    dims = [(i.x, i.y) for i in items]
+    results = executor.map(
+        _pack_shard, [config] * len(parts),
+        [[(index,) + dims[index] for index in part] for part in parts])
+    bins = []
+    failed = [] # type: List[int]
+    for shard_bins, indices, shard_failed in results:
+        for binn, bin_indices in zip(shard_bins, indices):
+            _rebind(binn, [items[index] for index in bin_indices],
+                    instrument)
+            bins.append(binn)
+        failed.extend(shard_failed)
+    return bins, failed
+
+
+def _run_shared(executor: Executor, config: dict,
+                items: List[item.Item], parts: List[List[int]],
+                instrument) -> tuple:
+    count = len(items)
+    block = shared_memory.SharedMemory(create=True,
+                                       size=max(8, COLUMNS * count * 8))
+    table = block.buf.cast('q')
+    try:
+        table[WIDTH * count:(WIDTH + 1) * count] = array('q', (i.x for i in items))
+        table[HEIGHT * count:(HEIGHT + 1) * count] = array('q', (i.y for i in items))
+        order = [index for part in parts for index in part]
+        table[ORDER * count:(ORDER + 1) * count] = array('q', order)
+        ends = list(accumulate(len(part) for part in parts))
+        starts = [0] + ends[:-1]
+        results = list(executor.map(_pack_range,
+                                    [config] * len(parts),
+                                    [block.name] * len(parts),
+                                    [count] * len(parts),
+                                    starts, ends))
+
+        bins = []
+        failed = [] # type: List[int]
+        for shard_bins, start, end in zip(results, starts, ends):
+            offset = len(bins)
+            for binn in shard_bins:
+                binn.instrument = instrument
+            bins.extend(shard_bins)
+            slots = [[] for _ in shard_bins] # type: List[list]
+            for index in order[start:end]:
+                b = table[BIN * count + index]
+                if b < 0:
+                    failed.append(index)
+                    continue
+                placed = items[index]
+                if table[ROTATED * count + index]:
+                    placed.rotate()
+                placed.CornerPoint = (table[X * count + index],
+                                      table[Y * count + index])
+                slots[b].append((table[SLOT * count + index],
+                                 table[SHELF * count + index], placed))
+            for binn, bin_slots in zip(bins[offset:], slots):
+                bin_slots.sort(key=lambda slot: slot[0])
+                binn.items = [placed for slot, s, placed in bin_slots]
+                for slot, s, placed in bin_slots:
+                    if s >= 0:
+                        binn.shelves[s].items.append(placed)
+        return bins, failed
+    finally:
+        table.release()
+        block.close()
+        block.unlink()
+
+
+def estimated_work(manager: 'BinManager') -> int:
+    """
+    Returns the number of bin probes a serial run of the manager is
+    expected to make: one per item for bin_next_fit, and one per item
+    and open bin, half the bins needed on average, for the bin_algos
+    that scan every bin
+    """
+    count = len(manager.items)
+    if manager.bin_algo == 'bin_next_fit':
+        return count
+    area = sum(i.x * i.y for i in manager.items)
+    bins = area // (manager.bin_width * manager.bin_height) + 1
+    return count * bins // 2
+
+
+def consolidate(manager: 'BinManager', count: int) -> int:
+    """
+    Re-packs the items of the count least filled bins together and
+    keeps the result when it uses fewer bins. Returns the bins saved.
+    """
+    chosen = sorted(manager.bins, key=lambda binn: binn.used_area)[:count]
+    if len(chosen) < 2:
+        return 0
+    items = [i for binn in chosen for i in binn.items]
+    saved = [(i, i.x, i.y, i.CornerPoint) for i in items]
+    config = manager.config()
+    config['sorting'] = True
+    repack = manager.__class__(instrument=manager.instrument, **config)
+    repack.add_items(*items)
+    repack.execute()
+    new_bins = [binn for binn in repack.bins if binn.items]
+    if repack.items_failed or len(new_bins) >= len(chosen):
+        for i, x, y, corner in saved:
+            i.x, i.y, i.CornerPoint = x, y, corner
+        return 0
+    ruined = set(id(binn) for binn in chosen)
+    manager.bins = [binn for binn in manager.bins
+                    if id(binn) not in ruined] + new_bins
+    manager.bin_area = sum(binn.x * binn.y for binn in manager.bins)
+    return len(chosen) - len(new_bins)
+
+
+def _result(manager: 'BinManager', shards: int, bins_before: int) -> dict:
+    lower_bound = max(1, manager.lower_bound())
+    return {'shards': shards,
+            'bins_before': bins_before,
+            'bins': len(manager.bins),
+            'lower_bound': lower_bound,
+            'gap_ratio': len(manager.bins) / lower_bound - 1,
+            'efficiency': manager.stats()['efficiency'],
+            'unplaced': list(manager.rejected)}
+
+
+def parallel_pack(manager: 'BinManager',
+                  workers: Optional[int] = None,
+                  shards: Optional[int] = None,
+                  by: str = 'random',
+                  merge: Optional[int] = None,
+                  seed: int = 0,
+                  shared: bool = True,
+                  min_work: int = MIN_WORK) -> dict:
+    """
+    Packs the manager's items in shards across worker processes,
+    replaces the manager's bins with the joined result and re-packs
+    the merge least filled bins (by default two per shard) together.
+    Item data goes through shared memory when shared is set and
+    the platform supports it. Jobs of a single shard or of less than
+    min_work estimated bin probes are packed serially. Returns the bin
+    counts, efficiency and gap_ratio, the bins used over the lower
+    bound less one.
+    """
+    items = manager.items
+    workers = workers or os.cpu_count() or 1
+    shards = shards or workers
+    if shards < 2 or estimated_work(manager) < min_work:
+        manager.execute()
+        return _result(manager, 1, len(manager.bins))
+    dims = [(i.x, i.y) for i in items]
+    parts = [part for part in shard(dims, shards, by, seed) if part]
+    run = (_run_shared if shared and shared_memory is not None
+           else _run_pickled)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        bins, failed = run(executor, manager.config(), items, parts,
+                           manager.instrument)
+
+    if bins:
+        manager.bins = bins
+    manager.bin_area = sum(binn.x * binn.y for binn in manager.bins)
+    manager.used_area = sum(binn.used_area for binn in manager.bins)
+    manager.items_placed = len(items) - len(failed)
+    manager.items_failed = len(failed)
+    manager.cursor = len(items)
+    manager.rejected = [items[index] for index in sorted(failed)]
+    bins_before = len(manager.bins)
+    merge = 2 * len(parts) if merge is None else merge
+    consolidate(manager, merge)
+    return _result(manager, len(parts), bins_before)
+
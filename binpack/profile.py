@@ -0,0 +1,173 @@
+#!/usr/bin/env python
+"""
+Profile
+
+Runs a workload through a BinManager configuration twice: once under
+cProfile for a sorted hot function report and once under a sampling
+profiler which records flamegraph compatible folded stacks (one
+`frame;frame;frame count` line per distinct stack).
+
+Usage:
+    python -m binpack.profile --items 5000 --pack-algo shelf \\
+        --heuristic best_width_fit --folded out.folded
+    flamegraph.pl out.folded > out.svg
+"""
+import argparse
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+from collections import Counter
+from typing import List, Optional
+from . import binmanager
+from . import workload
+
+
+def _frame_name(code) -> str:
+    module = os.path.splitext(os.path.basename(code.co_filename))[0]
+    name = '%s:%s' % (module, getattr(code, 'co_qualname', code.co_name))
+    # Spaces separate the stack from its count in the folded format
+    return name.replace(' ', '_')
+
+
+class Sampler:
+    """
+    Samples the call stack of one thread at a fixed interval from a
+    background thread. Stacks are cut at the frame running root_code
+    so that only the profiled call and its callees are recorded;
+    samples taken outside of root_code are dropped.
+    """
+    def __init__(self, interval: float = 0.001, root_code=None) -> None:
+        self.interval = interval
+        self.root_code = root_code
+        self.stacks = Counter() # type: Counter
+        self._stop = threading.Event()
+        self._thread = None # type: Optional[threading.Thread]
+        self._target = None # type: Optional[int]
+        self._switch_interval = None # type: Optional[float]
+
+
+    def _sample(self) -> None:
+        frame = sys._current_frames().get(self._target)
+        names = []
+        while frame is not None:
+            names.append(_frame_name(frame.f_code))
+            if frame.f_code is self.root_code:
+                break
+            frame = frame.f_back
+        else:
+            if self.root_code is not None:
+                return
+        if names:
+            self.stacks[';'.join(reversed(names))] += 1
+
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+
+    def start(self) -> None:
+        self._target = threading.get_ident()
+        # The sampler needs the GIL at least as often as it samples
+        self._switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(min(self._switch_interval, self.interval))
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+        sys.setswitchinterval(self._switch_interval)
+
+
+    def folded(self) -> str:
+        """
+        Returns the samples as folded stacks, heaviest first
+        """
+        return ''.join('%s %d\n' % (stack, count)
+                       for stack, count in self.stacks.most_common())
+
+
+def _execute(config: dict, dims: List[workload.Dimensions]) -> binmanager.BinManager:
+    manager = binmanager.BinManager(**config)
+    manager.add_items(*workload.to_items(dims))
+    manager.execute()
+    return manager
+
+
+def hot_functions(config: dict, dims: List[workload.Dimensions],
+                  sort: str = 'cumulative', limit: int = 25) -> str:
+    """
+    Returns a pstats report of the run sorted by sort
+    """
+    profiler = cProfile.Profile()
+    profiler.runcall(_execute, config, dims)
+    output = io.StringIO()
+    stats = pstats.Stats(profiler, stream=output)
+    stats.strip_dirs().sort_stats(sort).print_stats(limit)
+    return output.getvalue()
+
+
+def folded_stacks(config: dict, dims: List[workload.Dimensions],
+                  interval: float = 0.001) -> str:
+    """
+    Returns folded stacks sampled during the run
+    """
+    sampler = Sampler(interval, root_code=_execute.__code__)
+    sampler.start()
+    try:
+        _execute(config, dims)
+    finally:
+        sampler.stop()
+    return sampler.folded()
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m binpack.profile')
+    parser.add_argument('--input', help='load the workload from a file')
+    parser.add_argument('--items', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--width', type=int, default=100)
+    parser.add_argument('--height', type=int, default=50)
+    parser.add_argument('--pack-algo', default='guillotine')
+    parser.add_argument('--heuristic', default='best_width_fit')
+    parser.add_argument('--bin-algo', default='bin_best_fit')
+    parser.add_argument('--no-sorting', action='store_true')
+    parser.add_argument('--no-rotation', action='store_true')
+    parser.add_argument('--sort', default='cumulative',
+                        help='pstats sort key for the hot function report')
+    parser.add_argument('--limit', type=int, default=25)
+    parser.add_argument('--interval', type=float, default=0.001,
+                        help='sampling interval in seconds')
+    parser.add_argument('--folded', help='write folded stacks to this file')
+    args = parser.parse_args(argv)
+
+    if args.input:
+        dims = workload.load(args.input)
+    else:
+        dims = workload.generate(args.items, args.width, args.height,
+                                 seed=args.seed)
+    config = {'bin_width': args.width,
+              'bin_height': args.height,
+              'bin_algo': args.bin_algo,
+              'pack_algo': args.pack_algo,
+              'heuristic': args.heuristic,
+              'sorting': not args.no_sorting,
+              'rotation': not args.no_rotation}
+
+    print(hot_functions(config, dims, args.sort, args.limit))
+    folded = folded_stacks(config, dims, args.interval)
+    if args.folded:
+        with open(args.folded, 'w') as handle:
+            handle.write(folded)
+    else:
+        sys.stdout.write(folded)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+"""
+Remnant Inventory
+
+Offcuts left over from earlier jobs, kept so that later jobs cut
+from them before opening fresh sheets. A BinManager given an
+inventory opens a bin the size of a remnant whenever one holds the
+item that needs a new bin, and release_remnants hands the free
+rectangles of its guillotine bins back to the inventory once the job
+is done.
+
+Remnants are indexed by a FreeSpaceIndex over their sizes, with the
+remnant id in place of a position. An item takes the smallest remnant
+by area that holds it, so large offcuts are kept for large items;
+the index walks only the widths that could hold a smaller one. Offcuts narrower than min_side or smaller than
+min_area are not worth keeping and are dropped. The inventory is
+saved as JSON.
+"""
+import json
+import os
+import typing
+from typing import Iterator, Optional
+from .freespace import FreeSpaceIndex
+from .guillotine import FreeRectangle
+
+VERSION = 1
+
+
+class Remnant(typing.NamedTuple('Remnant', [('id', int), ('width', int), ('height', int)])):
+    __slots__ = ()
+    @property
+    def area(self):
+        return self.width * self.height
+
+
+class RemnantInventory:
+    """
+    Remnants indexed by size
+    """
+    def __init__(self, min_side: int = 1, min_area: int = 1,
+                 max_width: int = 1024) -> None:
+        self.min_side = min_side
+        self.min_area = min_area
+        self.index = FreeSpaceIndex(max_width)
+        self.next_id = 0
+
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+
+    def __iter__(self) -> Iterator[Remnant]:
+        for rect in self.index:
+            yield Remnant(rect.x, rect.width, rect.height)
+
+
+    def add(self, width: int, height: int) -> Optional[Remnant]:
+        """
+        Stores a width by height offcut and returns it as a remnant,
+        or None when it is too small to keep
+        """
+        if min(width, height) < self.min_side or width * height < self.min_area:
+            return None
+        remnant = Remnant(self.next_id, width, height)
+        self.next_id += 1
+        self._store(remnant)
+        return remnant
+
+
+    def _store(self, remnant: Remnant) -> None:
+        if remnant.width > self.index.max_width:
+            # Widen the index domain, doubling to keep rebuilds rare
+            old = self.index
+            self.index = FreeSpaceIndex(max(remnant.width, 2 * old.max_width))
+            for rect in old:
+                self.index.add(rect)
+        self.index.add(FreeRectangle(remnant.width, remnant.height,
+                                     remnant.id, 0))
+
+
+    def find(self, width: int, height: int,
+             rotation: bool = True) -> Optional[Remnant]:
+        """
+        Returns the smallest remnant by area, then the narrowest, that
+        holds a width by height item upright or, with rotation,
+        rotated, or None
+        """
+        found = [rect for rect in (self.index.find_smallest(width, height),
+                                   self.index.find_smallest(height, width)
+                                   if rotation and width != height else None)
+                 if rect is not None]
+        if not found:
+            return None
+        rect = min(found, key=lambda rect: (rect.area, rect.width))
+        return Remnant(rect.x, rect.width, rect.height)
+
+
+    def take(self, width: int, height: int,
+             rotation: bool = True) -> Optional[Remnant]:
+        """
+        Removes and returns the remnant find would return
+        """
+        remnant = self.find(width, height, rotation)
+        if remnant is not None:
+            self.remove(remnant)
+        return remnant
+
+
+    def remove(self, remnant: Remnant) -> None:
+        self.index.remove(FreeRectangle(remnant.width, remnant.height,
+                                        remnant.id, 0))
+
+
+    def restore(self, remnant: Remnant) -> None:
+        """
+        Puts back a remnant that was taken but not cut
+        """
+        self._store(remnant)
+
+
+    def save(self, path: str) -> None:
+        """
+        Writes the inventory to path as JSON, replacing it only once
+        the new file is complete
+        """
+        document = {'version': VERSION,
+                    'min_side': self.min_side,
+                    'min_area': self.min_area,
+                    'next_id': self.next_id,
+                    'remnants': [list(remnant) for remnant in self]}
+        temporary = path + '.tmp'
+        with open(temporary, 'w') as handle:
+            json.dump(document, handle, separators=(',', ':'))
+        os.replace(temporary, path)
+
+
+    @classmethod
+    def load(cls, path: str) -> 'RemnantInventory':
+        """
+        Reads an inventory saved by save
+        """
+        with open(path) as handle:
+            document = json.load(handle)
+        if document.get('version') != VERSION:
+            raise ValueError("Unsupported remnant inventory version %r"
+                             % document.get('version'))
+        remnants = [Remnant(*remnant) for remnant in document['remnants']]
+        inventory = cls(document['min_side'], document['min_area'],
+                        max([r.width for r in remnants], default=1024))
+        inventory.next_id = document['next_id']
+        for remnant in remnants:
+            inventory._store(remnant)
+        return inventory
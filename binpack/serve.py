@@ -0,0 +1,321 @@
+#!/usr/bin/env python
+"""
+Packing Service
+
+A small asyncio HTTP/JSON server around BinManager.
+
+    POST /pack    {"config": {BinManager arguments},
+                   "items": [[width, height], ...]}
+                  -> {"placements": [[item, bin, x, y, width, height]],
+                      "unplaced": [item, ...], "bins": n, ...}
+    GET /health   -> {"status": "ok", "queued": n, ...}
+
+Requests are queued and a batcher coalesces the requests that arrive
+within batch_delay of each other (up to batch_size of them) into one
+batch, which is packed by a process pool in a single call, so that
+many small requests share the cost of a round trip to a worker. At
+most one batch per worker is in flight; when the queue is full new
+requests are turned away with 503 and a Retry-After header instead of
+queueing without bound. Only the BinManager arguments in CONFIG are
+accepted from clients, and a job that fails to pack gets 400 without
+affecting the other jobs of its batch. Bin and item sides beyond
+max_side and requests of more than max_items items are refused with
+400 before they reach a worker. Should a worker die anyway, the batch
+it was packing fails with 500 and the server replaces its process
+pool, so later requests are served again.
+
+Usage:
+    python -m binpack.serve --port 8080 --workers 4
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import sys
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Optional, Tuple
+from .distributed import pack_job
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found',
+           405: 'Method Not Allowed', 413: 'Payload Too Large',
+           500: 'Internal Server Error', 503: 'Service Unavailable'}
+
+# BinManager arguments a client may set, with their types
+CONFIG = {'bin_width': int, 'bin_height': int, 'bin_algo': str,
+          'pack_algo': str, 'heuristic': str, 'sorting': bool,
+          'rotation': bool, 'wastemap': bool}
+
+
+def check_config(config) -> dict:
+    """
+    Returns a copy of a client's config, or raises ValueError for keys
+    outside CONFIG and values of the wrong type
+    """
+    if not isinstance(config, dict):
+        raise ValueError("config must be an object")
+    for key, value in config.items():
+        if key not in CONFIG:
+            raise ValueError("Unknown config key %r" % key)
+        kind = CONFIG[key]
+        # bool is an int, but not a size
+        if not isinstance(value, kind) or (kind is int and isinstance(value, bool)):
+            raise ValueError("config %r must be %s" % (key, kind.__name__))
+        if kind is int and value < 1:
+            raise ValueError("config %r must be positive" % key)
+    return dict(config)
+
+
+def pack_batch(jobs: List[Tuple[dict, list]]) -> List[dict]:
+    """
+    Packs a batch of jobs in a worker process. A job that cannot be
+    packed gets an error instead of failing the batch.
+    """
+    results = []
+    for config, dims in jobs:
+        try:
+            results.append(pack_job(check_config(config), dims))
+        except Exception as error:
+            results.append({'error': str(error) or repr(error)})
+    return results
+
+
+class PackServer:
+    """
+    Serves packing requests, batching them onto an executor
+    """
+    def __init__(self, host: str = '127.0.0.1', port: int = 8080,
+                 workers: int = 1,
+                 batch_size: int = 32,
+                 batch_delay: float = 0.005,
+                 queue_size: int = 256,
+                 max_body: int = 16 * 1024 * 1024,
+                 max_side: int = 10000,
+                 max_items: int = 100000,
+                 executor: Optional[Executor] = None) -> None:
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+        self.queue_size = queue_size
+        self.max_body = max_body
+        self.max_side = max_side
+        self.max_items = max_items
+        # Executors passed in belong to the caller, who shuts them down
+        self.own_executor = executor is None
+        self.executor = executor
+        self.stats = {'requests': 0, 'batches': 0, 'rejected': 0,
+                      'restarts': 0}
+
+
+    def _new_executor(self) -> Executor:
+        # Workers forked from the server would inherit client sockets
+        # and keep them open after the server closes them, so workers
+        # come from a fork server where there is one
+        context = None
+        if 'forkserver' in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context('forkserver')
+        return ProcessPoolExecutor(max_workers=self.workers,
+                                   mp_context=context)
+
+
+    async def start(self) -> None:
+        if self.executor is None:
+            self.executor = self._new_executor()
+        # Start the workers before the first request waits for them
+        await asyncio.get_event_loop().run_in_executor(self.executor,
+                                                       pack_batch, [])
+        self.queue = asyncio.Queue(self.queue_size)
+        self.slots = asyncio.Semaphore(self.workers)
+        self.batcher = asyncio.ensure_future(self._batch())
+        self.server = await asyncio.start_server(self._handle,
+                                                 self.host, self.port)
+        self.address = self.server.sockets[0].getsockname()[:2]
+
+
+    async def close(self) -> None:
+        self.server.close()
+        await self.server.wait_closed()
+        self.batcher.cancel()
+        if self.own_executor:
+            self.executor.shutdown()
+
+
+    async def _batch(self) -> None:
+        loop = asyncio.get_event_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.batch_delay
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(),
+                                                        timeout))
+                except asyncio.TimeoutError:
+                    break
+            await self.slots.acquire()
+            self.stats['batches'] += 1
+            asyncio.ensure_future(self._dispatch(batch))
+
+
+    async def _dispatch(self, batch: list) -> None:
+        loop = asyncio.get_event_loop()
+        executor = self.executor
+        try:
+            results = await loop.run_in_executor(
+                executor, pack_batch, [job for job, future in batch])
+        except Exception as error:
+            if (isinstance(error, BrokenProcessPool) and self.own_executor
+                    and self.executor is executor):
+                # A dead worker breaks the pool for good
+                self.stats['restarts'] += 1
+                self.executor = self._new_executor()
+                executor.shutdown(wait=False)
+            for job, future in batch:
+                if not future.done():
+                    future.set_exception(error)
+            return
+        finally:
+            self.slots.release()
+        for (job, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+
+    def _check_size(self, config: dict, dims: List[List[int]]) -> None:
+        """
+        Raises ValueError for jobs beyond the server's limits, which
+        could otherwise exhaust a worker's memory
+        """
+        if len(dims) > self.max_items:
+            raise ValueError("At most %d items per request" % self.max_items)
+        for key in ('bin_width', 'bin_height'):
+            if config.get(key, 1) > self.max_side:
+                raise ValueError("config %r must be at most %d"
+                                 % (key, self.max_side))
+        for w, h in dims:
+            if not (1 <= w <= self.max_side and 1 <= h <= self.max_side):
+                raise ValueError("Item sides must be between 1 and %d"
+                                 % self.max_side)
+
+
+    async def _submit(self, body: bytes) -> Tuple[int, dict]:
+        try:
+            request = json.loads(body.decode('utf-8'))
+            job = (request.get('config', {}),
+                   [[int(w), int(h)] for w, h in request['items']])
+        except (ValueError, KeyError, TypeError, AttributeError):
+            return 400, {'error': 'expected {"config": {...}, "items": [[w, h], ...]}'}
+        try:
+            job = (check_config(job[0]), job[1])
+            self._check_size(*job)
+        except ValueError as error:
+            return 400, {'error': str(error)}
+        future = asyncio.get_event_loop().create_future()
+        try:
+            self.queue.put_nowait((job, future))
+        except asyncio.QueueFull:
+            self.stats['rejected'] += 1
+            return 503, {'error': 'queue full'}
+        self.stats['requests'] += 1
+        try:
+            result = await future
+        except Exception as error:
+            return 500, {'error': repr(error)}
+        return (400 if 'error' in result else 200), result
+
+
+    async def _respond(self, method: str, path: str,
+                       body: bytes) -> Tuple[int, dict]:
+        if path == '/pack':
+            if method != 'POST':
+                return 405, {'error': 'use POST'}
+            return await self._submit(body)
+        if path == '/health':
+            return 200, dict(self.stats, status='ok',
+                             queued=self.queue.qsize())
+        return 404, {'error': 'not found'}
+
+
+    async def _handle(self, reader: asyncio.StreamReader,
+                      writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, version = request_line.decode('latin-1').split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get('content-length', 0))
+                if length > self.max_body:
+                    status, result = 413, {'error': 'body too large'}
+                    keep_alive = False
+                else:
+                    body = await reader.readexactly(length)
+                    status, result = await self._respond(method, path, body)
+                    keep_alive = (headers.get('connection', '').lower() != 'close'
+                                  and version == 'HTTP/1.1')
+                payload = json.dumps(result, separators=(',', ':')).encode('utf-8')
+                head = ['HTTP/1.1 %d %s' % (status, REASONS[status]),
+                        'Content-Type: application/json',
+                        'Content-Length: %d' % len(payload)]
+                if status == 503:
+                    head.append('Retry-After: 1')
+                if not keep_alive:
+                    head.append('Connection: close')
+                writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1')
+                             + payload)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ValueError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(**options) -> None:
+    server = PackServer(**options)
+    await server.start()
+    print('Serving on http://%s:%d' % tuple(server.address))
+    try:
+        await server.server.serve_forever()
+    finally:
+        await server.close()
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m binpack.serve')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--batch-delay', type=float, default=0.005)
+    parser.add_argument('--queue-size', type=int, default=256)
+    parser.add_argument('--max-side', type=int, default=10000)
+    parser.add_argument('--max-items', type=int, default=100000)
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(host=args.host, port=args.port,
+                          workers=args.workers,
+                          batch_size=args.batch_size,
+                          batch_delay=args.batch_delay,
+                          queue_size=args.queue_size,
+                          max_side=args.max_side,
+                          max_items=args.max_items))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -5,8 +5,15 @@ Shelf Style 2D Bin Algorithm and Data Structure
 Solomon Bothwell
 ssbothwell@gmail.com
 """
-from functools import reduce
+from bisect import bisect_right
+from itertools import accumulate
+from typing import Callable, List, Optional, Sequence, Tuple
+from . import heuristics
 from . import item
+from .freespace import FreeSpaceIndex, MaxTree
+from .guillotine import FreeRectangle
+from .heuristics import Strategy
+from .instrument import Instrument
 
 
 class Shelf:
@@ -47,231 +54,372 @@ class Sheet:
     Sheet class represents a sheet of material to be subdivided.
     Sheets hold a list of rows which hold a list of items.
     """
-    def __init__(self, x: int, y: int, rotation: bool = True) -> None:
+    def __init__(self, x: int, y: int, rotation: bool = True,
+                 instrument: Optional[Instrument] = None,
+                 sink: Optional[Callable[[Shelf], None]] = None,
+                 wastemap: bool = False,
+                 heuristic: str = 'next_fit') -> None:
         self.x = x if x > y else y
         self.y = y if y < x else x
         self.available_height = self.y
         self.shelves = [] # type: List[Shelf]
         self.items = [] # type: List[item.Item]
         self.rotation = rotation
+        self.instrument = instrument
+        self.strategy = heuristics.resolve('shelf', heuristic)
+        # Receives shelves closed by next fit, see _close_shelf
+        self.sink = sink
+        if wastemap and sink is not None:
+            raise ValueError("A sheet with a sink cannot keep a waste map")
+        # Gaps above short items and at the end of closed shelves
+        self.wastemap = (FreeSpaceIndex(self.x)
+                         if wastemap else None) # type: Optional[FreeSpaceIndex]
+        self.used_area = 0
+        self.free_area = self.x * self.y
 
 
     def __repr__(self) -> str:
         return "Sheet(width=%s, height=%s, shelves=%s)" % (self.x, self.y, str(self.shelves))
 
 
-    def next_fit(self, item: item.Item) -> bool:
-        fitted_shelves = [shelf for shelf
-                          in self.shelves
-                          if shelf.available_width >= item.x
-                          and shelf.y >= item.y]
-        if self.rotation:
-            fitted_shelves_rotated = [shelf for shelf
-                                      in self.shelves
-                                      if shelf.available_width >= item.y
-                                      and shelf.y >= item.x]
-        if fitted_shelves:
-            current_shelf = fitted_shelves[-1]
-            current_shelf.insert(item)
-            self.items.append(item)
-            return True
-        elif fitted_shelves_rotated:
-            current_shelf = fitted_shelves_rotated[-1]
-            item.rotate()
-            current_shelf.insert(item)
-            self.items.append(item)
+    def _fitted_shelves(self, item: item.Item,
+                        rotation: bool = False) -> List[Shelf]:
+        """
+        Returns a list of Shelves that the item fits
+        """
+        if self.instrument is not None:
+            self.instrument.record('shelves_scanned', len(self.shelves))
+            if rotation:
+                self.instrument.record('rotations_tried')
+        width = item.x if not rotation else item.y
+        height = item.y if not rotation else item.x
+        return [shelf for shelf
+                in self.shelves
+                if shelf.available_width >= width
+                and shelf.y >= height]
+
+
+    def _open_shelf_fit(self, item: item.Item) -> bool:
+        """
+        Tries only the open (last) shelf, so each call is O(1)
+        """
+        current_shelf = self.shelves[-1]
+        if self.instrument is not None:
+            self.instrument.record('shelves_scanned')
+        if current_shelf.available_width >= item.x and current_shelf.y >= item.y:
+            self._place(current_shelf, item)
             return True
-        return False
-
-
-    def first_fit(self, item) -> bool:
-        fitted_shelves = [shelf for shelf
-                          in self.shelves
-                          if shelf.available_width >= item.x
-                          and shelf.y >= item.y]
         if self.rotation:
-            fitted_shelves_rotated = [shelf for shelf
-                                      in self.shelves
-                                      if shelf.available_width >= item.y
-                                      and shelf.y >= item.x]
-        if fitted_shelves:
-            current_shelf = fitted_shelves[0]
-            current_shelf.insert(item)
-            self.items.append(item)
-            return True
-        elif fitted_shelves_rotated:
-            current_shelf = fitted_shelves_rotated[0]
-            item.rotate()
-            current_shelf.insert(item)
-            self.items.append(item)
-            return True
+            if self.instrument is not None:
+                self.instrument.record('rotations_tried')
+            if (current_shelf.available_width >= item.y and
+                    current_shelf.y >= item.x):
+                item.rotate()
+                self._place(current_shelf, item)
+                return True
         return False
 
 
-    def best_width_fit(self, item: item.Item) -> bool:
-        fitted_shelves = [shelf for shelf
-                          in self.shelves
-                          if shelf.available_width >= item.x
-                          and shelf.y >= item.y]
+    def _shelf_fit(self, item: item.Item, strategy: Strategy) -> bool:
+        """
+        Places item on the shelf strategy selects from those it fits,
+        rotating it only when no shelf fits it upright
+        """
+        if strategy.open_shelf:
+            return self._open_shelf_fit(item)
+        fitted_shelves = self._fitted_shelves(item)
         if not fitted_shelves and self.rotation:
-            fitted_shelves = [shelf for shelf in self.shelves if shelf.available_width >= item.y and shelf.y >= item.x]
+            fitted_shelves = self._fitted_shelves(item, rotation=True)
             if fitted_shelves:
                 item.rotate()
-            else:
-                return False
-        best_shelf = reduce(lambda a, b: a if (a.available_width < b.available_width) else b, fitted_shelves)
-        best_shelf.insert(item)
-        self.items.append(item)
+        if not fitted_shelves:
+            return False
+        self._place(strategy.select(fitted_shelves), item)
         return True
 
 
-    def best_height_fit(self, item) -> bool:
-        fitted_shelves = [shelf for shelf
-                          in self.shelves
-                          if shelf.available_width >= item.x
-                          and shelf.y >= item.y]
-        if not fitted_shelves and self.rotation:
-            fitted_shelves = [shelf for shelf
-                              in self.shelves
-                              if shelf.available_width >= item.y
-                              and shelf.y >= item.x]
-            if fitted_shelves:
-                item.rotate()
-            else:
-                return False
-        best_shelf = reduce(lambda a, b: a if (a.y < b.y) else b, fitted_shelves)
-        best_shelf.insert(item)
-        self.items.append(item)
-        return True
+    def fits(self, item: item.Item) -> bool:
+        """
+        True when insert would place item, without placing it
+        """
+        if item.x > self.x or item.y > self.y:
+            return False
+        if not self.shelves or item.y <= self.available_height:
+            return True
+        shelves = self.shelves[-1:] if self.strategy.open_shelf else self.shelves
+        orientations = [(item.x, item.y)]
+        if self.rotation:
+            orientations.append((item.y, item.x))
+        for width, height in orientations:
+            if any(shelf.available_width >= width and shelf.y >= height
+                   for shelf in shelves):
+                return True
+            if (self.wastemap is not None and
+                    self.wastemap.find(width, height) is not None):
+                return True
+        return False
 
 
-    def best_area_fit(self, item) -> bool:
-        fitted_shelves = [shelf for shelf
-                          in self.shelves
-                          if shelf.available_width >= item.x
-                          and shelf.y >= item.y]
-        if not fitted_shelves and self.rotation:
-            fitted_shelves = [shelf for shelf
-                              in self.shelves
-                              if shelf.available_width >= item.y
-                              and shelf.y >= item.x]
-            if fitted_shelves:
-                item.rotate()
-            else:
-                return False
-        best_shelf = reduce(lambda a, b: a if ((a.y * a.available_width) < (b.y * b.available_width)) else b, fitted_shelves)
-        best_shelf.insert(item)
-        self.items.append(item)
-        return True
+    def insert(self, item: item.Item, heuristic: Optional[str] = None) -> bool:
+        """
+        Inserts item with the sheet's strategy, or with the named
+        heuristic when one is given
+        """
+        strategy = self.strategy
+        if heuristic is not None and heuristic != strategy.name:
+            strategy = heuristics.resolve('shelf', heuristic)
+        if self.instrument is not None:
+            self.instrument.record('inserts')
+        if self._insert(item, strategy):
+            area = item.x * item.y
+            self.used_area += area
+            self.free_area -= area
+            if self.instrument is not None:
+                self.instrument.record('placed', shelves=len(self.shelves))
+            return True
+        if self.instrument is not None:
+            self.instrument.record('rejected')
+        return False
 
 
-    def worst_width_fit(self, item) -> bool:
-        fitted_shelves = [shelf for shelf in self.shelves if shelf.available_width >= item.x and shelf.y >= item.y]
-        if not fitted_shelves:
-            fitted_shelves = [shelf for shelf in self.shelves if shelf.available_width >= item.y and shelf.y >= item.x]
-            if fitted_shelves:
-                item.rotate()
-            else:
-                return False
-        best_shelf = reduce(lambda a, b: a if (a.available_width > b.available_width) else b, fitted_shelves)
-        best_shelf.insert(item)
-        self.items.append(item)
-        return True
+    def _insert(self, item: item.Item, strategy: Strategy) -> bool:
+        if item.x <= self.x and item.y <= self.y:
+            if not self.shelves:
+                new_shelf = self._new_shelf(item.y)
+                self._place(new_shelf, item)
+                return True
+            if self._shelf_fit(item, strategy):
+                return True
+            if self.wastemap is not None and self._waste_fit(item):
+                return True
+            # No shelf fit but sheet fit
+            if item.y <= self.available_height:
+                if strategy.open_shelf:
+                    # Next fit never returns to the open shelf
+                    self._close_shelf()
+                new_shelf = self._new_shelf(item.y)
+                self._place(new_shelf, item)
+                return True
+        # No sheet fit
+        return False
 
 
-    def worst_height_fit(self, item) -> bool:
-        fitted_shelves = [shelf for shelf
-                          in self.shelves
-                          if shelf.available_width >= item.x
-                          and shelf.y >= item.y]
-        if not fitted_shelves and self.rotation:
-            fitted_shelves = [shelf for shelf
-                              in self.shelves
-                              if shelf.available_width >= item.y
-                              and shelf.y >= item.x]
-            if fitted_shelves:
-                item.rotate()
-            else:
-                return False
-        worst_shelf = reduce(lambda a, b: a if (a.y > b.y) else b, fitted_shelves)
-        worst_shelf.insert(item)
+    def _place(self, shelf: Shelf, item: item.Item) -> None:
+        shelf.insert(item)
         self.items.append(item)
-        return True
+        if self.wastemap is not None and item.y < shelf.y:
+            self.wastemap.add(FreeRectangle(item.x, shelf.y - item.y,
+                                            item.CornerPoint[0],
+                                            item.CornerPoint[1] + item.y))
 
 
-    def worst_area_fit(self, item) -> bool:
-        fitted_shelves = [shelf for shelf
-                          in self.shelves
-                          if shelf.available_width >= item.x
-                          and shelf.y >= item.y]
-        if not fitted_shelves and self.rotation:
-            fitted_shelves = [shelf for shelf
-                              in self.shelves
-                              if shelf.available_width >= item.y
-                              and shelf.y >= item.x]
-            if fitted_shelves:
+    def _waste_fit(self, item: item.Item) -> bool:
+        """
+        Places item in the narrowest waste map gap that fits it and
+        returns what is left of the gap to the waste map
+        """
+        rect = self.wastemap.take(item.x, item.y)
+        if rect is None and self.rotation:
+            rect = self.wastemap.take(item.y, item.x)
+            if rect is not None:
                 item.rotate()
-            else:
-                return False
-        worst_shelf = reduce(lambda a, b: a if ((a.y * a.available_width) > (b.y * b.available_width)) else b, fitted_shelves)
-        worst_shelf.insert(item)
+        if rect is None:
+            return False
+        if self.instrument is not None:
+            self.instrument.record('wastemap_hits')
+        item.CornerPoint = (rect.x, rect.y)
         self.items.append(item)
+        self.wastemap.add(FreeRectangle(rect.width - item.x, item.y,
+                                        rect.x + item.x, rect.y))
+        self.wastemap.add(FreeRectangle(rect.width, rect.height - item.y,
+                                        rect.x, rect.y + item.y))
         return True
 
 
-    def insert(self, item: item.Item, heuristic: 'str' = 'next_fit') -> bool:
-        if item.x <= self.x and item.y <= self.y:
-            if not self.shelves:
-                new_shelf = Shelf(self.x, item.y)
-                self.shelves.append(new_shelf)
-                self.available_height -= new_shelf.y
-                new_shelf.insert(item)
-                self.items.append(item)
-                return True
+    def _new_shelf(self, height: int) -> Shelf:
+        if self.instrument is not None:
+            self.instrument.record('shelves_opened')
+        new_shelf = Shelf(self.x, height,
+                          v_offset=self.y - self.available_height)
+        self.shelves.append(new_shelf)
+        self.available_height -= height
+        return new_shelf
 
-            heuristics = {'next_fit': self.next_fit,
-                          'first_fit': self.first_fit,
-                          'best_width_fit': self.best_width_fit,
-                          'best_height_fit': self.best_height_fit,
-                          'best_area_fit': self.best_area_fit,
-                          'worst_width_fit': self.worst_width_fit,
-                          'worst_height_fit': self.worst_height_fit,
-                          'worst_area_fit': self.worst_area_fit }
-
-            if heuristic in heuristics:
-                # Call Heuristic
-                res = heuristics[heuristic](item)
-                # If item inserted successfully
-                if res:
-                    return True
-            # No shelf fit but sheet fit
-            if item.y <= self.available_height:
-                if len(self.shelves) == 1:
-                    v_offset = self.shelves[0].y
-                else:
-                    last_shelf = self.shelves[-1]
-                    v_offset = last_shelf.vertical_offset + last_shelf.y
-
-                new_shelf = Shelf(self.x, item.y, v_offset=v_offset)
-                new_shelf.insert(item)
-                self.shelves.append(new_shelf)
-                self.items.append(item)
-                self.available_height -= item.y
-                return True
-        # No sheet fit
-        return False
+
+    def _close_shelf(self) -> None:
+        """
+        Closes the open shelf. With a waste map, the space left at the
+        end of the shelf moves to the waste map. With a sink, closed
+        shelves and their items are passed to the sink and dropped
+        from the sheet, so that next fit packing holds only the open
+        shelf in memory. The sink is for callers that drive a Sheet
+        directly: BinManager and StreamPacker report on every item
+        placed, so the sheets they open take no sink and keep every
+        closed shelf.
+        """
+        if not self.shelves:
+            return
+        if self.wastemap is not None:
+            last = self.shelves[-1]
+            self.wastemap.add(FreeRectangle(last.available_width, last.y,
+                                            self.x - last.available_width,
+                                            last.vertical_offset))
+            last.available_width = 0
+        if self.sink is None:
+            return
+        closed = self.shelves.pop()
+        del self.items[:len(closed.items)]
+        if self.instrument is not None:
+            self.instrument.record('shelves_closed')
+        self.sink(closed)
+
+
+    def close(self) -> None:
+        """
+        Closes the open shelf, e.g. when the sheet itself is closed
+        """
+        self._close_shelf()
+
+
+    def _levels_apply(self, items: Sequence[item.Item]) -> bool:
+        """
+        True when items can take the level fast path: rotation and the
+        waste map are off and heights never increase, so every open
+        shelf is tall enough for every later item
+        """
+        return (not self.rotation and self.wastemap is None and
+                all(a.y >= b.y for a, b in zip(items, items[1:])))
+
+
+    def _next_fit_levels(self, items: Sequence[item.Item]) -> int:
+        # prefix[k] is the total width of items[:k]; the items that
+        # fit on a shelf are found by bisecting the running sums
+        prefix = [0] + list(accumulate(i.x for i in items))
+        current = self.shelves[-1] if self.shelves else None
+        start = 0
+        while start < len(items):
+            first = items[start]
+            if first.x > self.x:
+                break
+            if (current is None or first.y > current.y or
+                    first.x > current.available_width):
+                if first.y > self.available_height:
+                    break
+                self._close_shelf()
+                current = self._new_shelf(first.y)
+            end = bisect_right(prefix, prefix[start] + current.available_width,
+                               start + 1) - 1
+            origin = self.x - current.available_width - prefix[start]
+            for index in range(start, end):
+                items[index].CornerPoint = (origin + prefix[index],
+                                            current.vertical_offset)
+            current.items.extend(items[start:end])
+            self.items.extend(items[start:end])
+            current.available_width -= prefix[end] - prefix[start]
+            start = end
+        return start
+
+
+    def _first_fit_levels(self, items: Sequence[item.Item]) -> int:
+        tree = MaxTree([s.available_width for s in self.shelves],
+                        2 * len(self.shelves) + 1)
+        placed = 0
+        for placed, current_item in enumerate(items):
+            if current_item.x > self.x:
+                break
+            index = tree.first_at_least(current_item.x)
+            if index < 0:
+                if current_item.y > self.available_height:
+                    break
+                index = len(self.shelves)
+                if index == tree.size:
+                    tree = MaxTree([s.available_width for s in self.shelves],
+                                    2 * index)
+                self._new_shelf(current_item.y)
+            current = self.shelves[index]
+            current_item.CornerPoint = (self.x - current.available_width,
+                                        current.vertical_offset)
+            current.items.append(current_item)
+            self.items.append(current_item)
+            current.available_width -= current_item.x
+            tree.update(index, current.available_width)
+        else:
+            placed = len(items)
+        return placed
+
+
+    def pack_levels(self, items: Sequence[item.Item],
+                    heuristic: Optional[str] = None) -> int:
+        """
+        Inserts items in order and stops at the first one that does
+        not fit, returning how many were placed. With rotation off,
+        next_fit or first_fit and non-increasing heights (NFDH and
+        FFDH) the layout is computed in bulk from running sums and a
+        segment tree; otherwise every item goes through insert.
+        The heuristic defaults to the sheet's own.
+        """
+        items = list(items)
+        if heuristic is None:
+            heuristic = self.strategy.name
+        fast = (heuristic in ('next_fit', 'first_fit') and
+                self._levels_apply(items))
+        if fast and heuristic == 'first_fit' and items:
+            # Existing shelves must be tall enough for every new item
+            fast = all(s.y >= items[0].y for s in self.shelves)
+        if not fast:
+            for placed, current_item in enumerate(items):
+                if not self.insert(current_item, heuristic):
+                    return placed
+            return len(items)
+
+        if heuristic == 'next_fit':
+            placed = self._next_fit_levels(items)
+        else:
+            placed = self._first_fit_levels(items)
+        area = sum(i.x * i.y for i in items[:placed])
+        self.used_area += area
+        self.free_area -= area
+        if self.instrument is not None:
+            attempted = min(placed + 1, len(items))
+            self.instrument.record('inserts', attempted)
+            self.instrument.record('placed', placed)
+            if attempted > placed:
+                self.instrument.record('rejected')
+        return placed
+
+
+    def insert_many(self, items: Sequence[item.Item],
+                    heuristic: Optional[str] = None,
+                    start: int = 0) -> Tuple[int, int]:
+        """
+        Inserts items from index start on, in order, until one does
+        not fit. Returns the number placed and the index of the first
+        item left unplaced (len(items) when all were placed). Batches
+        take the pack_levels fast path when it applies.
+        """
+        # A batch stops before the items it places outgrow the free
+        # area, so it never reaches past the first item that would
+        # overflow it. That item stays in the slice, so a batch that
+        # does fit up to it still reports where it stopped.
+        end, area = start, 0
+        while end < len(items) and area <= self.free_area:
+            area += items[end].x * items[end].y
+            end += 1
+        placed = self.pack_levels(items[start:end], heuristic)
+        return placed, start + placed
 
 
     def bin_stats(self) -> dict:
         """
-        Returns a dictionary with compiled stats on the bin tree
+        Returns a dictionary with compiled stats on the bin tree.
+        Efficiency is read from the running used_area counter.
         """
 
         stats = {
             'width': self.x,
             'height': self.y,
             'area': self.x * self.y,
-            'efficiency': sum([i.x*i.y for i in self.items])/(self.x*self.y),
+            'efficiency': self.used_area/(self.x*self.y),
             'items': self.items,
             }
 
@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+"""
+Streaming Packer
+
+Packs an unbounded stream of items in fixed memory. Arriving items
+wait in a lookahead buffer of up to lookahead items, kept in
+decreasing area order. Each step places the largest buffered item
+that fits one of the open bins, and the largest item overall only
+when none does, so the window is used to fill the gaps in open bins
+before a new bin is started.
+Placement goes through a BinManager holding only the open bins; once
+more than open_bins are open, the fullest one is closed and emitted
+downstream and is never touched again.
+
+Longer windows and more open bins pack tighter; shorter ones bound
+memory and the time an item waits before it is placed.
+"""
+import asyncio
+from bisect import insort
+from itertools import count
+from typing import List, Optional
+from . import binmanager
+from . import item
+
+
+class StreamPacker:
+    """
+    Places items as they arrive and emits bins as they close
+    """
+    def __init__(self, bin_width: int = 8,
+                 bin_height: int = 4,
+                 pack_algo: str = 'guillotine',
+                 heuristic: str = 'best_area_fit',
+                 bin_algo: str = 'bin_best_fit',
+                 rotation: bool = True,
+                 lookahead: int = 16,
+                 open_bins: Optional[int] = 4) -> None:
+        if open_bins is not None and open_bins < 1:
+            raise ValueError("open_bins must be at least 1")
+        self.manager = binmanager.BinManager(bin_width, bin_height,
+                                             bin_algo=bin_algo,
+                                             pack_algo=pack_algo,
+                                             heuristic=heuristic,
+                                             sorting=False,
+                                             rotation=rotation)
+        self.lookahead = max(1, lookahead)
+        self.open_bins = open_bins
+        # Sorted (-area, arrival, item): the largest, then earliest, first
+        self.buffer = [] # type: List[tuple]
+        self.arrivals = count()
+        self.placed = 0
+        self.failed = [] # type: List[item.Item]
+        self.closed = 0
+
+
+    def push(self, new_item: item.Item) -> List[binmanager.Algorithm]:
+        """
+        Buffers new_item, placing buffered items while the buffer is
+        full. Returns the bins closed in the process.
+        """
+        insort(self.buffer, (-new_item.x * new_item.y,
+                             next(self.arrivals), new_item))
+        closed = []
+        while len(self.buffer) >= self.lookahead:
+            closed.extend(self._step())
+        return closed
+
+
+    def _select(self) -> item.Item:
+        """
+        Takes the largest buffered item that fits an open bin, or the
+        largest item when none fits
+        """
+        bins = self.manager.bins
+        for position, entry in enumerate(self.buffer):
+            if any(binn.fits(entry[2]) for binn in bins):
+                return self.buffer.pop(position)[2]
+        return self.buffer.pop(0)[2]
+
+
+    def _step(self) -> List[binmanager.Algorithm]:
+        current = self._select()
+        manager = self.manager
+        if not manager.bins:
+            manager._new_bin()
+        if manager.bin_sel_algo(current):
+            self.placed += 1
+        else:
+            self.failed.append(current)
+        closed = []
+        if self.open_bins is not None:
+            while len(manager.bins) > self.open_bins:
+                fullest = max(manager.bins, key=lambda binn: binn.used_area)
+                manager.bins.remove(fullest)
+                closed.append(fullest)
+        self.closed += len(closed)
+        return closed
+
+
+    def flush(self) -> List[binmanager.Algorithm]:
+        """
+        Places every buffered item and closes all bins holding items
+        """
+        closed = []
+        while self.buffer:
+            closed.extend(self._step())
+        remaining = [binn for binn in self.manager.bins if binn.items]
+        self.manager.bins = [binn for binn in self.manager.bins
+                             if not binn.items]
+        self.closed += len(remaining)
+        return closed + remaining
+
+
+    async def run(self, source: asyncio.Queue, sink: asyncio.Queue) -> dict:
+        """
+        Packs the items from source until it yields None, putting
+        every closed bin on sink followed by None. A bounded sink
+        holds the packer back while downstream catches up.
+        """
+        while True:
+            new_item = await source.get()
+            if new_item is None:
+                break
+            for binn in self.push(new_item):
+                await sink.put(binn)
+        for binn in self.flush():
+            await sink.put(binn)
+        await sink.put(None)
+        return self.stats()
+
+
+    def stats(self) -> dict:
+        return {'placed': self.placed,
+                'failed': len(self.failed),
+                'closed': self.closed,
+                'open': len(self.manager.bins),
+                'buffered': len(self.buffer)}
@@ -0,0 +1,181 @@
+#!/usr/bin/env python
+"""
+Auto Tuner
+
+Picks a pack_algo/heuristic combination for a workload before the
+full run. A stratified sample of the items (an equal share from every
+area quantile) is packed with each candidate configuration and the
+sample's efficiency and throughput are extrapolated to the whole
+workload. The most efficient configuration wins, with throughput
+breaking near ties, and the full job is packed once with it.
+
+Decisions are cached per workload fingerprint, a histogram of item
+sizes relative to the bin, together with the bin_algo and the set of
+candidate configurations, so repeat jobs with the same size
+distribution skip tuning entirely. The cache lives in memory and is
+optionally persisted to a JSON file.
+"""
+import hashlib
+import json
+import math
+import os
+import random
+import time
+from typing import Dict, List, Optional, Tuple
+from . import benchmark
+from . import binmanager
+from . import workload
+
+
+def fingerprint(dims: List[workload.Dimensions],
+                bin_width: int, bin_height: int,
+                buckets: int = 4, precision: int = 1) -> str:
+    """
+    Returns a digest of the size distribution of dims. Item sides are
+    bucketed relative to the bin and bucket frequencies are rounded,
+    so the fingerprint ignores item order and small changes in the
+    mix. Coarser buckets and precision match more workloads.
+    """
+    histogram = [0] * (buckets * buckets)
+    for w, h in dims:
+        column = min(buckets - 1, int(w * buckets / bin_width))
+        row = min(buckets - 1, int(h * buckets / bin_height))
+        histogram[row * buckets + column] += 1
+    total = len(dims) or 1
+    key = [bin_width, bin_height] + [round(count / total, precision)
+                                     for count in histogram]
+    return hashlib.sha1(json.dumps(key).encode('utf-8')).hexdigest()
+
+
+def stratified_sample(dims: List[workload.Dimensions], size: int,
+                      seed: int = 0) -> List[workload.Dimensions]:
+    """
+    Returns up to size items, one drawn at random from each of size
+    equally populated area strata
+    """
+    if size >= len(dims):
+        return list(dims)
+    rng = random.Random(seed)
+    ordered = sorted(dims, key=lambda d: d[0] * d[1])
+    sample = []
+    for stratum in range(size):
+        start = stratum * len(ordered) // size
+        end = (stratum + 1) * len(ordered) // size
+        sample.append(ordered[rng.randrange(start, end)])
+    return sample
+
+
+class Tuner:
+    """
+    Chooses and caches the best configuration per workload fingerprint
+    """
+    def __init__(self, bin_width: int = 100,
+                 bin_height: int = 50,
+                 bin_algo: str = 'bin_best_fit',
+                 configs: List[Tuple[str, str]] = None,
+                 sample_size: int = 200,
+                 tolerance: float = 0.005,
+                 cache_path: Optional[str] = None,
+                 seed: int = 0) -> None:
+        self.bin_width = bin_width
+        self.bin_height = bin_height
+        self.bin_algo = bin_algo
+        self.configs = configs if configs is not None else benchmark.CONFIGS
+        self.sample_size = sample_size
+        self.tolerance = tolerance
+        self.cache_path = cache_path
+        self.seed = seed
+        self.cache = {} # type: Dict[str, dict]
+        if cache_path is not None and os.path.exists(cache_path):
+            with open(cache_path) as handle:
+                self.cache = json.load(handle)
+
+
+    def _config(self, pack_algo: str, heuristic: str) -> dict:
+        return {'bin_width': self.bin_width,
+                'bin_height': self.bin_height,
+                'bin_algo': self.bin_algo,
+                'pack_algo': pack_algo,
+                'heuristic': heuristic}
+
+
+    def evaluate(self, dims: List[workload.Dimensions]) -> List[dict]:
+        """
+        Packs a stratified sample with every configuration and returns
+        one estimate per configuration for the full workload
+        """
+        sample = stratified_sample(dims, self.sample_size, self.seed)
+        total_area = sum(w * h for w, h in dims)
+        estimates = []
+        for pack_algo, heuristic in self.configs:
+            manager = binmanager.BinManager(**self._config(pack_algo, heuristic))
+            manager.add_items(*workload.to_items(sample))
+            start = time.perf_counter()
+            manager.execute()
+            elapsed = time.perf_counter() - start
+            efficiency = manager.stats()['efficiency']
+            throughput = len(sample) / elapsed if elapsed else float('inf')
+            bin_area = self.bin_width * self.bin_height
+            estimates.append({
+                'pack_algo': pack_algo,
+                'heuristic': heuristic,
+                'efficiency': efficiency,
+                'throughput': throughput,
+                'bins': (math.ceil(total_area / (bin_area * efficiency))
+                         if efficiency else None),
+                'seconds': len(dims) / throughput,
+                })
+        return estimates
+
+
+    def _pick(self, estimates: List[dict]) -> dict:
+        best = max(e['efficiency'] for e in estimates)
+        close = [e for e in estimates if e['efficiency'] >= best - self.tolerance]
+        return max(close, key=lambda e: e['throughput'])
+
+
+    def cache_key(self, dims: List[workload.Dimensions]) -> str:
+        """
+        Returns the cache key of dims: its fingerprint, the bin_algo
+        and the candidate configurations, as any of them can change
+        the decision
+        """
+        key = [fingerprint(dims, self.bin_width, self.bin_height),
+               self.bin_algo, sorted(map(list, self.configs))]
+        return hashlib.sha1(json.dumps(key).encode('utf-8')).hexdigest()
+
+
+    def choose(self, dims: List[workload.Dimensions]) -> dict:
+        """
+        Returns the winning estimate for dims, tuning only when the
+        workload's cache key has not been seen before
+        """
+        key = self.cache_key(dims)
+        if key not in self.cache:
+            self.cache[key] = self._pick(self.evaluate(dims))
+            if self.cache_path is not None:
+                self._save()
+        return self.cache[key]
+
+
+    def _save(self) -> None:
+        """
+        Writes the cache to cache_path, replacing it only once the new
+        file is complete
+        """
+        temporary = self.cache_path + '.tmp'
+        with open(temporary, 'w') as handle:
+            json.dump(self.cache, handle, indent=2, sort_keys=True)
+        os.replace(temporary, self.cache_path)
+
+
+    def pack(self, dims: List[workload.Dimensions]) -> binmanager.BinManager:
+        """
+        Packs dims once with the chosen configuration
+        """
+        choice = self.choose(dims)
+        manager = binmanager.BinManager(**self._config(choice['pack_algo'],
+                                                       choice['heuristic']))
+        manager.add_items(*workload.to_items(dims))
+        manager.execute()
+        return manager
@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+"""
+Workloads
+
+Item sets used for benchmarking and profiling. A workload is a
+list of (width, height) tuples which is either generated from a
+seeded random distribution or loaded from a JSON, JSONL or CSV
+file. Dimensions are kept as plain tuples so the same workload can
+be turned into fresh Item objects for every run.
+"""
+import csv
+import json
+import random
+from typing import List, Tuple, Iterable
+from . import item
+
+# Type Aliases:
+Dimensions = Tuple[int, int]
+
+
+def generate(count: int = 1000,
+             bin_width: int = 100,
+             bin_height: int = 50,
+             min_ratio: float = 0.05,
+             max_ratio: float = 0.5,
+             seed: int = 0) -> List[Dimensions]:
+    """
+    Returns count random item dimensions whose sides fall between
+    min_ratio and max_ratio of the bin sides.
+    """
+    rng = random.Random(seed)
+    min_w = max(1, int(bin_width * min_ratio))
+    max_w = max(min_w, int(bin_width * max_ratio))
+    min_h = max(1, int(bin_height * min_ratio))
+    max_h = max(min_h, int(bin_height * max_ratio))
+    return [(rng.randint(min_w, max_w), rng.randint(min_h, max_h))
+            for _ in range(count)]
+
+
+def _parse_record(record) -> Dimensions:
+    """
+    Returns the dimensions of a single JSON record. Records are
+    either [width, height] pairs or objects with width/height keys.
+    """
+    if isinstance(record, dict):
+        return (int(record['width']), int(record['height']))
+    width, height = record
+    return (int(width), int(height))
+
+
+def parse(lines: Iterable[str], fmt: str = 'jsonl') -> Iterable[Dimensions]:
+    """
+    Lazily yields item dimensions from lines of JSONL or CSV.
+    CSV input may have a width,height header row.
+    """
+    if fmt == 'jsonl':
+        for line in lines:
+            line = line.strip()
+            if line:
+                yield _parse_record(json.loads(line))
+    elif fmt == 'csv':
+        for row in csv.reader(lines):
+            if not row:
+                continue
+            if row[0].strip().lower() == 'width':
+                continue
+            yield (int(row[0]), int(row[1]))
+    else:
+        raise ValueError("Unknown workload format: %r" % fmt)
+
+
+def load(path: str) -> List[Dimensions]:
+    """
+    Loads item dimensions from a .json, .jsonl or .csv file
+    """
+    with open(path, newline='') as handle:
+        if path.endswith('.json'):
+            return [_parse_record(record) for record in json.load(handle)]
+        if path.endswith('.csv'):
+            return list(parse(handle, 'csv'))
+        return list(parse(handle, 'jsonl'))
+
+
+def to_items(dims: Iterable[Dimensions]) -> List[item.Item]:
+    """
+    Returns fresh Item objects for a workload
+    """
+    return [item.Item(width, height) for width, height in dims]
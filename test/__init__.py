@@ -3,6 +3,26 @@ import unittest
 from . import test_api
 from . import test_shelf
 from . import test_guillotine
+from . import test_workload
+from . import test_benchmark
+from . import test_instrument
+from . import test_metrics
+from . import test_profile
+from . import test_anytime
+from . import test_bounds
+from . import test_beam
+from . import test_tuner
+from . import test_grid
+from . import test_freespace
+from . import test_heuristics
+from . import test_parallel
+from . import test_distributed
+from . import test_serve
+from . import test_streaming
+from . import test_cli
+from . import test_checkpoint
+from . import test_catalog
+from . import test_remnants
 
 def load_tests(loader, standard_tests, pattern):
     if pattern == __name__:
@@ -12,6 +32,26 @@ def load_tests(loader, standard_tests, pattern):
         test_api,
         test_shelf,
         test_guillotine,
+        test_workload,
+        test_benchmark,
+        test_instrument,
+        test_metrics,
+        test_profile,
+        test_anytime,
+        test_bounds,
+        test_beam,
+        test_tuner,
+        test_grid,
+        test_freespace,
+        test_heuristics,
+        test_parallel,
+        test_distributed,
+        test_serve,
+        test_streaming,
+        test_cli,
+        test_checkpoint,
+        test_catalog,
+        test_remnants,
     ]:
         tests = (unittest.defaultTestLoader
                  .loadTestsFromModule(test_module, pattern=pattern))
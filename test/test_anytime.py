@@ -0,0 +1,80 @@
+import sys
+import unittest
+
+import binpack
+from binpack import workload
+
+from .base import BaseTestCase
+from .util import LayoutAssertions
+
+
+class Improve(LayoutAssertions, BaseTestCase):
+    def _manager(self, pack_algo):
+        M = binpack.BinManager(100, 50, pack_algo=pack_algo,
+                               heuristic='best_area_fit')
+        M.add_items(*workload.to_items(workload.generate(150, 100, 50)))
+        M.execute()
+        return M
+
+
+    def testShelf(self):
+        """
+        Re-packed shelf layouts never use more bins and stay valid
+        """
+        M = self._manager('shelf')
+        before = len(M.bins)
+        result = M.improve(time_limit=5, max_iterations=200, seed=1)
+        with self.subTest():
+            self.assertEqual(result['iterations'], 200)
+        with self.subTest():
+            self.assertLessEqual(len(M.bins), before)
+        with self.subTest():
+            self.assertEqual(result['bins_after'], len(M.bins))
+        with self.subTest():
+            self.assertEqual(M.stats()['area'], len(M.bins) * 5000)
+        self.assertLayoutValid(M)
+
+
+    def testGuillotine(self):
+        M = self._manager('guillotine')
+        before = len(M.bins)
+        M.improve(time_limit=5, max_iterations=200, seed=1)
+        with self.subTest():
+            self.assertLessEqual(len(M.bins), before)
+        self.assertLayoutValid(M)
+
+
+    def testDeadline(self):
+        """
+        An expired time limit leaves the greedy layout in place
+        """
+        M = self._manager('shelf')
+        bins = list(M.bins)
+        result = M.improve(time_limit=0)
+        with self.subTest():
+            self.assertEqual(result['iterations'], 0)
+        with self.subTest():
+            self.assertEqual(M.bins, bins)
+
+
+    def testTarget(self):
+        """
+        The search stops once the target bin count is reached
+        """
+        M = self._manager('shelf')
+        result = M.improve(time_limit=5, target=len(M.bins))
+        self.assertEqual(result['iterations'], 0)
+
+
+def load_tests(loader, tests, pattern):
+    suite = unittest.TestSuite()
+    if pattern is None:
+        suite.addTests(loader.loadTestsFromTestCase(Improve))
+    else:
+        tests = loader.loadTestsFromName(pattern,
+                                         module=sys.modules[__name__])
+        failedTests = [t for t in tests._tests
+                       if type(t) == unittest.loader._FailedTest]
+        if len(failedTests) == 0:
+            suite.addTests(tests)
+    return suite
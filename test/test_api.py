@@ -1,7 +1,10 @@
+import random
 import sys
+import threading
 import unittest
 
 import binpack
+from binpack.instrument import Instrument
 
 from .base import BaseTestCase
 from .util import stdout_redirect
@@ -244,12 +247,208 @@ class BinFirstFit(BaseTestCase):
             self.assertEqual(ITEM3.CornerPoint, (4,1))
 
 
+class BinNextFit(BaseTestCase):
+    def testFillsInOrder(self):
+        """
+        Bins are filled in turn and never revisited
+        """
+        M = binpack.BinManager(10, 5, pack_algo='guillotine',
+                               bin_algo='bin_next_fit',
+                               heuristic='first_fit', sorting=False)
+        M.add_items(binpack.Item(12, 5), binpack.Item(6, 5),
+                    binpack.Item(5, 5), binpack.Item(4, 5))
+        M.execute()
+        with self.subTest():
+            self.assertEqual(len(M.bins), 2)
+        with self.subTest():
+            self.assertEqual([len(b.items) for b in M.bins], [1, 2])
+        with self.subTest():
+            self.assertEqual((M.items_placed, M.items_failed), (3, 1))
+        with self.subTest():
+            self.assertEqual(M.used_area, 75)
+
+
+    def testBatchMatchesItemByItem(self):
+        """
+        The batched run matches the item by item (instrumented) run
+        """
+        rng = random.Random(3)
+        dims = [(rng.randint(1, 12), rng.randint(1, 8)) for _ in range(120)]
+        for pack_algo, heuristic in [('shelf', 'next_fit'),
+                                     ('shelf', 'best_area_fit'),
+                                     ('guillotine', 'best_area_fit'),
+                                     ('grid', 'bottom_left')]:
+            layouts = []
+            for instrument in (None, Instrument()):
+                M = binpack.BinManager(12, 8, pack_algo=pack_algo,
+                                       bin_algo='bin_next_fit',
+                                       heuristic=heuristic,
+                                       instrument=instrument)
+                M.add_items(*[binpack.Item(w, h) for w, h in dims])
+                M.execute()
+                layouts.append(([[(i.x, i.y, i.CornerPoint) for i in b.items]
+                                 for b in M.bins], M.stats()))
+            with self.subTest(pack_algo=pack_algo, heuristic=heuristic):
+                self.assertEqual(layouts[0], layouts[1])
+
+
+class Budget(BaseTestCase):
+    def _manager(self, **options):
+        M = binpack.BinManager(10, 5, pack_algo='guillotine', **options)
+        M.add_items(*[binpack.Item(5, 5) for _ in range(6)])
+        return M
+
+
+    def testComplete(self):
+        result = self._manager().execute()
+        with self.subTest():
+            self.assertEqual((result['complete'], result['stopped']),
+                             (True, None))
+        with self.subTest():
+            self.assertEqual((result['placed'], result['bins']), (6, 3))
+        with self.subTest():
+            self.assertEqual(result['unplaced'], [])
+
+
+    def testTimeLimit(self):
+        M = self._manager()
+        result = M.execute(time_limit=0)
+        with self.subTest():
+            self.assertEqual(result['stopped'], 'time_limit')
+        with self.subTest():
+            self.assertEqual(result['unplaced'], M.items)
+        with self.subTest():
+            self.assertEqual(M.stats()['items_failed'], 0)
+
+
+    def testMaxBins(self):
+        """
+        Items that need a bin beyond the cap are unplaced
+        """
+        for bin_algo in ('bin_best_fit', 'bin_first_fit', 'bin_next_fit'):
+            M = self._manager(bin_algo=bin_algo)
+            result = M.execute(max_bins=2)
+            with self.subTest(bin_algo=bin_algo):
+                self.assertEqual(len(M.bins), 2)
+            with self.subTest(bin_algo=bin_algo):
+                self.assertEqual(result['unplaced'], M.items[4:])
+            with self.subTest(bin_algo=bin_algo):
+                self.assertTrue(result['complete'])
+        with self.subTest():
+            self.assertRaises(ValueError, self._manager().execute, max_bins=0)
+
+
+    def testCancelAndProgress(self):
+        """
+        A cancel token set mid run stops before the next item, and
+        progress is reported throttled and once at the end
+        """
+        M = self._manager()
+        cancel = threading.Event()
+        reports = []
+        def progress(report):
+            reports.append(report)
+            if report['placed'] == 3:
+                cancel.set()
+        result = M.execute(cancel=cancel, progress=progress,
+                           progress_interval=0)
+        with self.subTest():
+            self.assertEqual(result['stopped'], 'cancelled')
+        with self.subTest():
+            self.assertEqual(result['unplaced'], M.items[4:])
+        with self.subTest():
+            self.assertEqual([r['placed'] for r in reports], [0, 1, 2, 3, 4])
+        with self.subTest():
+            self.assertEqual(reports[-1]['bins'], 2)
+
+
+class Stats(BaseTestCase):
+    def testTotals(self):
+        """
+        Manager totals follow placements without rescanning bins
+        """
+        M = binpack.BinManager(10, 5, pack_algo='guillotine',
+                               bin_algo='bin_first_fit')
+        ITEM = binpack.Item(6, 5)
+        ITEM2 = binpack.Item(5, 5)
+        ITEM3 = binpack.Item(4, 3)
+        M.add_items(ITEM, ITEM2, ITEM3)
+        M.execute()
+        correct = {
+            'bins': 2,
+            'area': 100,
+            'used_area': 67,
+            'waste': 33,
+            'efficiency': 0.67,
+            'items_placed': 3,
+            'items_failed': 0,
+            }
+        self.assertEqual(M.stats(), correct)
+
+
+    def testPerBin(self):
+        M = binpack.BinManager(10, 5, pack_algo='shelf')
+        M.add_items(binpack.Item(4, 3), binpack.Item(2, 2))
+        M.execute()
+        correct = [{'width': 10, 'height': 5, 'used_area': 16,
+                    'free_area': 34, 'items': 2}]
+        self.assertEqual(M.stats(per_bin=True)['per_bin'], correct)
+
+
+    def testFailedItems(self):
+        """
+        Items larger than the bins are counted as failed
+        """
+        M = binpack.BinManager(10, 5, pack_algo='guillotine')
+        M.add_items(binpack.Item(12, 5), binpack.Item(2, 2))
+        M.execute()
+        stats = M.stats()
+        with self.subTest():
+            self.assertEqual(stats['items_failed'], 1)
+        with self.subTest():
+            self.assertEqual(stats['items_placed'], 1)
+
+
+    def testFailedItemsOpenNoBin(self):
+        """
+        An item no empty bin holds leaves no empty bin behind
+        """
+        for bin_algo in ('bin_best_fit', 'bin_first_fit'):
+            for pack_algo in ('guillotine', 'shelf', 'grid'):
+                M = binpack.BinManager(10, 10, bin_algo=bin_algo,
+                                       pack_algo=pack_algo, sorting=False)
+                M.add_items(binpack.Item(5, 5), binpack.Item(20, 20),
+                            binpack.Item(5, 5))
+                M.execute(max_bins=2)
+                with self.subTest(bin_algo=bin_algo, pack_algo=pack_algo):
+                    self.assertEqual(len(M.bins), 1)
+                with self.subTest(bin_algo=bin_algo, pack_algo=pack_algo):
+                    self.assertEqual(M.stats()['efficiency'], 0.5)
+
+
+    def testBestFitBinIndex(self):
+        """
+        Best bin fit inserts into the selected bin, not the last one
+        """
+        M = binpack.BinManager(10, 5, pack_algo='guillotine', sorting=False)
+        M.add_items(binpack.Item(8, 5), binpack.Item(10, 5),
+                    binpack.Item(2, 2))
+        M.execute()
+        with self.subTest():
+            self.assertEqual(M.stats()['items_placed'], 3)
+        with self.subTest():
+            self.assertEqual(len(M.bins), 2)
+
+
 def load_tests(loader, tests, pattern):
     suite = unittest.TestSuite()
     if pattern is None:
         suite.addTests(loader.loadTestsFromTestCase(APITests))
         suite.addTests(loader.loadTestsFromTestCase(BestBinFit))
         suite.addTests(loader.loadTestsFromTestCase(BinFirstFit))
+        suite.addTests(loader.loadTestsFromTestCase(BinNextFit))
+        suite.addTests(loader.loadTestsFromTestCase(Budget))
+        suite.addTests(loader.loadTestsFromTestCase(Stats))
     else:
         tests = loader.loadTestsFromName(pattern,
                                          module=sys.modules[__name__])
@@ -0,0 +1,153 @@
+import sys
+import unittest
+
+import binpack
+from binpack import beam, heuristics, workload
+
+from .base import BaseTestCase
+from .util import LayoutAssertions
+
+
+class Beam(LayoutAssertions, BaseTestCase):
+    def _manager(self, pack_algo, count=60):
+        M = binpack.BinManager(100, 50, pack_algo=pack_algo,
+                               heuristic='best_area_fit')
+        M.add_items(*workload.to_items(workload.generate(count, 100, 50)))
+        return M
+
+
+    def _search(self, M, beam_width):
+        """
+        Returns the bins of a raw beam search over M's items, without
+        the greedy layout execute_beam falls back to
+        """
+        search = beam.BeamSearch(M.bin_width, M.bin_height, M.algorithm,
+                                 M.heuristic, M.rotation, beam_width)
+        return search.search([(i.x, i.y) for i in M.items])[0]
+
+
+    def testGuillotine(self):
+        """
+        Beam layouts are valid and use no more bins than greedy
+        """
+        greedy = self._manager('guillotine')
+        greedy.execute()
+        M = self._manager('guillotine')
+        with self.subTest():
+            self.assertLessEqual(len(self._search(M, 4)), len(greedy.bins))
+        result = M.execute_beam(beam_width=4)
+        with self.subTest():
+            self.assertEqual(result['placed'], 60)
+        with self.subTest():
+            self.assertEqual(M.stats()['used_area'],
+                             sum(i.x * i.y for i in M.items))
+        self.assertLayoutValid(M)
+
+
+    def testShelf(self):
+        greedy = self._manager('shelf')
+        greedy.execute()
+        M = self._manager('shelf')
+        with self.subTest():
+            self.assertLessEqual(len(self._search(M, 4)), len(greedy.bins))
+        M.execute_beam(beam_width=4)
+        for binn in M.bins:
+            with self.subTest():
+                self.assertEqual(sorted(map(id, binn.items)),
+                                 sorted(id(i) for s in binn.shelves
+                                        for i in s.items))
+        self.assertLayoutValid(M)
+
+
+    def testHeuristics(self):
+        """
+        A beam of width 8 uses no more bins than greedy, whatever the
+        heuristic. A beam of width one ranks placements across all
+        bins, so it can do worse.
+        """
+        for pack_algo in ('guillotine', 'shelf'):
+            for heuristic in heuristics.STRATEGIES[pack_algo]:
+                for seed in range(4):
+                    dims = workload.generate(150, 100, 50, seed=seed)
+                    M = binpack.BinManager(100, 50, pack_algo=pack_algo,
+                                           heuristic=heuristic)
+                    M.add_items(*workload.to_items(dims))
+                    bins = self._search(M, 8)
+                    M.execute()
+                    with self.subTest(pack_algo=pack_algo,
+                                      heuristic=heuristic, seed=seed):
+                        self.assertLessEqual(len(bins), len(M.bins))
+
+
+    def testNewShelf(self):
+        """
+        New shelves are opened upright rather than rotated taller
+        """
+        search = beam.BeamSearch(10, 5, 'shelf', 'best_width_fit', 1)
+        bins, placements, failed = search.search([(4, 2)])
+        self.assertEqual(bins[0][0], 3)
+
+
+    def testSharedCandidates(self):
+        """
+        Candidates are computed once per bin state shared between
+        layouts, so a beam of width 8 evaluates under half the bin
+        states of 8 beams of width one
+        """
+        dims = workload.generate(400, 100, 50, seed=0)
+        evaluations = []
+        for beam_width in (1, 8):
+            search = beam.BeamSearch(100, 50, 'guillotine', 'best_area_fit',
+                                     beam_width=beam_width)
+            search.search(dims)
+            evaluations.append(search.evaluations)
+        self.assertLess(evaluations[1], 4 * evaluations[0])
+
+
+    def testWidthOne(self):
+        """
+        A beam of width one follows the greedy heuristic
+        """
+        greedy = self._manager('guillotine')
+        greedy.execute()
+        M = self._manager('guillotine')
+        self.assertEqual(len(self._search(M, 1)), len(greedy.bins))
+
+
+    def testSymmetry(self):
+        """
+        Identical items collapse to a single layout per step
+        """
+        search = beam.BeamSearch(4, 4, 'guillotine', 'best_area_fit',
+                                 beam_width=8)
+        bins, placements, failed = search.search([(2, 2)] * 4)
+        with self.subTest():
+            self.assertEqual(len(bins), 1)
+        with self.subTest():
+            self.assertEqual(bins[0][1], 16)
+
+
+    def testOversized(self):
+        M = binpack.BinManager(10, 5, pack_algo='guillotine')
+        M.add_items(binpack.Item(20, 20), binpack.Item(3, 3))
+        result = M.execute_beam()
+        with self.subTest():
+            self.assertEqual(len(result['failed']), 1)
+        with self.subTest():
+            self.assertEqual(M.stats()['items_failed'], 1)
+        with self.subTest():
+            self.assertEqual(len(M.bins), 1)
+
+
+def load_tests(loader, tests, pattern):
+    suite = unittest.TestSuite()
+    if pattern is None:
+        suite.addTests(loader.loadTestsFromTestCase(Beam))
+    else:
+        tests = loader.loadTestsFromName(pattern,
+                                         module=sys.modules[__name__])
+        failedTests = [t for t in tests._tests
+                       if type(t) == unittest.loader._FailedTest]
+        if len(failedTests) == 0:
+            suite.addTests(tests)
+    return suite
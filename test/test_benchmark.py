@@ -0,0 +1,171 @@
+import io
+import os
+import sys
+import tempfile
+import unittest
+
+from binpack import benchmark
+from binpack import workload
+
+from .base import BaseTestCase
+from .util import stdout_redirect
+
+
+def _document(throughput, peak_memory):
+    return {
+        'version': benchmark.FORMAT_VERSION,
+        'machine': {'id': 'abc'},
+        'revision': 'rev',
+        'results': [{'pack_algo': 'shelf',
+                     'heuristic': 'first_fit',
+                     'bin_algo': 'bin_best_fit',
+                     'throughput': throughput,
+                     'peak_memory': peak_memory,
+                     'bins': 3,
+                     'efficiency': 0.8}],
+        }
+
+
+class Run(BaseTestCase):
+    def testDocument(self):
+        """
+        A run records the machine, revision, config and one result
+        per configuration
+        """
+        dims = workload.generate(30, 20, 10)
+        configs = [('shelf', 'first_fit'), ('guillotine', 'best_area_fit')]
+        document = benchmark.run(dims, 20, 10, configs=configs, repeats=2)
+        with self.subTest():
+            self.assertEqual(document['version'], benchmark.FORMAT_VERSION)
+        with self.subTest():
+            self.assertIn('id', document['machine'])
+        with self.subTest():
+            self.assertIn('revision', document)
+        with self.subTest():
+            self.assertEqual(document['config']['items'], 30)
+        with self.subTest():
+            self.assertEqual([(r['pack_algo'], r['heuristic'])
+                              for r in document['results']], configs)
+        with self.subTest():
+            result = document['results'][0]
+            self.assertEqual(len(result['throughput']), 2)
+            self.assertGreater(result['peak_memory'], 0)
+            self.assertGreater(result['bins'], 0)
+        with self.subTest():
+            result = document['results'][0]
+            self.assertEqual(result['gap'],
+                             result['bins'] - document['config']['lower_bound'])
+
+
+    def testParallel(self):
+        """
+        Cheap bin selection is packed serially, costly selection is
+        sharded
+        """
+        dims = workload.generate(400, 100, 50, seed=1)
+        configs = [('shelf', 'best_width_fit', 'bin_next_fit'),
+                   ('guillotine', 'best_area_fit', 'bin_best_fit')]
+        document = benchmark.run_parallel(dims, configs=configs, workers=2,
+                                          min_work=1000)
+        with self.subTest():
+            self.assertEqual([r['sharded'] for r in document['results']],
+                             [False, True])
+        with self.subTest():
+            result = document['results'][0]
+            self.assertEqual(result['parallel_bins'], result['serial_bins'])
+        with self.subTest():
+            self.assertGreater(document['results'][1]['parallel_seconds'], 0)
+
+
+    def testCheckpoint(self):
+        dims = workload.generate(200, 100, 50, seed=2)
+        document = benchmark.run_checkpoint(dims, repeats=1)
+        with self.subTest():
+            self.assertEqual([r['pack_algo'] for r in document['results']],
+                             ['guillotine', 'shelf', 'grid'])
+        for result in document['results']:
+            with self.subTest(pack_algo=result['pack_algo']):
+                self.assertLess(result['checkpoint_bytes'],
+                                result['pickle_bytes'])
+            with self.subTest(pack_algo=result['pack_algo']):
+                self.assertGreater(result['checkpoint_load'], 0)
+
+
+    def testSaveLoad(self):
+        """
+        Documents round trip through JSON files
+        """
+        document = _document([100.0, 110.0], 1000)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'run.json')
+            benchmark.save(document, path)
+            self.assertEqual(benchmark.load(path), document)
+
+
+class Compare(BaseTestCase):
+    def testThroughputRegression(self):
+        """
+        A consistent drop in throughput is flagged as significant
+        """
+        old = _document([100.0, 101.0, 99.0, 100.5], 1000)
+        new = _document([80.0, 81.0, 79.0, 80.5], 1000)
+        regressions = benchmark.compare(old, new)
+        with self.subTest():
+            self.assertEqual([r.metric for r in regressions], ['throughput'])
+        with self.subTest():
+            self.assertTrue(regressions[0].significant)
+
+
+    def testNoisyThroughput(self):
+        """
+        A drop within the noise of the samples is not significant
+        """
+        old = _document([100.0, 60.0, 140.0], 1000)
+        new = _document([90.0, 50.0, 130.0], 1000)
+        regressions = benchmark.compare(old, new)
+        self.assertFalse(regressions[0].significant)
+
+
+    def testMemoryRegression(self):
+        old = _document([100.0, 100.0], 1000)
+        new = _document([100.0, 100.0], 2000)
+        regressions = benchmark.compare(old, new)
+        self.assertEqual([r.metric for r in regressions], ['peak_memory'])
+
+
+    def testNoRegression(self):
+        old = _document([100.0, 100.0], 1000)
+        new = _document([120.0, 121.0], 900)
+        self.assertEqual(benchmark.compare(old, new), [])
+
+
+    def testMain(self):
+        """
+        compare exits non-zero when a regression is found
+        """
+        with tempfile.TemporaryDirectory() as tmp:
+            old_path = os.path.join(tmp, 'old.json')
+            new_path = os.path.join(tmp, 'new.json')
+            benchmark.save(_document([100.0, 101.0], 1000), old_path)
+            benchmark.save(_document([50.0, 51.0], 1000), new_path)
+            with stdout_redirect(io.StringIO()) as output:
+                status = benchmark.main(['compare', old_path, new_path])
+            with self.subTest():
+                self.assertEqual(status, 1)
+            with self.subTest():
+                self.assertIn('throughput', output.read())
+
+
+def load_tests(loader, tests, pattern):
+    suite = unittest.TestSuite()
+    if pattern is None:
+        suite.addTests(loader.loadTestsFromTestCase(Run))
+        suite.addTests(loader.loadTestsFromTestCase(Compare))
+    else:
+        tests = loader.loadTestsFromName(pattern,
+                                         module=sys.modules[__name__])
+        failedTests = [t for t in tests._tests
+                       if type(t) == unittest.loader._FailedTest]
+        if len(failedTests) == 0:
+            suite.addTests(tests)
+    return suite
@@ -0,0 +1,107 @@
+import random
+import sys
+import unittest
+from array import array
+
+import binpack
+from binpack import bounds
+
+from .base import BaseTestCase
+
+
+class Continuous(BaseTestCase):
+    def testArea(self):
+        self.assertEqual(bounds.l0([5, 5, 1], [5, 5, 1], 10, 5), 2)
+
+
+class LargeItems(BaseTestCase):
+    def testOneDimensional(self):
+        """
+        Items taller than half the bin reduce to packing their widths
+        """
+        self.assertEqual(bounds.l1([4, 4, 4, 3], [3, 3, 3, 3], 10, 5), 2)
+
+
+    def testLargeItemsNoRotation(self):
+        """
+        Items larger than half the bin on both sides need their own bin
+        """
+        widths, heights = [6, 6, 6], [3, 3, 3]
+        with self.subTest():
+            self.assertEqual(bounds.l0(widths, heights, 10, 5), 2)
+        with self.subTest():
+            self.assertEqual(bounds.lower_bound(widths, heights, 10, 5,
+                                                rotation=False), 3)
+
+
+    def testRotation(self):
+        """
+        With rotation only items large in every fitting orientation count
+        """
+        with self.subTest():
+            # 6x3 cannot stand up in a 10x5 bin
+            self.assertEqual(bounds.lower_bound([6, 6], [3, 3], 10, 5), 2)
+        with self.subTest():
+            # 6x3 fits twice side by side when rotated in a 10x10 bin
+            self.assertEqual(bounds.lower_bound([6, 6], [3, 3], 10, 10), 1)
+
+
+    def testStrips(self):
+        """
+        Items at least p wide and q tall cannot use the space next to
+        a large item wider than W - p and taller than H - q
+        """
+        widths, heights = [9, 9, 3], [4, 4, 2]
+        with self.subTest():
+            self.assertEqual(bounds.l0(widths, heights, 10, 5), 2)
+        with self.subTest():
+            self.assertEqual(bounds.l2(widths, heights, 10, 5), 3)
+
+
+class LowerBound(BaseTestCase):
+    def testArrays(self):
+        """
+        Columns may be any sequence type
+        """
+        widths, heights = array('i', [6, 6, 6]), array('i', [3, 3, 3])
+        self.assertEqual(bounds.lower_bound(widths, heights, 10, 5), 3)
+
+
+    def testOversizedIgnored(self):
+        self.assertEqual(bounds.lower_bound([11, 2], [5, 2], 10, 5), 1)
+
+
+    def testEmpty(self):
+        self.assertEqual(bounds.lower_bound([], [], 10, 5), 0)
+
+
+    def testNeverAboveHeuristics(self):
+        """
+        The bound never exceeds the bins used by greedy packing
+        """
+        rng = random.Random(3)
+        for _ in range(50):
+            dims = [(rng.randint(1, 10), rng.randint(1, 5))
+                    for _ in range(rng.randint(1, 30))]
+            M = binpack.BinManager(10, 5, pack_algo='guillotine',
+                                   bin_algo='bin_first_fit')
+            M.add_items(*[binpack.Item(w, h) for w, h in dims])
+            M.execute()
+            with self.subTest(dims=dims):
+                self.assertLessEqual(M.lower_bound(), len(M.bins))
+
+
+def load_tests(loader, tests, pattern):
+    suite = unittest.TestSuite()
+    if pattern is None:
+        suite.addTests(loader.loadTestsFromTestCase(Continuous))
+        suite.addTests(loader.loadTestsFromTestCase(LargeItems))
+        suite.addTests(loader.loadTestsFromTestCase(LowerBound))
+    else:
+        tests = loader.loadTestsFromName(pattern,
+                                         module=sys.modules[__name__])
+        failedTests = [t for t in tests._tests
+                       if type(t) == unittest.loader._FailedTest]
+        if len(failedTests) == 0:
+            suite.addTests(tests)
+    return suite
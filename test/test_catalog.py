@@ -0,0 +1,114 @@
+import random
+import sys
+import unittest
+
+import binpack
+from binpack import workload
+from binpack.catalog import BinCatalog, Stock
+
+from .base import BaseTestCase
+from .util import brute_force_fit
+
+
+class Catalog(BaseTestCase):
+    def setUp(self):
+        self.small = Stock(60, 40, 0.6, count=2)
+        self.medium = Stock(100, 50, 1.0)
+        self.large = Stock(200, 100, 3.5)
+        self.catalog = BinCatalog([self.small, self.medium, self.large])
+
+
+    def testChoose(self):
+        with self.subTest('lowest cost per area'):
+            self.assertIs(self.catalog.choose(10, 10), self.large)
+        with self.subTest('only sizes the item fits'):
+            self.assertIs(self.catalog.choose(150, 20), self.large)
+        with self.subTest('rotated'):
+            self.assertIs(self.catalog.choose(30, 80, demand=3000), self.medium)
+        with self.subTest('not rotated'):
+            self.assertIs(self.catalog.choose(30, 120, rotation=False), None)
+        with self.subTest('small demand'):
+            self.assertIs(self.catalog.choose(10, 10, demand=2000), self.small)
+        with self.subTest('fits nothing'):
+            self.assertIs(self.catalog.choose(300, 10), None)
+
+
+    def testStock(self):
+        for _ in range(2):
+            self.catalog.take(self.catalog.choose(10, 10, demand=100))
+        with self.subTest():
+            self.assertIs(self.catalog.choose(10, 10, demand=100), self.medium)
+        with self.subTest():
+            self.assertRaises(ValueError, self.catalog.take, self.small)
+        with self.subTest():
+            self.assertAlmostEqual(self.catalog.cost(), 1.2)
+        with self.subTest():
+            self.assertRaises(ValueError, Stock, 0, 10, 1.0)
+
+
+    def testIndex(self):
+        """
+        Indexed and memoized choices are those of a full scan
+        """
+        rng = random.Random(3)
+        catalog = BinCatalog(Stock(rng.randint(10, 300), rng.randint(10, 300),
+                                   rng.randint(1, 50), count=rng.choice([None, 1, 3]))
+                             for _ in range(300))
+        def score(entry):
+            used = entry.area if demand is None else min(entry.area, demand)
+            return entry.cost / used
+        for _ in range(2000):
+            width, height = rng.randint(1, 300), rng.randint(1, 300)
+            rotation = rng.random() < 0.5
+            demand = rng.choice([None, rng.randint(1, 90000)])
+            entry = catalog.choose(width, height, rotation, demand)
+            best = brute_force_fit([s for s in catalog.stock if s.available()],
+                                   width, height, rotation, score)
+            with self.subTest(size=(width, height)):
+                if best is None:
+                    self.assertIsNone(entry)
+                else:
+                    self.assertAlmostEqual(score(entry), score(best))
+            if entry is not None and rng.random() < 0.3:
+                catalog.take(entry)
+
+
+    def testManager(self):
+        dims = workload.generate(400, 100, 50, seed=6) + [(500, 500)]
+        for pack_algo in ('guillotine', 'shelf', 'grid'):
+            catalog = BinCatalog([Stock(60, 40, 0.6, count=3),
+                                  Stock(100, 50, 1.0),
+                                  Stock(200, 100, 3.5, count=2)])
+            M = binpack.BinManager(pack_algo=pack_algo, catalog=catalog,
+                                   heuristic='best_area_fit' if pack_algo != 'grid'
+                                   else 'bottom_left')
+            M.add_items(*workload.to_items(dims))
+            result = M.execute()
+            sizes = sorted((binn.x, binn.y) for binn in M.bins)
+            with self.subTest(pack_algo=pack_algo):
+                self.assertEqual([(i.x, i.y) for i in result['unplaced']],
+                                 [(500, 500)])
+            with self.subTest(pack_algo=pack_algo):
+                self.assertEqual(sizes.count((200, 100)), 2)
+            with self.subTest(pack_algo=pack_algo):
+                self.assertLessEqual(sizes.count((60, 40)), 3)
+            with self.subTest(pack_algo=pack_algo):
+                self.assertAlmostEqual(M.stats()['cost'], catalog.cost())
+            with self.subTest(pack_algo=pack_algo):
+                self.assertLessEqual(M.lower_bound(), len(M.bins))
+        with self.subTest():
+            self.assertRaises(ValueError, M.execute_parallel)
+
+
+def load_tests(loader, tests, pattern):
+    suite = unittest.TestSuite()
+    if pattern is None:
+        suite.addTests(loader.loadTestsFromTestCase(Catalog))
+    else:
+        tests = loader.loadTestsFromName(pattern,
+                                         module=sys.modules[__name__])
+        failedTests = [t for t in tests._tests
+                       if type(t) == unittest.loader._FailedTest]
+        if len(failedTests) == 0:
+            suite.addTests(tests)
+    return suite
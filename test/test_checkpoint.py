@@ -0,0 +1,168 @@
+import os
+import sys
+import tempfile
+import threading
+import unittest
+
+import binpack
+from binpack import checkpoint
+from binpack import workload
+from binpack.catalog import BinCatalog, Stock
+
+from .base import BaseTestCase
+
+CONFIGS = [{'pack_algo': 'guillotine', 'heuristic': 'best_area_fit'},
+           {'pack_algo': 'shelf', 'heuristic': 'best_area_fit',
+            'wastemap': True},
+           {'pack_algo': 'shelf', 'heuristic': 'next_fit',
+            'bin_algo': 'bin_first_fit'},
+           {'pack_algo': 'grid', 'heuristic': 'bottom_left'}]
+
+
+def _layout(manager):
+    return [[(i.x, i.y, i.CornerPoint) for i in binn.items]
+            for binn in manager.bins]
+
+
+class Checkpoint(BaseTestCase):
+    def setUp(self):
+        self.dims = workload.generate(300, 100, 50, seed=5)
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, 'run.bpck')
+
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+
+    def _manager(self, config):
+        M = binpack.BinManager(100, 50, **config)
+        M.add_items(*workload.to_items(self.dims))
+        return M
+
+
+    def testRoundTrip(self):
+        """
+        A restored manager packs further items exactly like the original
+        """
+        for config in CONFIGS:
+            M = self._manager(config)
+            M.execute()
+            restored = checkpoint.loads(checkpoint.dumps(M))
+            with self.subTest(**config):
+                self.assertEqual(_layout(restored), _layout(M))
+            with self.subTest(**config):
+                self.assertEqual(restored.stats(per_bin=True),
+                                 M.stats(per_bin=True))
+            for manager in (M, restored):
+                manager.add_items(*workload.to_items(self.dims[:100]))
+                manager.execute()
+            with self.subTest(**config):
+                self.assertEqual(_layout(restored), _layout(M))
+
+
+    def testWideValues(self):
+        """
+        Values past 16 bits, and grid rows past 64 bits, restore intact
+        """
+        dims = workload.generate(100, 1000, 700, seed=5)
+        for config in CONFIGS:
+            M = binpack.BinManager(1000, 700, **config)
+            M.add_items(*workload.to_items(dims))
+            M.execute()
+            restored = checkpoint.loads(checkpoint.dumps(M))
+            with self.subTest(**config):
+                self.assertEqual(_layout(restored), _layout(M))
+            with self.subTest(**config):
+                self.assertEqual(restored.stats(per_bin=True),
+                                 M.stats(per_bin=True))
+            if config['pack_algo'] == 'grid':
+                with self.subTest(**config):
+                    self.assertEqual([b.rows for b in restored.bins],
+                                     [b.rows for b in M.bins])
+
+
+    def testResume(self):
+        """
+        A run resumed from where it was stopped ends as an
+        uninterrupted run does
+        """
+        for config in CONFIGS:
+            M = self._manager(config)
+            M.execute()
+            cancel = threading.Event()
+
+            def progress(report):
+                if report['placed'] >= 120:
+                    cancel.set()
+
+            interrupted = self._manager(config)
+            result = interrupted.execute(cancel=cancel, progress=progress,
+                                         progress_interval=0,
+                                         checkpoint_path=self.path)
+            with self.subTest(**config):
+                self.assertEqual(result['stopped'], 'cancelled')
+            resumed = binpack.BinManager.resume(self.path)
+            with self.subTest(**config):
+                self.assertEqual(resumed.cursor, interrupted.cursor)
+            result = resumed.execute()
+            with self.subTest(**config):
+                self.assertTrue(result['complete'])
+            with self.subTest(**config):
+                self.assertEqual(_layout(resumed), _layout(M))
+            with self.subTest(**config):
+                self.assertEqual(resumed.stats(), M.stats())
+
+
+    def testPeriodic(self):
+        M = self._manager(CONFIGS[0])
+        M.execute(checkpoint_path=self.path, checkpoint_interval=0)
+        resumed = binpack.BinManager.resume(self.path)
+        with self.subTest():
+            self.assertEqual(resumed.cursor, len(self.dims))
+        with self.subTest():
+            self.assertEqual(resumed.execute()['placed'], 0)
+        with self.subTest():
+            self.assertEqual(os.listdir(self.dir.name), ['run.bpck'])
+
+
+    def testInvalid(self):
+        M = self._manager(CONFIGS[0])
+        M.execute()
+        data = checkpoint.dumps(M)
+        for name, bad in (('magic', b'XXXX' + data[4:]),
+                          ('version', data[:4] + b'\xff\xff' + data[6:]),
+                          ('body', data[:-1] + bytes([data[-1] ^ 1])),
+                          ('truncated', data[:12]),
+                          ('empty', b'')):
+            with self.subTest(name=name):
+                self.assertRaises(ValueError, checkpoint.loads, bad)
+
+
+    def testUnsupported(self):
+        """
+        Managers that cannot be checkpointed fail before packing
+        """
+        M = binpack.BinManager(catalog=BinCatalog([Stock(100, 50, 1.0)]))
+        M.add_items(*workload.to_items(self.dims))
+        with self.subTest():
+            self.assertRaises(ValueError, M.execute,
+                              checkpoint_path=self.path)
+        with self.subTest():
+            self.assertEqual((M.cursor, M.items_placed, len(M.bins)), (0, 0, 0))
+        with self.subTest():
+            self.assertFalse(os.path.exists(self.path))
+
+
+def load_tests(loader, tests, pattern):
+    suite = unittest.TestSuite()
+    if pattern is None:
+        suite.addTests(loader.loadTestsFromTestCase(Checkpoint))
+    else:
+        tests = loader.loadTestsFromName(pattern,
+                                         module=sys.modules[__name__])
+        failedTests = [t for t in tests._tests
+                       if type(t) == unittest.loader._FailedTest]
+        if len(failedTests) == 0:
+            suite.addTests(tests)
+    return suite
@@ -0,0 +1,119 @@
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+from binpack import __main__ as cli
+from binpack import workload
+
+from .base import BaseTestCase
+from .util import stdout_redirect
+
+
+class StreamOutput(io.StringIO):
+    """
+    Records how many lines were written by each flush
+    """
+    def __init__(self):
+        super().__init__()
+        self.flushed = []
+
+
+    def flush(self):
+        self.flushed.append(self.getvalue().count('\n'))
+
+
+def _check(test, records, dims, width, height):
+    placed = [r for r in records if r['bin'] is not None]
+    with test.subTest():
+        test.assertEqual(sorted(r['item'] for r in records),
+                         list(range(len(dims))))
+    for r in placed:
+        w, h = dims[r['item']]
+        with test.subTest(item=r['item']):
+            test.assertEqual((r['width'], r['height']),
+                             (h, w) if r['rotated'] else (w, h))
+        with test.subTest(item=r['item']):
+            test.assertTrue(r['x'] + r['width'] <= width and
+                            r['y'] + r['height'] <= height)
+
+
+class Pack(BaseTestCase):
+    def setUp(self):
+        self.dims = workload.generate(120, 100, 50, seed=4) + [(200, 10)]
+
+
+    def testStream(self):
+        """
+        Every item is reported once and bins are written as they close
+        """
+        output = StreamOutput()
+        stats = cli.pack_stream(iter(self.dims), output, lookahead=8,
+                                open_bins=2, bin_width=100, bin_height=50)
+        records = [json.loads(line) for line in output.getvalue().splitlines()]
+        _check(self, records, self.dims, 100, 50)
+        with self.subTest():
+            self.assertEqual(stats['failed'], 1)
+        with self.subTest():
+            self.assertIn({'item': 120, 'bin': None}, records)
+        with self.subTest():
+            # Bins were flushed long before the input ran out
+            self.assertGreater(len([n for n in output.flushed if n]), 2)
+
+
+    def testOffline(self):
+        output = io.StringIO()
+        stats = cli.pack_offline(self.dims, output, bin_width=100,
+                                 bin_height=50, pack_algo='shelf',
+                                 heuristic='best_area_fit')
+        records = [json.loads(line) for line in output.getvalue().splitlines()]
+        _check(self, records, self.dims, 100, 50)
+        with self.subTest():
+            self.assertEqual(stats['closed'],
+                             len(set(r['bin'] for r in records)) - 1)
+
+
+    def testMain(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'items.csv')
+            with open(path, 'w') as handle:
+                handle.write('width,height\n')
+                handle.writelines('%d,%d\n' % d for d in self.dims)
+            for flags in ([], ['--sort'], ['--no-rotation', '--lookahead', '1']):
+                with stdout_redirect(io.StringIO()) as output:
+                    status = cli.main([path, '--quiet'] + flags)
+                records = [json.loads(line) for line in output]
+                with self.subTest(flags=flags):
+                    self.assertEqual(status, 0)
+                _check(self, records, self.dims, 100, 50)
+            with contextlib.redirect_stderr(io.StringIO()) as errors:
+                status = cli.main([path, '--quiet', '--heuristic', 'bottom_left'])
+            with self.subTest():
+                self.assertEqual(status, 1)
+            with self.subTest():
+                self.assertIn('bottom_left', errors.getvalue())
+            for flag in ('--pack-algo', '--heuristic', '--bin-algo'):
+                with contextlib.redirect_stderr(io.StringIO()) as errors:
+                    with self.assertRaises(SystemExit) as exit:
+                        cli.main([path, '--quiet', flag, 'nope'])
+                with self.subTest(flag=flag):
+                    self.assertEqual(exit.exception.code, 2)
+                with self.subTest(flag=flag):
+                    self.assertIn('invalid choice', errors.getvalue())
+
+
+def load_tests(loader, tests, pattern):
+    suite = unittest.TestSuite()
+    if pattern is None:
+        suite.addTests(loader.loadTestsFromTestCase(Pack))
+    else:
+        tests = loader.loadTestsFromName(pattern,
+                                         module=sys.modules[__name__])
+        failedTests = [t for t in tests._tests
+                       if type(t) == unittest.loader._FailedTest]
+        if len(failedTests) == 0:
+            suite.addTests(tests)
+    return suite
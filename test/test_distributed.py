@@ -0,0 +1,145 @@
+import multiprocessing
+import socket
+import sys
+import unittest
+
+from binpack import distributed
+from binpack import workload
+
+from .base import BaseTestCase
+
+CONFIG = {'bin_width': 100, 'bin_height': 50, 'pack_algo': 'shelf',
+          'heuristic': 'best_area_fit'}
+
+
+class Framing(BaseTestCase):
+    def testRoundTrip(self):
+        left, right = socket.socketpair()
+        with left, right:
+            distributed.send_message(left, distributed.JOB, {'dims': [[3, 2]]})
+            distributed.send_message(left, distributed.STOP, {})
+            with self.subTest():
+                self.assertEqual(distributed.recv_message(right),
+                                 (distributed.JOB, {'dims': [[3, 2]]}))
+            with self.subTest():
+                self.assertEqual(distributed.recv_message(right),
+                                 (distributed.STOP, {}))
+            left.close()
+            with self.subTest():
+                self.assertIsNone(distributed.recv_message(right))
+
+
+class Coordinator(BaseTestCase):
+    def setUp(self):
+        self.coordinator = distributed.Coordinator(prefetch=4)
+        self.coordinator.start()
+        self.processes = []
+
+
+    def tearDown(self):
+        self.coordinator.close()
+        for process in self.processes:
+            process.join(5)
+
+
+    def _workers(self, count):
+        host, port = self.coordinator.address
+        for _ in range(count):
+            process = multiprocessing.Process(target=distributed.work,
+                                              args=(host, port))
+            process.start()
+            self.processes.append(process)
+
+
+    def _submit(self, jobs):
+        dims = [workload.generate(60, 100, 50, seed=seed)
+                for seed in range(jobs)]
+        for d in dims:
+            self.coordinator.submit(CONFIG, d)
+        return dims
+
+
+    def testResults(self):
+        """
+        Every job is packed once and matches packing it locally
+        """
+        dims = self._submit(6)
+        self._workers(3)
+        result = self.coordinator.join(timeout=30)
+        with self.subTest():
+            self.assertTrue(result['complete'])
+        with self.subTest():
+            self.assertEqual(sorted(result['results']), list(range(6)))
+        local = [distributed.pack_job(CONFIG, d) for d in dims]
+        with self.subTest():
+            self.assertEqual([result['results'][job]['placements']
+                              for job in range(6)],
+                             [[list(p) for p in r['placements']]
+                              for r in local])
+        with self.subTest():
+            self.assertEqual(result['bins'], sum(r['bins'] for r in local))
+
+
+    def testLostWorkerAndStealing(self):
+        """
+        A worker that dies holding jobs has them requeued, and an idle
+        worker steals from the queue of a busy one
+        """
+        self._submit(6)
+        host, port = self.coordinator.address
+        lost = socket.create_connection((host, port))
+        distributed.send_message(lost, distributed.READY, {})
+        kind, job = distributed.recv_message(lost)
+        with self.subTest():
+            self.assertEqual((kind, job['job']), (distributed.JOB, 0))
+        self._workers(1)
+        # Wait for the live worker to steal from the stalled queue
+        with self.coordinator.condition:
+            self.coordinator.condition.wait_for(
+                lambda: self.coordinator.steals, 30)
+        # Forked workers share the socket, so shut it down explicitly
+        lost.shutdown(socket.SHUT_RDWR)
+        lost.close()
+        result = self.coordinator.join(timeout=30)
+        with self.subTest():
+            self.assertTrue(result['complete'])
+        with self.subTest():
+            self.assertEqual(len(result['results']), 6)
+        with self.subTest():
+            self.assertGreater(result['steals'], 0)
+        with self.subTest():
+            self.assertEqual(result['requeued'], 1)
+
+
+    def testFailedJob(self):
+        """
+        A job that errors more than retries times is given up
+        """
+        self.coordinator.retries = 1
+        self.coordinator.submit(dict(CONFIG, heuristic='bogus'), [(2, 2)])
+        self._submit(1)
+        self._workers(2)
+        result = self.coordinator.join(timeout=30)
+        with self.subTest():
+            self.assertTrue(result['complete'])
+        with self.subTest():
+            self.assertEqual(list(result['failed']), [0])
+        with self.subTest():
+            self.assertIn('bogus', result['failed'][0])
+        with self.subTest():
+            self.assertEqual(list(result['results']), [1])
+
+
+def load_tests(loader, tests, pattern):
+    suite = unittest.TestSuite()
+    if pattern is None:
+        suite.addTests(loader.loadTestsFromTestCase(Framing))
+        suite.addTests(loader.loadTestsFromTestCase(Coordinator))
+    else:
+        tests = loader.loadTestsFromName(pattern,
+                                         module=sys.modules[__name__])
+        failedTests = [t for t in tests._tests
+                       if type(t) == unittest.loader._FailedTest]
+        if len(failedTests) == 0:
+            suite.addTests(tests)
+    return suite
@@ -0,0 +1,130 @@
+import sys
+import unittest
+
+from binpack import freespace
+from binpack import item
+from binpack import shelf
+from binpack.guillotine import FreeRectangle
+
+from .base import BaseTestCase
+from .util import LayoutAssertions
+
+
+class Index(BaseTestCase):
+    def testMaxTree(self):
+        tree = freespace.MaxTree([3, 7, 2, 9], 6)
+        with self.subTest():
+            self.assertEqual(tree.first_at_least(5), 1)
+        with self.subTest():
+            self.assertEqual(tree.first_at_least(8), 3)
+        with self.subTest():
+            self.assertEqual(tree.first_at_least(10), -1)
+        with self.subTest():
+            self.assertEqual(tree.first_at_least(3, start=2), 3)
+        with self.subTest():
+            self.assertEqual(tree.first_at_least(1, start=4), -1)
+        tree.update(1, 4)
+        with self.subTest():
+            self.assertEqual(tree.first_at_least(5), 3)
+
+
+    def testFind(self):
+        """
+        The narrowest, then shortest, fitting rectangle is found
+        """
+        index = freespace.FreeSpaceIndex(20)
+        for rect in [FreeRectangle(10, 2, 0, 0), FreeRectangle(5, 4, 0, 5),
+                     FreeRectangle(5, 3, 8, 5), FreeRectangle(12, 6, 0, 10)]:
+            index.add(rect)
+        index.add(FreeRectangle(0, 4, 0, 0))
+        with self.subTest():
+            self.assertEqual(len(index), 4)
+        with self.subTest():
+            self.assertEqual(index.find(4, 3), FreeRectangle(5, 3, 8, 5))
+        with self.subTest():
+            self.assertEqual(index.find(6, 2), FreeRectangle(10, 2, 0, 0))
+        with self.subTest():
+            self.assertEqual(index.find(6, 3), FreeRectangle(12, 6, 0, 10))
+        with self.subTest():
+            self.assertIsNone(index.find(13, 1))
+        with self.subTest():
+            self.assertEqual(index.take(4, 4), FreeRectangle(5, 4, 0, 5))
+        with self.subTest():
+            self.assertEqual(index.find(4, 4), FreeRectangle(12, 6, 0, 10))
+        with self.subTest():
+            self.assertEqual(len(list(index)), 3)
+
+
+class WasteMap(LayoutAssertions, BaseTestCase):
+    def testGapAbove(self):
+        """
+        The gap above a short item is used before a new shelf opens
+        """
+        S = shelf.Sheet(8, 4, rotation=False, wastemap=True)
+        A, B, C = item.Item(6, 3), item.Item(2, 1), item.Item(2, 2)
+        for i in (A, B, C):
+            with self.subTest():
+                self.assertTrue(S.insert(i, 'best_width_fit'))
+        with self.subTest():
+            self.assertEqual(C.CornerPoint, (6, 1))
+        with self.subTest():
+            self.assertEqual(len(S.shelves), 1)
+        with self.subTest():
+            self.assertEqual(S.used_area, 24)
+
+
+    def testClosedShelf(self):
+        """
+        Next fit moves the end of a closed shelf to the waste map
+        """
+        S = shelf.Sheet(10, 6, rotation=False, wastemap=True)
+        items = [item.Item(7, 3), item.Item(8, 3), item.Item(3, 2)]
+        for i in items:
+            S.insert(i, 'next_fit')
+        with self.subTest():
+            self.assertEqual(items[2].CornerPoint, (7, 0))
+        with self.subTest():
+            self.assertEqual(S.shelves[0].available_width, 0)
+
+
+    def testSink(self):
+        self.assertRaises(ValueError, shelf.Sheet, 10, 6,
+                          sink=print, wastemap=True)
+
+
+    def testManager(self):
+        """
+        Waste maps never need more bins and layouts stay valid
+        """
+        import binpack
+        from binpack import workload
+        dims = workload.generate(300, 100, 50, seed=4)
+        for heuristic in ('next_fit', 'best_width_fit'):
+            plain = binpack.BinManager(100, 50, pack_algo='shelf',
+                                       heuristic=heuristic)
+            plain.add_items(*workload.to_items(dims))
+            plain.execute()
+            M = binpack.BinManager(100, 50, pack_algo='shelf',
+                                   heuristic=heuristic, wastemap=True)
+            M.add_items(*workload.to_items(dims))
+            M.execute()
+            with self.subTest(heuristic=heuristic):
+                self.assertLessEqual(len(M.bins), len(plain.bins))
+            with self.subTest(heuristic=heuristic):
+                self.assertEqual(M.items_placed, 300)
+            self.assertBinsValid(M.bins)
+
+
+def load_tests(loader, tests, pattern):
+    suite = unittest.TestSuite()
+    if pattern is None:
+        suite.addTests(loader.loadTestsFromTestCase(Index))
+        suite.addTests(loader.loadTestsFromTestCase(WasteMap))
+    else:
+        tests = loader.loadTestsFromName(pattern,
+                                         module=sys.modules[__name__])
+        failedTests = [t for t in tests._tests
+                       if type(t) == unittest.loader._FailedTest]
+        if len(failedTests) == 0:
+            suite.addTests(tests)
+    return suite
@@ -0,0 +1,116 @@
+import random
+import sys
+import unittest
+
+import binpack
+from binpack import grid
+from binpack import item
+
+from .base import BaseTestCase
+from .util import LayoutAssertions
+
+
+class Insert(BaseTestCase):
+    def testDoubling(self):
+        """
+        Doubling shifts mark the start of every run of free cells
+        """
+        for length, runs in [(1, 0b0111011), (2, 0b0011001),
+                             (3, 0b0001000), (4, 0)]:
+            mask = 0b0111011
+            for step in grid._doubling(length):
+                mask &= mask >> step
+            with self.subTest():
+                self.assertEqual(mask, runs)
+
+
+    def testBottomLeft(self):
+        G = grid.Grid(4, 4)
+        squares = [item.Item(2, 2) for _ in range(5)]
+        results = [G.insert(i) for i in squares]
+        with self.subTest():
+            self.assertEqual(results, [True, True, True, True, False])
+        with self.subTest():
+            self.assertEqual([i.CornerPoint for i in squares[:4]],
+                             [(0, 0), (2, 0), (0, 2), (2, 2)])
+        with self.subTest():
+            self.assertEqual(G.bin_stats()['efficiency'], 1)
+
+
+    def testGap(self):
+        """
+        Items fill holes left between earlier items
+        """
+        G = grid.Grid(6, 2, rotation=False)
+        G.insert(item.Item(2, 2))
+        G.insert(item.Item(1, 1, rotation=False))
+        G.rows[0] |= 0b100000
+        I = item.Item(2, 1, rotation=False)
+        G.insert(I)
+        self.assertEqual(I.CornerPoint, (3, 0))
+
+
+    def testRotation(self):
+        G = grid.Grid(2, 6)
+        I = item.Item(6, 2)
+        with self.subTest():
+            self.assertTrue(G.insert(I))
+        with self.subTest():
+            self.assertEqual((I.x, I.y, I.CornerPoint), (2, 6, (0, 0)))
+        G = grid.Grid(2, 6, rotation=False)
+        with self.subTest():
+            self.assertFalse(G.insert(item.Item(6, 2)))
+
+
+    def testScale(self):
+        """
+        Item sides are rounded up to whole cells
+        """
+        G = grid.Grid(100, 50, scale=10)
+        A, B = item.Item(15, 10), item.Item(10, 10)
+        G.insert(A)
+        G.insert(B)
+        with self.subTest():
+            self.assertEqual((G.columns, len(G.rows)), (10, 5))
+        with self.subTest():
+            self.assertEqual(B.CornerPoint, (20, 0))
+        with self.subTest():
+            self.assertEqual(G.used_area, 250)
+        with self.subTest():
+            self.assertRaises(ValueError, G.rescale, 5)
+
+
+class Manager(LayoutAssertions, BaseTestCase):
+    def testGrid(self):
+        """
+        Grid bins are scaled by the GCD of all dimensions and every
+        item is placed without overlaps
+        """
+        rng = random.Random(0)
+        items = [binpack.Item(4 * rng.randint(1, 8), 4 * rng.randint(1, 8))
+                 for _ in range(100)]
+        M = binpack.BinManager(48, 96, pack_algo='grid')
+        M.add_items(*items)
+        M.execute()
+        with self.subTest():
+            self.assertEqual(M.grid_scale, 4)
+        with self.subTest():
+            self.assertEqual(M.items_placed, 100)
+        with self.subTest():
+            self.assertLess(len(M.bins), 20)
+        self.assertBinsValid(M.bins)
+
+
+def load_tests(loader, tests, pattern):
+    suite = unittest.TestSuite()
+    if pattern is None:
+        suite.addTests(loader.loadTestsFromTestCase(Insert))
+        suite.addTests(loader.loadTestsFromTestCase(Manager))
+    else:
+        tests = loader.loadTestsFromName(pattern,
+                                         module=sys.modules[__name__])
+        failedTests = [t for t in tests._tests
+                       if type(t) == unittest.loader._FailedTest]
+        if len(failedTests) == 0:
+            suite.addTests(tests)
+    return suite
@@ -629,6 +629,34 @@ class WorstAreaFit(BaseTestCase):
             self.assertEqual(self.BIN.items, [ITEM, ITEM2, ITEM3])
 
 
+class Rotation(BaseTestCase):
+    def setUp(self):
+        self.BIN = guillotine.Guillotine(4, 10, rotation=True)
+        self.freeRectangle = guillotine.FreeRectangle
+
+
+    def tearDown(self):
+        del self.BIN
+        del self.freeRectangle
+
+
+    def testRotatedFit(self):
+        """
+        Item only fits rotated
+        Split Horizontal
+        Rotation == True
+        RectMerge == False
+        """
+        ITEM = item.Item(8, 3)
+        self.BIN.insert(ITEM, 'best_width_fit')
+        with self.subTest():
+            self.assertEqual((ITEM.x, ITEM.y), (3, 8))
+        with self.subTest():
+            correct = [self.freeRectangle(1, 8, 3, 0),
+                       self.freeRectangle(4, 2, 0, 8)]
+            self.assertEqual(self.BIN.freerects, correct)
+
+
 class RectMerge(BaseTestCase):
     def setUp(self):
         self.BIN = guillotine.Guillotine(10, 5, rotation=False)
@@ -655,6 +683,50 @@ class RectMerge(BaseTestCase):
         self.assertEqual(self.BIN.freerects, [self.freeRectangle(6, 5, 4, 0)])
 
 
+class InsertMany(BaseTestCase):
+    def testStopsAtFirstMiss(self):
+        """
+        Items are placed in order up to the first that does not fit
+        """
+        BIN = guillotine.Guillotine(10, 5, rotation=False)
+        items = [item.Item(w, h, rotation=False)
+                 for w, h in [(4, 5), (4, 5), (3, 5), (2, 2), (1, 1)]]
+        with self.subTest():
+            self.assertEqual(BIN.insert_many(items, 'first_fit'), (2, 2))
+        with self.subTest():
+            self.assertEqual(BIN.used_area, 40)
+        with self.subTest():
+            self.assertEqual(BIN.insert_many(items, 'first_fit', start=3),
+                             (2, 5))
+        with self.subTest():
+            self.assertEqual([i.CornerPoint for i in BIN.items],
+                             [(0, 0), (4, 0), (8, 0), (8, 2)])
+
+
+    def testMatchesInsert(self):
+        """
+        A batch places items exactly like one insert per item
+        """
+        dims = [(3, 2), (2, 2), (4, 1), (1, 1), (2, 3), (5, 2)]
+        A = guillotine.Guillotine(8, 4, heuristic='best_width_fit')
+        B = guillotine.Guillotine(8, 4, heuristic='best_width_fit')
+        batch = [item.Item(w, h) for w, h in dims]
+        single = [item.Item(w, h) for w, h in dims]
+        placed, index = A.insert_many(batch)
+        expected = 0
+        for i in single:
+            if not B.insert(i):
+                break
+            expected += 1
+        with self.subTest():
+            self.assertEqual((placed, index), (expected, expected))
+        with self.subTest():
+            self.assertEqual(A.freerects, B.freerects)
+        with self.subTest():
+            self.assertEqual([i.CornerPoint for i in batch],
+                             [i.CornerPoint for i in single])
+
+
 class BinStats(BaseTestCase):
     def setUp(self):
         self.BIN = guillotine.Guillotine(10, 5, rotation=False)
@@ -690,7 +762,9 @@ def load_tests(loader, tests, pattern):
         suite.addTests(loader.loadTestsFromTestCase(WorstWidthFit))
         suite.addTests(loader.loadTestsFromTestCase(WorstHeightFit))
         suite.addTests(loader.loadTestsFromTestCase(WorstAreaFit))
+        suite.addTests(loader.loadTestsFromTestCase(Rotation))
         suite.addTests(loader.loadTestsFromTestCase(RectMerge))
+        suite.addTests(loader.loadTestsFromTestCase(InsertMany))
         suite.addTests(loader.loadTestsFromTestCase(BinStats))
     else:
         tests = loader.loadTestsFromName(pattern,
@@ -0,0 +1,89 @@
+import sys
+import unittest
+
+import binpack
+from binpack import guillotine
+from binpack import heuristics
+from binpack import item
+from binpack import shelf
+
+from .base import BaseTestCase
+
+
+class Strategies(BaseTestCase):
+    def testResolve(self):
+        with self.subTest():
+            self.assertIs(heuristics.resolve('shelf', 'best_width_fit'),
+                          heuristics.SHELF['best_width_fit'])
+        with self.subTest():
+            self.assertRaises(ValueError, heuristics.resolve,
+                              'guillotine', 'next_fit')
+        with self.subTest():
+            self.assertRaises(ValueError, heuristics.resolve,
+                              'maxrects', 'first_fit')
+
+
+    def testTies(self):
+        """
+        Ties go to the last candidate
+        """
+        rects = [guillotine.FreeRectangle(2, 4, 0, 0),
+                 guillotine.FreeRectangle(2, 3, 5, 0),
+                 guillotine.FreeRectangle(6, 3, 0, 5)]
+        with self.subTest():
+            self.assertIs(heuristics.GUILLOTINE['best_width_fit']
+                          .select(rects), rects[1])
+        with self.subTest():
+            self.assertIs(heuristics.GUILLOTINE['worst_height_fit']
+                          .select(rects), rects[0])
+        with self.subTest():
+            self.assertIs(heuristics.GUILLOTINE['first_fit']
+                          .select(rects), rects[0])
+
+
+    def testBinStrategy(self):
+        """
+        Bins resolve their heuristic once and insert with it by default
+        """
+        S = shelf.Sheet(8, 4, heuristic='best_width_fit')
+        G = guillotine.Guillotine(8, 4, heuristic='first_fit')
+        with self.subTest():
+            self.assertIs(S.strategy, heuristics.SHELF['best_width_fit'])
+        with self.subTest():
+            self.assertIs(G.strategy, heuristics.GUILLOTINE['first_fit'])
+        with self.subTest():
+            self.assertTrue(G.insert(item.Item(2, 2)))
+        with self.subTest():
+            self.assertRaises(ValueError, S.insert, item.Item(2, 2), 'bogus')
+
+
+    def testManagerValidation(self):
+        """
+        Unknown heuristic names fail when the manager is created
+        """
+        with self.subTest():
+            self.assertRaises(ValueError, binpack.BinManager,
+                              pack_algo='shelf', heuristic='best_fit')
+        with self.subTest():
+            self.assertRaises(ValueError, binpack.BinManager,
+                              pack_algo='guillotine', heuristic='next_fit')
+        with self.subTest():
+            self.assertRaises(ValueError, binpack.BinManager,
+                              bin_algo='bin_worst_fit')
+        with self.subTest():
+            M = binpack.BinManager(pack_algo='grid', heuristic='next_fit')
+            self.assertEqual(M.bins[0].x, 8)
+
+
+def load_tests(loader, tests, pattern):
+    suite = unittest.TestSuite()
+    if pattern is None:
+        suite.addTests(loader.loadTestsFromTestCase(Strategies))
+    else:
+        tests = loader.loadTestsFromName(pattern,
+                                         module=sys.modules[__name__])
+        failedTests = [t for t in tests._tests
+                       if type(t) == unittest.loader._FailedTest]
+        if len(failedTests) == 0:
+            suite.addTests(tests)
+    return suite
@@ -0,0 +1,152 @@
+import sys
+import unittest
+
+import binpack
+from binpack import guillotine
+from binpack import shelf
+from binpack import item
+from binpack.instrument import Instrument
+
+from .base import BaseTestCase
+
+
+class Counters(BaseTestCase):
+    def setUp(self):
+        self.instrument = Instrument()
+
+
+    def tearDown(self):
+        del self.instrument
+
+
+    def testDisabled(self):
+        """
+        Bins without an instrument record nothing
+        """
+        BIN = guillotine.Guillotine(10, 5)
+        BIN.insert(item.Item(4, 2), 'best_width_fit')
+        self.assertIsNone(BIN.instrument)
+
+
+    def testGuillotine(self):
+        """
+        Guillotine bins count scans, rotations and splits
+        """
+        BIN = guillotine.Guillotine(10, 5, rotation=False,
+                                    instrument=self.instrument)
+        BIN.insert(item.Item(4, 2), 'best_width_fit')
+        BIN.insert(item.Item(2, 2), 'best_width_fit')
+        BIN.insert(item.Item(20, 2), 'best_width_fit')
+        counters = self.instrument.counters
+        with self.subTest():
+            self.assertEqual(counters['inserts'], 3)
+        with self.subTest():
+            self.assertEqual(counters['placed'], 2)
+        with self.subTest():
+            self.assertEqual(counters['rejected'], 1)
+        with self.subTest():
+            # 1 rect, then 2 rects, then 2 rects
+            self.assertEqual(counters['freerects_scanned'], 5)
+        with self.subTest():
+            self.assertEqual(counters['splits'], 3)
+        with self.subTest():
+            self.assertEqual(counters['rotations_tried'], 0)
+
+
+    def testGuillotineMerge(self):
+        BIN = guillotine.Guillotine(10, 5, rotation=False,
+                                    instrument=self.instrument)
+        BIN.rMerge = True
+        BIN.insert(item.Item(4, 2), 'best_height_fit')
+        BIN.insert(item.Item(4, 3), 'best_height_fit')
+        self.assertEqual(self.instrument.counters['merges'], 1)
+
+
+    def testSheet(self):
+        """
+        Sheet bins count shelf scans and opened shelves
+        """
+        SHEET = shelf.Sheet(8, 4, instrument=self.instrument)
+        SHEET.insert(item.Item(3, 2), 'best_width_fit')
+        SHEET.insert(item.Item(6, 2), 'best_width_fit')
+        SHEET.insert(item.Item(2, 1), 'best_width_fit')
+        counters = self.instrument.counters
+        with self.subTest():
+            self.assertEqual(counters['shelves_opened'], 2)
+        with self.subTest():
+            # 1 shelf (+1 rotated), then 2 shelves
+            self.assertEqual(counters['shelves_scanned'], 4)
+        with self.subTest():
+            self.assertEqual(counters['rotations_tried'], 1)
+        with self.subTest():
+            self.assertEqual(counters['placed'], 3)
+
+
+    def testManager(self):
+        """
+        The manager hands its instrument to every bin it creates
+        """
+        M = binpack.BinManager(8, 4, pack_algo='shelf',
+                               bin_algo='bin_first_fit',
+                               instrument=self.instrument)
+        M.add_items(binpack.Item(8, 4), binpack.Item(8, 4), binpack.Item(2, 2))
+        M.execute()
+        counters = self.instrument.counters
+        with self.subTest():
+            self.assertEqual(counters['items'], 3)
+        with self.subTest():
+            self.assertEqual(counters['bins_opened'], 3)
+        with self.subTest():
+            # 1 + 1 + 2 bins tried
+            self.assertEqual(counters['bins_probed'], 4)
+        with self.subTest():
+            self.assertTrue(all(b.instrument is self.instrument
+                                for b in M.bins))
+        with self.subTest():
+            self.assertEqual(self.instrument.summary()['bins_per_item'], 4/3)
+
+
+class Callbacks(BaseTestCase):
+    def testEvents(self):
+        """
+        Callbacks receive every event with its count and data
+        """
+        events = []
+        instrument = Instrument(lambda e, c, d: events.append((e, c, d)))
+        BIN = guillotine.Guillotine(10, 5, rotation=False,
+                                    instrument=instrument)
+        BIN.insert(item.Item(4, 2), 'first_fit')
+        with self.subTest():
+            self.assertEqual([e[0] for e in events],
+                             ['inserts', 'freerects_scanned', 'splits', 'placed'])
+        with self.subTest():
+            self.assertEqual(events[-1][2], {'freerects': 2})
+
+
+    def testUnsubscribe(self):
+        events = []
+        callback = lambda e, c, d: events.append(e)
+        instrument = Instrument()
+        instrument.subscribe(callback)
+        instrument.record('items')
+        instrument.unsubscribe(callback)
+        instrument.record('items')
+        with self.subTest():
+            self.assertEqual(events, ['items'])
+        with self.subTest():
+            self.assertEqual(instrument.counters['items'], 2)
+
+
+def load_tests(loader, tests, pattern):
+    suite = unittest.TestSuite()
+    if pattern is None:
+        suite.addTests(loader.loadTestsFromTestCase(Counters))
+        suite.addTests(loader.loadTestsFromTestCase(Callbacks))
+    else:
+        tests = loader.loadTestsFromName(pattern,
+                                         module=sys.modules[__name__])
+        failedTests = [t for t in tests._tests
+                       if type(t) == unittest.loader._FailedTest]
+        if len(failedTests) == 0:
+            suite.addTests(tests)
+    return suite
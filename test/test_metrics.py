@@ -0,0 +1,100 @@
+import sys
+import unittest
+
+import binpack
+from binpack import metrics
+
+from .base import BaseTestCase
+
+
+class HistogramTests(BaseTestCase):
+    def testBuckets(self):
+        """
+        Bucket counts are cumulative and upper bounds are inclusive
+        """
+        hist = metrics.Histogram('size', 'Sizes.', buckets=(1, 4))
+        for value in (1, 2, 4, 9):
+            hist.observe(value)
+        samples = [(name, labels, value) for name, labels, value
+                   in hist.samples()]
+        correct = [('size_bucket', (('le', '1'),), 1),
+                   ('size_bucket', (('le', '4'),), 3),
+                   ('size_bucket', (('le', '+Inf'),), 4),
+                   ('size_sum', (), 16),
+                   ('size_count', (), 4)]
+        self.assertEqual(samples, correct)
+
+
+class PackingMetricsTests(BaseTestCase):
+    def setUp(self):
+        self.metrics = metrics.PackingMetrics()
+        M = binpack.BinManager(10, 5, pack_algo='guillotine',
+                               heuristic='best_area_fit',
+                               instrument=self.metrics.instrument)
+        M.add_items(binpack.Item(6, 5), binpack.Item(5, 5),
+                    binpack.Item(4, 3), binpack.Item(12, 5))
+        M.execute()
+
+
+    def tearDown(self):
+        del self.metrics
+
+
+    def testCounters(self):
+        labels = (('heuristic', 'best_area_fit'), ('pack_algo', 'guillotine'))
+        with self.subTest():
+            self.assertEqual(self.metrics.items_placed.values[labels], 3)
+        with self.subTest():
+            self.assertEqual(self.metrics.items_failed.values[labels], 1)
+        with self.subTest():
+            # default bin and one for the 5x5 item
+            self.assertEqual(self.metrics.bins_opened.values[labels], 2)
+
+
+    def testHistograms(self):
+        labels = (('heuristic', 'best_area_fit'), ('pack_algo', 'guillotine'))
+        with self.subTest():
+            self.assertEqual(sum(self.metrics.insert_latency.counts[labels]), 4)
+        with self.subTest():
+            self.assertEqual(sum(self.metrics.freerects.counts[()]), 3)
+
+
+    def testRender(self):
+        """
+        Output follows the Prometheus text exposition format
+        """
+        text = self.metrics.render()
+        with self.subTest():
+            self.assertIn('# TYPE binpack_items_placed_total counter\n', text)
+        with self.subTest():
+            self.assertIn('binpack_items_placed_total{heuristic="best_area_fit",'
+                          'pack_algo="guillotine"} 3\n', text)
+        with self.subTest():
+            self.assertIn('binpack_insert_latency_seconds_bucket{heuristic='
+                          '"best_area_fit",pack_algo="guillotine",le="+Inf"} 4\n',
+                          text)
+
+
+    def testExport(self):
+        samples = []
+        self.metrics.export(lambda name, labels, value:
+                            samples.append((name, labels, value)))
+        with self.subTest():
+            self.assertIn(('binpack_freerects_count', {}, 3), samples)
+        with self.subTest():
+            self.assertEqual(len(samples), len(list(self.metrics.samples())))
+
+
+def load_tests(loader, tests, pattern):
+    suite = unittest.TestSuite()
+    if pattern is None:
+        suite.addTests(loader.loadTestsFromTestCase(HistogramTests))
+        suite.addTests(loader.loadTestsFromTestCase(PackingMetricsTests))
+    else:
+        tests = loader.loadTestsFromName(pattern,
+                                         module=sys.modules[__name__])
+        failedTests = [t for t in tests._tests
+                       if type(t) == unittest.loader._FailedTest]
+        if len(failedTests) == 0:
+            suite.addTests(tests)
+    return suite
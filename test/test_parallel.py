@@ -0,0 +1,137 @@
+import sys
+import unittest
+
+import binpack
+from binpack import parallel
+from binpack import workload
+
+from .base import BaseTestCase
+from .util import LayoutAssertions
+
+
+class Shards(BaseTestCase):
+    def testSizeClasses(self):
+        dims = [(1, 1), (5, 5), (3, 3), (4, 4), (2, 2)]
+        self.assertEqual(parallel.shard(dims, 2, 'size'), [[1, 3], [2, 4, 0]])
+
+
+    def testRandom(self):
+        dims = [(1, 1)] * 7
+        shards = parallel.shard(dims, 3, 'random', seed=2)
+        with self.subTest():
+            self.assertEqual(sorted(sum(shards, [])), list(range(7)))
+        with self.subTest():
+            self.assertEqual([len(s) for s in shards], [3, 2, 2])
+        with self.subTest():
+            self.assertRaises(ValueError, parallel.shard, dims, 3, 'area')
+
+
+class ParallelPack(LayoutAssertions, BaseTestCase):
+    def testLayouts(self):
+        """
+        Shards are packed in workers and the original items end up in
+        the joined bins
+        """
+        dims = workload.generate(120, 100, 50, seed=4)
+        for pack_algo in ('shelf', 'guillotine'):
+            for by in ('random', 'size'):
+                M = binpack.BinManager(100, 50, pack_algo=pack_algo,
+                                       heuristic='best_area_fit')
+                M.add_items(*workload.to_items(dims))
+                result = M.execute_parallel(workers=2, shards=3, by=by,
+                                            min_work=0)
+                with self.subTest(pack_algo=pack_algo, by=by):
+                    self.assertEqual(result['shards'], 3)
+                with self.subTest(pack_algo=pack_algo, by=by):
+                    self.assertEqual(result['bins'], len(M.bins))
+                with self.subTest(pack_algo=pack_algo, by=by):
+                    self.assertGreaterEqual(result['gap_ratio'], 0)
+                with self.subTest(pack_algo=pack_algo, by=by):
+                    self.assertEqual(M.stats()['items_placed'], 120)
+                self.assertLayoutValid(M)
+
+
+    def testTransports(self):
+        """
+        Shared memory and pickled transfers give the same layout
+        """
+        dims = workload.generate(150, 100, 50, seed=6)
+        for pack_algo, wastemap in [('shelf', False), ('shelf', True),
+                                    ('guillotine', False), ('grid', False)]:
+            layouts = []
+            for shared in (True, False):
+                M = binpack.BinManager(100, 50, pack_algo=pack_algo,
+                                       heuristic='first_fit',
+                                       wastemap=wastemap)
+                M.add_items(*workload.to_items(dims))
+                M.execute_parallel(workers=2, shards=2, merge=0,
+                                   shared=shared, min_work=0)
+                position = {id(i): n for n, i in enumerate(M.items)}
+                shelves = [[[position[id(i)] for i in s.items]
+                            for s in getattr(binn, 'shelves', ())]
+                           for binn in M.bins]
+                layouts.append(([[(position[id(i)], i.x, i.y, i.CornerPoint)
+                                  for i in binn.items] for binn in M.bins],
+                                shelves, M.stats()))
+            with self.subTest(pack_algo=pack_algo, wastemap=wastemap):
+                self.assertEqual(layouts[0], layouts[1])
+
+
+    def testConsolidate(self):
+        """
+        Half filled bins from different shards are merged
+        """
+        M = binpack.BinManager(10, 5, pack_algo='guillotine')
+        M.add_items(*[binpack.Item(5, 5) for _ in range(4)])
+        result = M.execute_parallel(workers=2, shards=4, min_work=0)
+        with self.subTest():
+            self.assertEqual((result['bins_before'], result['bins']), (4, 2))
+        with self.subTest():
+            self.assertEqual((result['lower_bound'], result['gap_ratio']), (2, 0))
+        with self.subTest():
+            self.assertEqual(M.stats()['efficiency'], 1.0)
+        with self.subTest():
+            self.assertEqual(result['unplaced'], [])
+
+
+    def testSerial(self):
+        """
+        Jobs too cheap to shard are packed serially
+        """
+        dims = workload.generate(2000, 100, 50, seed=2)
+        shards = []
+        for bin_algo in ('bin_next_fit', 'bin_best_fit'):
+            M = binpack.BinManager(100, 50, pack_algo='shelf',
+                                   bin_algo=bin_algo)
+            M.add_items(*workload.to_items(dims))
+            shards.append(M.execute_parallel(workers=2)['shards'])
+        with self.subTest():
+            self.assertEqual(shards, [1, 2])
+        M = binpack.BinManager(100, 50, pack_algo='shelf',
+                               bin_algo='bin_next_fit')
+        M.add_items(*workload.to_items(dims))
+        M.execute()
+        serial = M.stats()
+        M = binpack.BinManager(100, 50, pack_algo='shelf',
+                               bin_algo='bin_next_fit')
+        M.add_items(*workload.to_items(dims))
+        result = M.execute_parallel(workers=2)
+        with self.subTest():
+            self.assertEqual(M.stats(), serial)
+        with self.subTest():
+            self.assertEqual(result['bins_before'], result['bins'])
+
+
+def load_tests(loader, tests, pattern):
+    suite = unittest.TestSuite()
+    if pattern is None:
+        suite.addTests(loader.loadTestsFromTestCase(Shards))
+        suite.addTests(loader.loadTestsFromTestCase(ParallelPack))
+    else:
+        tests = loader.loadTestsFromName(pattern,
+                                         module=sys.modules[__name__])
+        failedTests = [t for t in tests._tests
+                       if type(t) == unittest.loader._FailedTest]
+        if len(failedTests) == 0:
+            suite.addTests(tests)
+    return suite
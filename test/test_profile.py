@@ -0,0 +1,91 @@
+import io
+import os
+import re
+import sys
+import tempfile
+import time
+import unittest
+
+from binpack import profile
+from binpack import workload
+
+from .base import BaseTestCase
+from .util import stdout_redirect
+
+
+CONFIG = {'bin_width': 100,
+          'bin_height': 50,
+          'bin_algo': 'bin_best_fit',
+          'pack_algo': 'shelf',
+          'heuristic': 'best_width_fit'}
+
+
+def _busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+class Sampling(BaseTestCase):
+    def testFoldedFormat(self):
+        """
+        Samples are folded into 'frame;frame count' lines rooted at
+        the root code object
+        """
+        sampler = profile.Sampler(0.001, root_code=_busy.__code__)
+        sampler.start()
+        try:
+            _busy(0.1)
+        finally:
+            sampler.stop()
+        lines = sampler.folded().splitlines()
+        with self.subTest():
+            self.assertTrue(lines)
+        with self.subTest():
+            self.assertTrue(all(re.match(r'^\S+ \d+$', line) for line in lines))
+        with self.subTest():
+            self.assertTrue(all(line.startswith('test_profile:_busy')
+                                for line in lines))
+
+
+class Reports(BaseTestCase):
+    def testHotFunctions(self):
+        report = profile.hot_functions(CONFIG, workload.generate(200),
+                                       sort='tottime', limit=5)
+        with self.subTest():
+            self.assertIn('function calls', report)
+        with self.subTest():
+            self.assertIn('Ordered by: internal time', report)
+
+
+    def testMain(self):
+        """
+        The CLI prints the report and writes folded stacks to a file
+        """
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'out.folded')
+            with stdout_redirect(io.StringIO()) as output:
+                status = profile.main(['--items', '2000',
+                                       '--folded', path])
+            with self.subTest():
+                self.assertEqual(status, 0)
+            with self.subTest():
+                self.assertIn('function calls', output.read())
+            with self.subTest():
+                with open(path) as handle:
+                    self.assertTrue(handle.read().startswith('profile:_execute'))
+
+
+def load_tests(loader, tests, pattern):
+    suite = unittest.TestSuite()
+    if pattern is None:
+        suite.addTests(loader.loadTestsFromTestCase(Sampling))
+        suite.addTests(loader.loadTestsFromTestCase(Reports))
+    else:
+        tests = loader.loadTestsFromName(pattern,
+                                         module=sys.modules[__name__])
+        failedTests = [t for t in tests._tests
+                       if type(t) == unittest.loader._FailedTest]
+        if len(failedTests) == 0:
+            suite.addTests(tests)
+    return suite
@@ -0,0 +1,185 @@
+import os
+import random
+import sys
+import tempfile
+import unittest
+
+import binpack
+from binpack import workload
+from binpack.remnants import Remnant, RemnantInventory
+
+from .base import BaseTestCase
+from .util import brute_force_fit
+
+
+class Inventory(BaseTestCase):
+    def testFind(self):
+        """
+        Indexed lookups match a scan of every remnant
+        """
+        rng = random.Random(7)
+        inventory = RemnantInventory(max_width=64)
+        remnants = [inventory.add(rng.randint(1, 400), rng.randint(1, 200))
+                    for _ in range(2000)]
+        with self.subTest():
+            self.assertEqual(sorted(inventory), sorted(remnants))
+        for _ in range(500):
+            width, height = rng.randint(1, 300), rng.randint(1, 300)
+            rotation = rng.random() < 0.5
+            expected = brute_force_fit(remnants, width, height, rotation,
+                                       lambda r: (r.area, r.width))
+            found = inventory.take(width, height, rotation)
+            with self.subTest(size=(width, height), rotation=rotation):
+                self.assertEqual(
+                    None if found is None else (found.width, found.height),
+                    None if expected is None else (expected.width, expected.height))
+            if found is not None:
+                remnants.remove(found)
+        with self.subTest():
+            self.assertEqual(len(inventory), len(remnants))
+
+
+    def testSmallestArea(self):
+        """
+        A narrow but long offcut is kept over a small square one
+        """
+        for rotation in (True, False):
+            inventory = RemnantInventory()
+            inventory.add(10, 1000)
+            inventory.add(11, 11)
+            with self.subTest(rotation=rotation):
+                self.assertEqual(inventory.take(10, 10, rotation),
+                                 Remnant(1, 11, 11))
+
+
+    def testSmall(self):
+        inventory = RemnantInventory(min_side=5, min_area=100)
+        with self.subTest():
+            self.assertIsNone(inventory.add(4, 100))
+        with self.subTest():
+            self.assertIsNone(inventory.add(9, 9))
+        with self.subTest():
+            self.assertEqual(inventory.add(10, 10), Remnant(0, 10, 10))
+
+
+    def testPersistence(self):
+        inventory = RemnantInventory(min_side=2)
+        for width, height in ((30, 20), (5000, 10), (7, 7)):
+            inventory.add(width, height)
+        inventory.take(6, 6)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'remnants.json')
+            inventory.save(path)
+            loaded = RemnantInventory.load(path)
+            with self.subTest():
+                self.assertEqual(sorted(loaded), sorted(inventory))
+            with self.subTest():
+                self.assertEqual(loaded.add(3, 3).id, 3)
+            with open(path, 'w') as handle:
+                handle.write('{"version": 99}')
+            with self.subTest():
+                self.assertRaises(ValueError, RemnantInventory.load, path)
+
+
+class Manager(BaseTestCase):
+    def testRemnantsFirst(self):
+        """
+        Items go to remnants before fresh sheets, and the offcuts of
+        the job return to the inventory
+        """
+        inventory = RemnantInventory(min_side=5)
+        inventory.add(60, 45)
+        M = binpack.BinManager(100, 50, pack_algo='guillotine',
+                               heuristic='best_area_fit', remnants=inventory)
+        M.add_items(*workload.to_items(workload.generate(100, 100, 50, seed=8)))
+        result = M.execute()
+        remnant_bins = [binn for binn in M.bins if id(binn) in M.remnant_of]
+        with self.subTest():
+            self.assertEqual(len(result['unplaced']), 0)
+        with self.subTest():
+            self.assertEqual([(binn.x, binn.y) for binn in remnant_bins],
+                             [(60, 45)])
+        with self.subTest():
+            self.assertEqual(M.stats()['remnants_used'], 1)
+        with self.subTest():
+            self.assertEqual(len(inventory), 0)
+        free = [(rect.width, rect.height) for binn in M.bins
+                for rect in binn.freerects
+                if min(rect.width, rect.height) >= 5]
+        added = M.release_remnants()
+        with self.subTest():
+            self.assertEqual(added, len(free))
+        with self.subTest():
+            self.assertEqual(sorted((r.width, r.height) for r in inventory),
+                             sorted(free))
+        with self.subTest():
+            self.assertEqual(M.release_remnants(), 0)
+        with self.subTest():
+            self.assertRaises(ValueError, M.improve)
+
+
+    def testReleaseEmpty(self):
+        """
+        A released remnant leaves the manager, so it cannot be cut
+        both from the bin and from the inventory
+        """
+        inventory = RemnantInventory(min_side=5)
+        inventory.add(60, 45)
+        M = binpack.BinManager(100, 50, pack_algo='guillotine',
+                               remnants=inventory)
+        M._new_bin(binpack.Item(10, 10))
+        M.release_remnants()
+        with self.subTest():
+            self.assertEqual((M.bins, M.bin_area), ([], 0))
+        with self.subTest():
+            self.assertEqual(len(inventory), 1)
+        M.add_items(binpack.Item(10, 10))
+        M.execute()
+        with self.subTest():
+            self.assertEqual([(binn.x, binn.y) for binn in M.bins], [(60, 45)])
+        with self.subTest():
+            self.assertEqual(len(inventory), 0)
+        M.release_remnants()
+        with self.subTest():
+            self.assertEqual(M.bins[0].free_area, 0)
+
+
+    def testLowerBound(self):
+        """
+        The bound is taken from the sheet size, not from whichever bin
+        opened first
+        """
+        dims = workload.generate(100, 100, 50, seed=8)
+        plain = binpack.BinManager(100, 50, pack_algo='guillotine')
+        plain.add_items(*workload.to_items(dims))
+        inventory = RemnantInventory(min_side=5)
+        M = binpack.BinManager(100, 50, pack_algo='guillotine',
+                               remnants=inventory)
+        M.add_items(*workload.to_items(dims))
+        # Just large enough for the first item packed
+        inventory.add(*max(dims, key=lambda d: d[0] * d[1]))
+        with self.subTest('no bins'):
+            self.assertLessEqual(M.lower_bound(), plain.lower_bound())
+        M.execute()
+        with self.subTest('remnant first'):
+            self.assertIn(id(M.bins[0]), M.remnant_of)
+        with self.subTest('remnant first'):
+            self.assertLessEqual(M.lower_bound(), len(M.bins))
+        with self.subTest('remnant first'):
+            self.assertGreaterEqual(M.lower_bound(),
+                                    -(-M.stats()['used_area'] // (100 * 50)))
+
+
+def load_tests(loader, tests, pattern):
+    suite = unittest.TestSuite()
+    if pattern is None:
+        suite.addTests(loader.loadTestsFromTestCase(Inventory))
+        suite.addTests(loader.loadTestsFromTestCase(Manager))
+    else:
+        tests = loader.loadTestsFromName(pattern,
+                                         module=sys.modules[__name__])
+        failedTests = [t for t in tests._tests
+                       if type(t) == unittest.loader._FailedTest]
+        if len(failedTests) == 0:
+            suite.addTests(tests)
+    return suite
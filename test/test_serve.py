@@ -0,0 +1,201 @@
+import asyncio
+import json
+import sys
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from binpack import serve
+from binpack import workload
+from binpack.distributed import pack_job
+
+from .base import BaseTestCase
+
+CONFIG = {'bin_width': 100, 'bin_height': 50, 'pack_algo': 'guillotine'}
+
+
+async def _request(address, method, path, body=None):
+    reader, writer = await asyncio.open_connection(*address)
+    payload = json.dumps(body).encode('utf-8') if body is not None else b''
+    writer.write(('%s %s HTTP/1.1\r\nContent-Length: %d\r\n'
+                  'Connection: close\r\n\r\n'
+                  % (method, path, len(payload))).encode('latin-1') + payload)
+    response = await reader.read()
+    writer.close()
+    head, _, content = response.partition(b'\r\n\r\n')
+    return int(head.split()[1]), json.loads(content.decode('utf-8'))
+
+
+class Server(BaseTestCase):
+    def _run(self, test, **options):
+        async def run():
+            server = serve.PackServer(port=0, **options)
+            await server.start()
+            try:
+                return await test(server)
+            finally:
+                await server.close()
+        return asyncio.run(run())
+
+
+    def testPack(self):
+        """
+        Placements come back as pack_job computes them
+        """
+        dims = workload.generate(40, 100, 50, seed=1)
+        async def test(server):
+            return await _request(server.address, 'POST', '/pack',
+                                  {'config': CONFIG, 'items': dims})
+        status, result = self._run(test)
+        with self.subTest():
+            self.assertEqual(status, 200)
+        with self.subTest():
+            self.assertEqual(result['placements'],
+                             [list(p) for p in pack_job(CONFIG, dims)['placements']])
+
+
+    def testBatching(self):
+        """
+        Concurrent requests share batches
+        """
+        async def test(server):
+            requests = [_request(server.address, 'POST', '/pack',
+                                 {'config': CONFIG, 'items': [[10, 10]] * n})
+                        for n in range(1, 13)]
+            responses = await asyncio.gather(*requests)
+            return responses, dict(server.stats)
+        responses, stats = self._run(test, batch_delay=0.2,
+                                     executor=ThreadPoolExecutor(1))
+        with self.subTest():
+            self.assertEqual([status for status, result in responses], [200] * 12)
+        with self.subTest():
+            self.assertEqual([len(result['placements'])
+                              for status, result in responses],
+                             list(range(1, 13)))
+        with self.subTest():
+            self.assertEqual(stats['requests'], 12)
+        with self.subTest():
+            self.assertLess(stats['batches'], 12)
+
+
+    def testBackpressure(self):
+        """
+        Requests beyond the queue are turned away with 503
+        """
+        async def test(server):
+            requests = [_request(server.address, 'POST', '/pack',
+                                 {'config': CONFIG, 'items': [[10, 10]]})
+                        for n in range(20)]
+            responses = await asyncio.gather(*requests)
+            return [status for status, result in responses], dict(server.stats)
+        statuses, stats = self._run(test, batch_size=1, queue_size=1,
+                                    executor=ThreadPoolExecutor(1))
+        with self.subTest():
+            self.assertEqual(sorted(set(statuses)), [200, 503])
+        with self.subTest():
+            self.assertEqual(statuses.count(503), stats['rejected'])
+
+
+    def testErrors(self):
+        async def test(server):
+            return [await _request(server.address, 'POST', '/pack', {'items': 3}),
+                    await _request(server.address, 'POST', '/pack',
+                                   {'config': {'heuristic': 'bogus'},
+                                    'items': [[1, 1]]}),
+                    await _request(server.address, 'POST', '/pack',
+                                   {'config': {'catalog': 1},
+                                    'items': [[1, 1]]}),
+                    await _request(server.address, 'POST', '/pack',
+                                   {'config': {'bin_width': '10'},
+                                    'items': [[1, 1]]}),
+                    await _request(server.address, 'GET', '/pack'),
+                    await _request(server.address, 'GET', '/missing'),
+                    await _request(server.address, 'GET', '/health')]
+        responses = self._run(test, executor=ThreadPoolExecutor(1))
+        with self.subTest():
+            self.assertEqual([status for status, result in responses],
+                             [400, 400, 400, 400, 405, 404, 200])
+        with self.subTest():
+            self.assertIn('bogus', responses[1][1]['error'])
+        with self.subTest():
+            self.assertIn('catalog', responses[2][1]['error'])
+        with self.subTest():
+            self.assertEqual(responses[6][1]['status'], 'ok')
+
+
+    def testBadJobInBatch(self):
+        """
+        A job that fails to pack does not fail the rest of its batch
+        """
+        dims = [[10, 10]] * 3
+        results = serve.pack_batch([({'catalog': 1}, dims),
+                                    ({'bin_algo': 'bogus'}, dims),
+                                    (CONFIG, dims),
+                                    ({'heuristic': 'bogus'}, dims)])
+        with self.subTest():
+            self.assertEqual(['error' in result for result in results],
+                             [True, True, False, True])
+        with self.subTest():
+            self.assertEqual(results[2], pack_job(CONFIG, dims))
+
+
+    def testLimits(self):
+        async def test(server):
+            requests = [{'config': dict(CONFIG, bin_width=101), 'items': [[1, 1]]},
+                        {'config': CONFIG, 'items': [[1, 1]] * 6},
+                        {'config': CONFIG, 'items': [[101, 1]]},
+                        {'config': CONFIG, 'items': [[0, 1]]},
+                        {'config': CONFIG, 'items': [[100, 50]] * 5}]
+            return [await _request(server.address, 'POST', '/pack', request)
+                    for request in requests]
+        responses = self._run(test, max_side=100, max_items=5,
+                              executor=ThreadPoolExecutor(1))
+        self.assertEqual([status for status, result in responses],
+                         [400, 400, 400, 400, 200])
+
+
+    def testWorkerDied(self):
+        """
+        A pool broken by a dead worker is replaced
+        """
+        async def test(server):
+            for process in list(server.executor._processes.values()):
+                process.kill()
+                process.join()
+            statuses = []
+            for _ in range(3):
+                status, result = await _request(server.address, 'POST', '/pack',
+                                                {'config': CONFIG,
+                                                 'items': [[10, 10]]})
+                statuses.append(status)
+            return statuses, dict(server.stats)
+        statuses, stats = self._run(test)
+        with self.subTest():
+            self.assertEqual(statuses[1:], [200, 200])
+        with self.subTest():
+            self.assertEqual(stats['restarts'], 1)
+
+
+    def testCallerExecutor(self):
+        """
+        Executors passed in are left running on close
+        """
+        executor = ThreadPoolExecutor(1)
+        async def test(server):
+            return await _request(server.address, 'GET', '/health')
+        self._run(test, executor=executor)
+        self.assertEqual(executor.submit(abs, -1).result(), 1)
+        executor.shutdown()
+
+
+def load_tests(loader, tests, pattern):
+    suite = unittest.TestSuite()
+    if pattern is None:
+        suite.addTests(loader.loadTestsFromTestCase(Server))
+    else:
+        tests = loader.loadTestsFromName(pattern,
+                                         module=sys.modules[__name__])
+        failedTests = [t for t in tests._tests
+                       if type(t) == unittest.loader._FailedTest]
+        if len(failedTests) == 0:
+            suite.addTests(tests)
+    return suite
@@ -1,6 +1,8 @@
+import random
 import sys
 import unittest
 
+import binpack
 from binpack import shelf
 from binpack import item
 
@@ -489,6 +491,170 @@ class WorstAreaFit(BaseTestCase):
             self.assertEqual(self.sheet.items, correct)
 
 
+class Streaming(BaseTestCase):
+    def testOpenShelfOnly(self):
+        """
+        Next fit never goes back to an earlier shelf
+        """
+        S = shelf.Sheet(8, 4, rotation=False)
+        items = [item.Item(5, 1), item.Item(4, 1), item.Item(3, 1)]
+        for i in items:
+            with self.subTest():
+                self.assertTrue(S.insert(i, 'next_fit'))
+        with self.subTest():
+            self.assertEqual(items[2].CornerPoint, (4, 1))
+        with self.subTest():
+            self.assertEqual([s.available_width for s in S.shelves], [3, 1])
+
+
+    def testMatchesLevels(self):
+        """
+        Inserting one item at a time gives the NFDH fast path layout
+        """
+        rng = random.Random(1)
+        dims = sorted(((rng.randint(1, 30), rng.randint(1, 20))
+                       for _ in range(300)), key=lambda d: d[1], reverse=True)
+        fast = [item.Item(w, h, rotation=False) for w, h in dims]
+        slow = [item.Item(w, h, rotation=False) for w, h in dims]
+        A = shelf.Sheet(100, 80, rotation=False)
+        B = shelf.Sheet(100, 80, rotation=False)
+        placed = A.pack_levels(fast, 'next_fit')
+        expected = 0
+        for i in slow:
+            if not B.insert(i, 'next_fit'):
+                break
+            expected += 1
+        with self.subTest():
+            self.assertEqual(placed, expected)
+        with self.subTest():
+            self.assertEqual([i.CornerPoint for i in fast[:placed]],
+                             [i.CornerPoint for i in slow[:expected]])
+
+
+    def testSink(self):
+        """
+        Closed shelves go to the sink and leave the sheet
+        """
+        closed = []
+        S = shelf.Sheet(100, 90, sink=closed.append)
+        items = [item.Item(40, 3) for _ in range(20)]
+        for i in items:
+            S.insert(i, 'next_fit')
+            with self.subTest():
+                self.assertEqual(len(S.shelves), 1)
+        with self.subTest():
+            self.assertEqual(len(closed), 9)
+        with self.subTest():
+            self.assertEqual(S.items, items[18:])
+        S.close()
+        with self.subTest():
+            self.assertEqual([i for s in closed for i in s.items], items)
+        with self.subTest():
+            self.assertEqual([s.vertical_offset for s in closed],
+                             list(range(0, 30, 3)))
+
+
+    def testManagerBestFit(self):
+        """
+        Best fit bin selection only scores the open shelf of each bin
+        """
+        rng = random.Random(2)
+        items = [item.Item(rng.randint(5, 50), rng.randint(3, 25))
+                 for _ in range(200)]
+        M = binpack.BinManager(100, 50, pack_algo='shelf',
+                               heuristic='next_fit')
+        M.add_items(*items)
+        M.execute()
+        with self.subTest():
+            self.assertEqual(M.items_placed, 200)
+        with self.subTest():
+            self.assertLess(len(M.bins), M.lower_bound() * 2)
+
+
+class Levels(BaseTestCase):
+    def _items(self, count=300, seed=0):
+        rng = random.Random(seed)
+        items = [item.Item(rng.randint(1, 30), rng.randint(1, 20),
+                           rotation=False) for _ in range(count)]
+        items.sort(key=lambda i: i.y, reverse=True)
+        return items
+
+
+    def testFirstFitMatchesInsert(self):
+        """
+        The FFDH fast path places items exactly like insert
+        """
+        fast, slow = self._items(), self._items()
+        A = shelf.Sheet(100, 80, rotation=False)
+        B = shelf.Sheet(100, 80, rotation=False)
+        placed = A.pack_levels(fast, 'first_fit')
+        expected = 0
+        for i in slow:
+            if not B.insert(i, 'first_fit'):
+                break
+            expected += 1
+        with self.subTest():
+            self.assertEqual(placed, expected)
+        with self.subTest():
+            self.assertEqual([i.CornerPoint for i in fast[:placed]],
+                             [i.CornerPoint for i in slow[:expected]])
+        with self.subTest():
+            self.assertEqual([(s.y, s.vertical_offset, s.available_width)
+                              for s in A.shelves],
+                             [(s.y, s.vertical_offset, s.available_width)
+                              for s in B.shelves])
+        with self.subTest():
+            self.assertEqual((A.used_area, A.available_height),
+                             (B.used_area, B.available_height))
+
+
+    def testNextFit(self):
+        """
+        NFDH only ever fills the last shelf
+        """
+        S = shelf.Sheet(8, 6, rotation=False)
+        items = [item.Item(w, h, rotation=False)
+                 for w, h in [(5, 3), (2, 3), (3, 2), (4, 2), (2, 1), (8, 1)]]
+        placed = S.pack_levels(items, 'next_fit')
+        with self.subTest():
+            self.assertEqual(placed, 5)
+        with self.subTest():
+            self.assertEqual([i.CornerPoint for i in items[:5]],
+                             [(0, 0), (5, 0), (0, 3), (3, 3), (0, 5)])
+        with self.subTest():
+            self.assertEqual([s.available_width for s in S.shelves],
+                             [1, 1, 6])
+        with self.subTest():
+            self.assertEqual(S.used_area, 15 + 6 + 6 + 8 + 2)
+
+
+    def testFallback(self):
+        """
+        Unsorted items and rotation go through insert one at a time
+        """
+        S = shelf.Sheet(8, 4)
+        items = [item.Item(2, 1), item.Item(4, 2), item.Item(3, 1)]
+        with self.subTest():
+            self.assertEqual(S.pack_levels(items, 'first_fit'), 3)
+        with self.subTest():
+            self.assertEqual(len(S.items), 3)
+
+
+    def testInsertMany(self):
+        """
+        insert_many reports the placed count and the index to resume at
+        """
+        S = shelf.Sheet(8, 6, rotation=False)
+        items = [item.Item(w, h, rotation=False)
+                 for w, h in [(9, 1), (5, 3), (2, 3), (3, 2), (8, 4)]]
+        with self.subTest():
+            self.assertEqual(S.insert_many(items, start=1), (3, 4))
+        with self.subTest():
+            self.assertEqual(S.insert_many(items), (0, 0))
+        with self.subTest():
+            self.assertEqual(S.used_area, 27)
+
+
 #class BinStats(BaseTestCase):
 #    def setUp(self):
 #        self.ROOT = bintree.BinTree()
@@ -520,6 +686,8 @@ def load_tests(loader, tests, pattern):
         suite.addTests(loader.loadTestsFromTestCase(WorstWidthFit))
         suite.addTests(loader.loadTestsFromTestCase(WorstHeightFit))
         suite.addTests(loader.loadTestsFromTestCase(WorstAreaFit))
+        suite.addTests(loader.loadTestsFromTestCase(Streaming))
+        suite.addTests(loader.loadTestsFromTestCase(Levels))
         #suite.addTests(loader.loadTestsFromTestCase(BinStats))
     else:
         tests = loader.loadTestsFromName(pattern,
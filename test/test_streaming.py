@@ -0,0 +1,132 @@
+import asyncio
+import sys
+import unittest
+
+import binpack
+from binpack import streaming
+from binpack import workload
+
+from .base import BaseTestCase
+
+
+class StreamPacker(BaseTestCase):
+    def setUp(self):
+        self.dims = workload.generate(200, 100, 50, seed=2)
+
+
+    def testMatchesOffline(self):
+        """
+        A lookahead covering the whole stream packs no worse than execute
+        """
+        for pack_algo in ('shelf', 'guillotine'):
+            packer = streaming.StreamPacker(100, 50, pack_algo,
+                                            lookahead=len(self.dims),
+                                            open_bins=None)
+            closed = []
+            for i in workload.to_items(self.dims):
+                closed.extend(packer.push(i))
+            closed.extend(packer.flush())
+            M = binpack.BinManager(100, 50, pack_algo=pack_algo,
+                                   heuristic='best_area_fit')
+            M.add_items(*workload.to_items(self.dims))
+            M.execute()
+            with self.subTest(pack_algo=pack_algo):
+                self.assertLessEqual(len(closed), len(M.bins))
+            with self.subTest(pack_algo=pack_algo):
+                self.assertEqual(sum(len(binn.items) for binn in closed),
+                                 len(self.dims))
+
+
+    def testBoundedBins(self):
+        """
+        No more than open_bins stay open and full bins leave early
+        """
+        packer = streaming.StreamPacker(100, 50, lookahead=8, open_bins=3)
+        closed = []
+        for i in workload.to_items(self.dims):
+            closed.extend(packer.push(i))
+            with self.subTest():
+                self.assertLessEqual(packer.stats()['open'], 3)
+            with self.subTest():
+                self.assertLessEqual(packer.stats()['buffered'], 7)
+        with self.subTest():
+            self.assertGreater(len(closed), 0)
+        closed.extend(packer.flush())
+        stats = packer.stats()
+        with self.subTest():
+            self.assertEqual((stats['placed'], stats['failed']), (200, 0))
+        with self.subTest():
+            self.assertEqual(stats['closed'], len(closed))
+        with self.subTest():
+            self.assertEqual(sum(len(binn.items) for binn in closed), 200)
+        with self.subTest():
+            self.assertRaises(ValueError, streaming.StreamPacker, open_bins=0)
+
+
+    def testLookahead(self):
+        """
+        A longer window packs tighter than none
+        """
+        bins = []
+        for lookahead in (1, 64):
+            packer = streaming.StreamPacker(100, 50, lookahead=lookahead)
+            for i in workload.to_items(self.dims):
+                packer.push(i)
+            packer.flush()
+            bins.append(packer.stats()['closed'])
+        self.assertLess(bins[1], bins[0])
+
+
+    def testFits(self):
+        """
+        fits predicts insert without placing anything
+        """
+        for pack_algo, heuristic in (('shelf', 'best_area_fit'),
+                                     ('shelf', 'next_fit'),
+                                     ('guillotine', 'best_area_fit'),
+                                     ('grid', 'bottom_left')):
+            binn = binpack.BinManager(100, 50, pack_algo=pack_algo,
+                                      heuristic=heuristic)._new_bin()
+            for i in workload.to_items(self.dims):
+                placed = len(binn.items)
+                fits = binn.fits(i)
+                with self.subTest(heuristic=heuristic):
+                    self.assertEqual(len(binn.items), placed)
+                with self.subTest(heuristic=heuristic):
+                    self.assertEqual(fits, binn.insert(i))
+
+
+    def testRun(self):
+        async def pipeline():
+            source, sink = asyncio.Queue(), asyncio.Queue(2)
+            packer = streaming.StreamPacker(100, 50, lookahead=4)
+            task = asyncio.ensure_future(packer.run(source, sink))
+            for i in workload.to_items(self.dims):
+                await source.put(i)
+            await source.put(None)
+            closed = []
+            while True:
+                binn = await sink.get()
+                if binn is None:
+                    break
+                closed.append(binn)
+            return closed, await task
+        closed, stats = asyncio.run(pipeline())
+        with self.subTest():
+            self.assertEqual(stats['closed'], len(closed))
+        with self.subTest():
+            self.assertEqual(sum(len(binn.items) for binn in closed), 200)
+
+
+def load_tests(loader, tests, pattern):
+    suite = unittest.TestSuite()
+    if pattern is None:
+        suite.addTests(loader.loadTestsFromTestCase(StreamPacker))
+    else:
+        tests = loader.loadTestsFromName(pattern,
+                                         module=sys.modules[__name__])
+        failedTests = [t for t in tests._tests
+                       if type(t) == unittest.loader._FailedTest]
+        if len(failedTests) == 0:
+            suite.addTests(tests)
+    return suite
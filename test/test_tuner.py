@@ -0,0 +1,129 @@
+import os
+import sys
+import tempfile
+import unittest
+
+from binpack import tuner
+from binpack import workload
+
+from .base import BaseTestCase
+
+
+CONFIGS = [('shelf', 'first_fit'), ('shelf', 'best_width_fit'),
+           ('guillotine', 'best_area_fit')]
+
+
+class Sample(BaseTestCase):
+    def testFingerprint(self):
+        """
+        Fingerprints ignore order but not the size distribution
+        """
+        a = workload.generate(2000, 100, 50, seed=1)
+        b = list(reversed(a))
+        c = workload.generate(2000, 100, 50, max_ratio=0.9, seed=1)
+        with self.subTest():
+            self.assertEqual(tuner.fingerprint(a, 100, 50),
+                             tuner.fingerprint(b, 100, 50))
+        with self.subTest():
+            self.assertNotEqual(tuner.fingerprint(a, 100, 50),
+                                tuner.fingerprint(c, 100, 50))
+        with self.subTest():
+            self.assertNotEqual(tuner.fingerprint(a, 100, 50),
+                                tuner.fingerprint(a, 200, 50))
+
+
+    def testStratified(self):
+        """
+        One item is drawn from every area stratum
+        """
+        dims = [(n, 1) for n in range(1, 101)]
+        sample = tuner.stratified_sample(dims, 10)
+        with self.subTest():
+            self.assertEqual(len(sample), 10)
+        for stratum, (w, h) in enumerate(sample):
+            with self.subTest():
+                self.assertEqual((w - 1) // 10, stratum)
+        with self.subTest():
+            self.assertEqual(tuner.stratified_sample(dims[:5], 10), dims[:5])
+
+
+class Tune(BaseTestCase):
+    def testChoose(self):
+        dims = workload.generate(300, 100, 50)
+        T = tuner.Tuner(100, 50, configs=CONFIGS, sample_size=50)
+        estimates = T.evaluate(dims)
+        choice = T.choose(dims)
+        with self.subTest():
+            self.assertEqual(len(estimates), len(CONFIGS))
+        with self.subTest():
+            self.assertIn((choice['pack_algo'], choice['heuristic']), CONFIGS)
+        with self.subTest():
+            self.assertGreaterEqual(choice['efficiency'] + T.tolerance,
+                                    max(e['efficiency'] for e in estimates))
+
+
+    def testCache(self):
+        """
+        Repeat workloads skip tuning, across Tuner instances when
+        the cache is persisted
+        """
+        dims = workload.generate(300, 100, 50)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'tuner.json')
+            T = tuner.Tuner(100, 50, configs=CONFIGS, sample_size=50,
+                            cache_path=path)
+            choice = T.choose(dims)
+            T.evaluate = None
+            with self.subTest():
+                self.assertEqual(T.choose(dims[::-1]), choice)
+            T = tuner.Tuner(100, 50, configs=CONFIGS, cache_path=path)
+            T.evaluate = None
+            with self.subTest():
+                self.assertEqual(T.choose(dims), choice)
+            with self.subTest():
+                self.assertEqual(os.listdir(directory), ['tuner.json'])
+
+
+    def testCacheKey(self):
+        """
+        Tuners with another bin_algo or candidate set tune again
+        """
+        dims = workload.generate(300, 100, 50)
+        key = tuner.Tuner(100, 50, configs=CONFIGS).cache_key(dims)
+        with self.subTest():
+            self.assertEqual(tuner.Tuner(100, 50, configs=CONFIGS[::-1])
+                             .cache_key(dims), key)
+        with self.subTest():
+            self.assertNotEqual(tuner.Tuner(100, 50, configs=CONFIGS[:1])
+                                .cache_key(dims), key)
+        with self.subTest():
+            self.assertNotEqual(tuner.Tuner(100, 50, bin_algo='bin_first_fit',
+                                            configs=CONFIGS).cache_key(dims),
+                                key)
+
+
+    def testPack(self):
+        dims = workload.generate(300, 100, 50)
+        T = tuner.Tuner(100, 50, configs=CONFIGS, sample_size=50)
+        M = T.pack(dims)
+        choice = T.choose(dims)
+        with self.subTest():
+            self.assertEqual(M.items_placed, 300)
+        with self.subTest():
+            self.assertEqual((M.algorithm, M.heuristic),
+                             (choice['pack_algo'], choice['heuristic']))
+
+
+def load_tests(loader, tests, pattern):
+    suite = unittest.TestSuite()
+    if pattern is None:
+        suite.addTests(loader.loadTestsFromTestCase(Sample))
+        suite.addTests(loader.loadTestsFromTestCase(Tune))
+    else:
+        tests = loader.loadTestsFromName(pattern,
+                                         module=sys.modules[__name__])
+        failedTests = [t for t in tests._tests
+                       if type(t) == unittest.loader._FailedTest]
+        if len(failedTests) == 0:
+            suite.addTests(tests)
+    return suite
@@ -0,0 +1,79 @@
+import os
+import sys
+import tempfile
+import unittest
+
+from binpack import workload
+
+from .base import BaseTestCase
+
+
+class Generate(BaseTestCase):
+    def testSeeded(self):
+        """
+        Equal seeds generate equal workloads
+        """
+        self.assertEqual(workload.generate(50, seed=3),
+                         workload.generate(50, seed=3))
+
+
+    def testBounds(self):
+        """
+        Generated sides stay within the requested ratios
+        """
+        dims = workload.generate(200, 100, 50, 0.1, 0.5)
+        with self.subTest():
+            self.assertTrue(all(10 <= w <= 50 for w, h in dims))
+        with self.subTest():
+            self.assertTrue(all(5 <= h <= 25 for w, h in dims))
+
+
+class Load(BaseTestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+
+    def _write(self, name, text):
+        path = os.path.join(self.dir.name, name)
+        with open(path, 'w') as handle:
+            handle.write(text)
+        return path
+
+
+    def testJSON(self):
+        path = self._write('items.json', '[[4, 2], {"width": 3, "height": 1}]')
+        self.assertEqual(workload.load(path), [(4, 2), (3, 1)])
+
+
+    def testJSONL(self):
+        path = self._write('items.jsonl', '[4, 2]\n\n{"width": 3, "height": 1}\n')
+        self.assertEqual(workload.load(path), [(4, 2), (3, 1)])
+
+
+    def testCSV(self):
+        path = self._write('items.csv', 'width,height\n4,2\n3,1\n')
+        self.assertEqual(workload.load(path), [(4, 2), (3, 1)])
+
+
+    def testUnknownFormat(self):
+        with self.assertRaises(ValueError):
+            list(workload.parse(['4 2'], 'tsv'))
+
+
+def load_tests(loader, tests, pattern):
+    suite = unittest.TestSuite()
+    if pattern is None:
+        suite.addTests(loader.loadTestsFromTestCase(Generate))
+        suite.addTests(loader.loadTestsFromTestCase(Load))
+    else:
+        tests = loader.loadTestsFromName(pattern,
+                                         module=sys.modules[__name__])
+        failedTests = [t for t in tests._tests
+                       if type(t) == unittest.loader._FailedTest]
+        if len(failedTests) == 0:
+            suite.addTests(tests)
+    return suite
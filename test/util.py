@@ -9,3 +9,53 @@ def stdout_redirect(stringIO):
     finally:
         sys.stdout = sys.__stdout__
         stringIO.seek(0)
+
+
+def overlaps(a, b):
+    return (a.CornerPoint[0] < b.CornerPoint[0] + b.x and
+            b.CornerPoint[0] < a.CornerPoint[0] + a.x and
+            a.CornerPoint[1] < b.CornerPoint[1] + b.y and
+            b.CornerPoint[1] < a.CornerPoint[1] + a.y)
+
+
+def brute_force_fit(entries, width, height, rotation, key, orientation_key=None):
+    """
+    Scans entries with width and height attributes for the ones a
+    width by height item fits. The best by orientation_key (key by
+    default) of each orientation is taken, and the best of those by
+    key returned, or None.
+    """
+    found = []
+    for w, h in ((width, height), (height, width)) if rotation else ((width, height),):
+        fitting = [e for e in entries if e.width >= w and e.height >= h]
+        if fitting:
+            found.append(min(fitting, key=orientation_key or key))
+    return min(found, key=key, default=None)
+
+
+class LayoutAssertions:
+    """
+    Mixin for test cases checking packed layouts
+    """
+    def assertBinsValid(self, bins):
+        """
+        Every item lies inside its bin and overlaps no other item
+        """
+        for binn in bins:
+            for n, a in enumerate(binn.items):
+                with self.subTest():
+                    self.assertLessEqual(a.CornerPoint[0] + a.x, binn.x)
+                    self.assertLessEqual(a.CornerPoint[1] + a.y, binn.y)
+                for b in binn.items[n + 1:]:
+                    with self.subTest():
+                        self.assertFalse(overlaps(a, b))
+
+
+    def assertLayoutValid(self, M):
+        """
+        Every item of the manager is in exactly one bin, validly placed
+        """
+        items = [i for binn in M.bins for i in binn.items]
+        with self.subTest():
+            self.assertEqual(sorted(map(id, items)), sorted(map(id, M.items)))
+        self.assertBinsValid(M.bins)